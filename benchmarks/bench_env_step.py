@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+# Add repo root to Python path (one level up from 'benchmarks')
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+import numpy as np
+
+from env.liquidity_env import LiquidityEnv
+
+
+def steps_per_second(env: LiquidityEnv, n_steps: int = 200_000, seed: int = 0) -> float:
+    """Time n_steps of env.step() with a fixed random action sequence."""
+    actions = np.random.default_rng(seed).integers(0, 5, size=n_steps).tolist()
+    env.reset(seed=seed)
+
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    elapsed = time.perf_counter() - start
+
+    return n_steps / elapsed
+
+
+def main():
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    before = steps_per_second(LiquidityEnv(), n_steps)
+    after = steps_per_second(LiquidityEnv(fast_path=True), n_steps)
+
+    print(f"LiquidityEnv.step ({n_steps} steps)")
+    print(f"  default   : {before:12,.0f} steps/sec")
+    print(f"  fast_path : {after:12,.0f} steps/sec")
+    print(f"  speedup   : {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
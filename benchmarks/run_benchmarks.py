@@ -0,0 +1,302 @@
+"""
+Throughput/latency benchmarks for the env, the PPO policy and training.
+
+    python benchmarks/run_benchmarks.py --save-baseline   # record this box
+    python benchmarks/run_benchmarks.py                   # compare against it
+
+Results are written to benchmarks/results.json. Every metric is compared
+against the baseline (benchmarks/baselines.json by default) and the script
+exits with status 1 if any of them regressed by more than --threshold
+(relative). A missing baseline fails the run too, so a check that compares
+against nothing never passes silently; pass --no-baseline-ok for a
+measurement-only run. Baselines are machine specific, so record them on the
+box the comparison runs on.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# Add repo root to Python path (one level up from 'benchmarks')
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+import numpy as np
+
+from benchmarks.bench_env_step import steps_per_second
+from env.batched_env import BatchedLiquidityEnv
+from env.liquidity_env import LiquidityEnv
+from env.multi_pool_env import MultiPoolLiquidityEnv, random_coupling
+
+MODEL_PATH = "rl/models/ppo_liquidity.zip"
+DEFAULT_BASELINE = os.path.join(CURRENT_DIR, "baselines.json")
+DEFAULT_RESULTS = os.path.join(CURRENT_DIR, "results.json")
+
+
+def best_time(fn, repeat: int) -> float:
+    """Fastest of `repeat` timed calls of fn(), in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def metric(value: float, unit: str, higher_is_better: bool) -> dict:
+    return {"value": float(value), "unit": unit, "higher_is_better": higher_is_better}
+
+
+# -----------------------------
+# Individual benchmarks
+# -----------------------------
+def bench_env_step(quick: bool) -> dict:
+    n_steps = 20_000 if quick else 200_000
+    return {
+        "env_step": metric(steps_per_second(LiquidityEnv(), n_steps), "steps/s", True),
+        "env_step_fast": metric(
+            steps_per_second(LiquidityEnv(fast_path=True), n_steps), "steps/s", True
+        ),
+    }
+
+
+def bench_vec_env(quick: bool, repeat: int) -> dict:
+    results = {}
+    n_steps = 100 if quick else 1000
+    for n_envs in (1, 64, 1024):
+        env = BatchedLiquidityEnv(n_envs, seed=0)
+        env.reset()
+        actions = np.random.default_rng(0).integers(0, 5, size=(n_steps, n_envs))
+
+        def run():
+            for a in actions:
+                env.step(a)
+
+        elapsed = best_time(run, repeat)
+        results[f"vec_env_n{n_envs}"] = metric(n_steps * n_envs / elapsed, "steps/s", True)
+    return results
+
+
+def bench_vec_env_workers(quick: bool, repeat: int) -> dict:
+    """
+    SharedMemoryVecEnv steps per second against n_workers, next to the same
+    batch stepped in-process, for train_ppo's default batch and a large one.
+    Prints the worker count (if any) where the processes start to pay off.
+    """
+    from rl.shm_vec_env import SharedMemoryVecEnv
+    from rl.train_ppo import N_ENVS
+
+    results = {}
+    n_steps = 100 if quick else 1000
+    for n_envs in (N_ENVS, 1024):
+        actions = np.random.default_rng(0).integers(0, 5, size=(n_steps, n_envs))
+        worker_counts = sorted({w for w in (1, 2, 4, os.cpu_count() or 1) if w <= n_envs})
+        for n_workers in [0] + worker_counts:
+            if n_workers == 0:
+                env = BatchedLiquidityEnv(n_envs, seed=0)
+            else:
+                env = SharedMemoryVecEnv(n_envs, n_workers, seed=0)
+            env.reset()
+
+            def run():
+                for a in actions:
+                    env.step(a)
+
+            elapsed = best_time(run, repeat)
+            env.close()
+            name = f"vec_env_n{n_envs}_" + ("inprocess" if n_workers == 0 else f"w{n_workers}")
+            results[name] = metric(n_steps * n_envs / elapsed, "steps/s", True)
+
+        inprocess = results[f"vec_env_n{n_envs}_inprocess"]["value"]
+        faster = [w for w in worker_counts if results[f"vec_env_n{n_envs}_w{w}"]["value"] > inprocess]
+        if faster:
+            print(f"n_envs={n_envs}: worker processes beat in-process stepping from n_workers={faster[0]}")
+        else:
+            print(f"n_envs={n_envs}: in-process stepping is fastest up to n_workers={worker_counts[-1]}")
+    return results
+
+
+def bench_multi_pool(quick: bool, repeat: int) -> dict:
+    """Portfolio steps per second, without and with 4-neighbour coupling."""
+    results = {}
+    n_pools = 5000
+    n_steps = 100 if quick else 1000
+    actions = np.random.default_rng(0).integers(0, 5, size=(n_steps, n_pools))
+    for name, degree in (("multi_pool_n5000", 0), ("multi_pool_n5000_coupled", 4)):
+        coupling = {}
+        if degree:
+            coupling = {
+                "migration": random_coupling(n_pools, degree, 0.5, seed=0),
+                "spillover": random_coupling(n_pools, degree, 0.05, seed=1),
+            }
+        env = MultiPoolLiquidityEnv(n_pools, **coupling)
+        env.reset(seed=0)
+
+        def run():
+            for a in actions:
+                if env.step(a)[2]:
+                    env.reset()
+
+        results[name] = metric(n_steps / best_time(run, repeat), "steps/s", True)
+    return results
+
+
+def bench_predict(quick: bool, repeat: int) -> dict:
+    from stable_baselines3 import PPO
+
+    model = PPO.load(MODEL_PATH)
+    rng = np.random.default_rng(0)
+    single = LiquidityEnv().observation_space.sample().astype(np.float32)
+    batch = rng.uniform([0.0, 0.0, 0.0], [1.0, 1.0, 0.5], size=(256, 3)).astype(np.float32)
+    n_calls = 200 if quick else 2000
+
+    def run_single():
+        for _ in range(n_calls):
+            model.predict(single, deterministic=True)
+
+    def run_batch():
+        for _ in range(n_calls // 10):
+            model.predict(batch, deterministic=True)
+
+    return {
+        "predict_single": metric(best_time(run_single, repeat) / n_calls * 1e6, "us/call", False),
+        "predict_batch256": metric(
+            best_time(run_batch, repeat) / (n_calls // 10) * 1e6, "us/call", False
+        ),
+    }
+
+
+def bench_run_comparison(quick: bool, repeat: int) -> dict:
+    dashboard_dir = os.path.join(REPO_ROOT, "dashboard")
+    if dashboard_dir not in sys.path:
+        sys.path.append(dashboard_dir)
+    from manual_vs_rl import run_comparison
+
+    num_steps = 100 if quick else 300
+    manual_actions = [0.0] * num_steps
+    run_comparison(manual_actions, num_steps)  # warm-up: loads the model
+
+    elapsed = best_time(lambda: run_comparison(manual_actions, num_steps), repeat)
+    return {"run_comparison": metric(elapsed, "s", False)}
+
+
+def bench_train(quick: bool) -> dict:
+    from stable_baselines3 import PPO
+
+    from rl.train_ppo import N_ENVS, ROLLOUT_SIZE, make_vec_env
+
+    env = make_vec_env(N_ENVS, 1, seed=0)
+    model = PPO("MlpPolicy", env, n_steps=ROLLOUT_SIZE // N_ENVS, seed=0, verbose=0)
+    timesteps = 2 * ROLLOUT_SIZE if quick else 8 * ROLLOUT_SIZE
+
+    start = time.perf_counter()
+    model.learn(total_timesteps=timesteps)
+    elapsed = time.perf_counter() - start
+    env.close()
+
+    return {"train_ppo": metric(model.num_timesteps / elapsed, "steps/s", True)}
+
+
+# -----------------------------
+# Baseline comparison
+# -----------------------------
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """Metrics that got worse than the baseline by more than threshold."""
+    regressions = []
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["value"]
+        new = current["value"]
+        if current["higher_is_better"]:
+            change = (old - new) / old
+        else:
+            change = (new - old) / old
+        if change > threshold:
+            regressions.append((name, old, new, current["unit"], change))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the LiquidityEnv/PPO benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads, for smoke runs")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repeats, the best one counts")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--output", default=DEFAULT_RESULTS)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument(
+        "--no-baseline-ok",
+        action="store_true",
+        help="only measure when there is no baseline, instead of failing",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=["env", "vec_env", "vec_env_workers", "multi_pool", "predict", "dashboard", "train"],
+        help="run a subset of the benchmarks",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Model and data paths are relative to the repo root
+    os.chdir(REPO_ROOT)
+
+    suites = {
+        "env": lambda: bench_env_step(args.quick),
+        "vec_env": lambda: bench_vec_env(args.quick, args.repeat),
+        "vec_env_workers": lambda: bench_vec_env_workers(args.quick, args.repeat),
+        "multi_pool": lambda: bench_multi_pool(args.quick, args.repeat),
+        "predict": lambda: bench_predict(args.quick, args.repeat),
+        "dashboard": lambda: bench_run_comparison(args.quick, args.repeat),
+        "train": lambda: bench_train(args.quick),
+    }
+
+    results = {}
+    for name in args.only or suites:
+        print(f"Running {name} benchmarks...")
+        results.update(suites[name]())
+
+    print("=====================================")
+    for name, m in results.items():
+        print(f"{name:20s}: {m['value']:14,.2f} {m['unit']}")
+
+    report = {"machine": platform.platform(), "python": platform.python_version(), "metrics": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        if args.no_baseline_ok:
+            print(f"No baseline at {args.baseline}; nothing to compare against.")
+            return
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one on this machine.")
+        sys.exit(1)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["metrics"]
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print("=====================================")
+        for name, old, new, unit, change in regressions:
+            print(f"REGRESSION {name}: {old:,.2f} -> {new:,.2f} {unit} ({change:+.0%} worse)")
+        sys.exit(1)
+
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 
 import streamlit as st
-import numpy as np
 import pandas as pd
-from manual_vs_rl import run_comparison
-#from live_data import fetch_intraday, compute_features
+from manual_vs_rl import (
+    AGENTS,
+    MAX_STEPS,
+    get_result_cache,
+    iter_comparison_cached,
+    start_instrumentation,
+    strategy_actions,
+)
+from live_data import get_feature_engine, get_fetcher
 
 st.set_page_config(page_title="RL Liquidity Controller", layout="wide")
 st.title("🤖 RL vs Manual Liquidity Controller")
+start_instrumentation()
 
 tab_rl, tab_live = st.tabs(["RL vs Manual", "Live Stock (read‑only)"])
 
@@ -15,7 +22,7 @@ tab_rl, tab_live = st.tabs(["RL vs Manual", "Live Stock (read‑only)"])
 # ---------------------------------------------------------------------
 with tab_rl:
     st.markdown("""
-Compare your manual APY adjustments against a trained **PPO agent** in real-time.
+Compare your manual APY adjustments against a trained **PPO agent** (or a beam-search planner) in real-time.
 Goal: maximize **liquidity** while minimizing **volatility** (reward = liquidity - volatility - 0.1×APY).
 """)
 
@@ -28,113 +35,155 @@ Goal: maximize **liquidity** while minimizing **volatility** (reward = liquidity
         "Strategy",
         ["Constant", "Increasing", "Decreasing", "Random"],
     )
+    seed = int(st.sidebar.number_input("Seed", min_value=0, value=0, step=1))
+    agent, opponent = AGENTS[st.sidebar.selectbox("Opponent", list(AGENTS))]
     run_button = st.sidebar.button("🚀 Run Comparison", use_container_width=True)
 
     if run_button:
         # Build manual actions according to strategy
-        if strategy == "Constant":
-            manual_actions = [manual_apy_change / 100.0] * num_steps
-        elif strategy == "Increasing":
-            manual_actions = np.linspace(-0.02, 0.02, num_steps).tolist()
-        elif strategy == "Decreasing":
-            manual_actions = np.linspace(0.02, -0.02, num_steps).tolist()
-        else:  # "Random"
-            manual_actions = np.random.uniform(-0.05, 0.05, num_steps).tolist()
-
-        with st.spinner(f"Running {num_steps} steps..."):
-            df = run_comparison(manual_actions, num_steps)
-
-        if len(df) == 0:
-            st.error("No steps were recorded. Check the environment or model configuration.")
-        else:
-            # Summary metrics
-            st.subheader("🏆 Final Results")
-            col1, col2, col3, col4 = st.columns(4)
-            col1.metric("RL Liquidity", f"{df['rl_liquidity'].iloc[-1]:.3f}")
-            col2.metric("Manual Liquidity", f"{df['manual_liquidity'].iloc[-1]:.3f}")
-            col3.metric("RL Mean Reward", f"{df['rl_reward'].mean():.3f}")
-            col4.metric("Manual Mean Reward", f"{df['manual_reward'].mean():.3f}")
-
-            # Liquidity & Volatility
-            col_lv1, col_lv2 = st.columns(2)
-            with col_lv1:
-                st.markdown("💧 **Liquidity**")
-                st.line_chart(
-                    {
-                        "Manual": df["manual_liquidity"],
-                        "RL": df["rl_liquidity"],
-                    }
-                )
-            with col_lv2:
-                st.markdown("⚡ **Volatility**")
-                st.line_chart(
-                    {
-                        "Manual": df["manual_volatility"],
-                        "RL": df["rl_volatility"],
-                    }
-                )
+        manual_actions = strategy_actions(strategy.lower(), manual_apy_change, num_steps, seed)
 
-            # APY & Reward
-            st.markdown("📈 **APY & Reward**")
-            col_ar1, col_ar2 = st.columns(2)
-            with col_ar1:
-                st.markdown("**APY (%)**")
-                st.line_chart(
-                    {
-                        "Manual": df["manual_apy"] * 100.0,
-                        "RL": df["rl_apy"] * 100.0,
-                    }
-                )
-            with col_ar2:
-                st.markdown("**Reward**")
-                st.line_chart(
-                    {
-                        "Manual": df["manual_reward"],
-                        "RL": df["rl_reward"],
-                    }
-                )
+        # Lay the page out first, then fill it in as chunks of steps arrive
+        st.subheader("🏆 Results")
+        progress = st.progress(0.0, text=f"Running {num_steps} steps...")
+        metric_slots = [col.empty() for col in st.columns(4)]
+
+        # Liquidity & Volatility
+        col_lv1, col_lv2 = st.columns(2)
+        with col_lv1:
+            st.markdown("💧 **Liquidity**")
+            liquidity_slot = st.empty()
+        with col_lv2:
+            st.markdown("⚡ **Volatility**")
+            volatility_slot = st.empty()
 
-            rl_mean = df["rl_reward"].mean()
-            manual_mean = df["manual_reward"].mean()
+        # APY & Reward
+        st.markdown("📈 **APY & Reward**")
+        col_ar1, col_ar2 = st.columns(2)
+        with col_ar1:
+            st.markdown("**APY (%)**")
+            apy_slot = st.empty()
+        with col_ar2:
+            st.markdown("**Reward**")
+            reward_slot = st.empty()
+
+        slots = {
+            "liquidity": liquidity_slot,
+            "volatility": volatility_slot,
+            "apy": apy_slot,
+            "reward": reward_slot,
+        }
+        series = {name: [] for name in slots}
+        total_steps = min(num_steps, MAX_STEPS)
+        steps_done = 0
+        rl_reward_sum = 0.0
+        manual_reward_sum = 0.0
+
+        for chunk in iter_comparison_cached(manual_actions, num_steps, seed=seed, agent=agent):
+            views = {
+                "liquidity": pd.DataFrame(
+                    {"Manual": chunk["manual_liquidity"], opponent: chunk["rl_liquidity"]}
+                ),
+                "volatility": pd.DataFrame(
+                    {"Manual": chunk["manual_volatility"], opponent: chunk["rl_volatility"]}
+                ),
+                "apy": pd.DataFrame(
+                    {"Manual": chunk["manual_apy"] * 100.0, opponent: chunk["rl_apy"] * 100.0}
+                ),
+                "reward": pd.DataFrame(
+                    {"Manual": chunk["manual_reward"], opponent: chunk["rl_reward"]}
+                ),
+            }
+            # Redraw each chart in place with everything received so far
+            for name, view in views.items():
+                series[name].append(view)
+                slots[name].line_chart(pd.concat(series[name]))
+
+            steps_done += len(chunk)
+            rl_reward_sum += chunk["rl_reward"].sum()
+            manual_reward_sum += chunk["manual_reward"].sum()
+            metric_slots[0].metric(f"{opponent} Liquidity", f"{chunk['rl_liquidity'].iloc[-1]:.3f}")
+            metric_slots[1].metric("Manual Liquidity", f"{chunk['manual_liquidity'].iloc[-1]:.3f}")
+            metric_slots[2].metric(f"{opponent} Mean Reward", f"{rl_reward_sum / steps_done:.3f}")
+            metric_slots[3].metric("Manual Mean Reward", f"{manual_reward_sum / steps_done:.3f}")
+            progress.progress(
+                min(steps_done / total_steps, 1.0),
+                text=f"Step {steps_done} / {total_steps}",
+            )
+
+        progress.empty()
+
+        if steps_done == 0:
+            st.error("No steps were recorded. Check the environment or model configuration.")
+        else:
+            rl_mean = rl_reward_sum / steps_done
+            manual_mean = manual_reward_sum / steps_done
             if rl_mean > manual_mean:
                 st.error(
-                    f"🤖 RL wins (RL: {rl_mean:.3f} > Manual: {manual_mean:.3f}). "
+                    f"🤖 {opponent} wins ({opponent}: {rl_mean:.3f} > Manual: {manual_mean:.3f}). "
                     "Try a different manual strategy!"
                 )
             else:
                 st.balloons()
                 st.success(
-                    f"🎉 You beat RL (Manual: {manual_mean:.3f} > RL: {rl_mean:.3f})!"
+                    f"🎉 You beat {opponent} (Manual: {manual_mean:.3f} > {opponent}: {rl_mean:.3f})!"
                 )
     else:
         st.info("Set your strategy on the left and click **Run Comparison** to start.")
 
+    cache_stats = get_result_cache().stats()
+    st.sidebar.caption(
+        f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+        f"{cache_stats['entries']} entries ({cache_stats['bytes'] / 1024:.0f} KiB)"
+    )
+
 # ---------------------------------------------------------------------
 # TAB 2: Live Stock (read‑only)
 # ---------------------------------------------------------------------
 with tab_live:
     st.markdown("""
-    **Live Stock Demo** (placeholder - working on API integration)
+    **Live Stock Watchlist** (5-minute bars, last 7 days)
     """)
-    
+
     col1, col2 = st.columns([1, 3])
-    
+
     with col1:
-        symbol = st.text_input("Stock symbol", value="AAPL")
-        if st.button("📈 Show Demo"):
-            pass
-    
+        watchlist_text = st.text_area("Symbols (comma separated)", value="AAPL, MSFT, NVDA")
+        watchlist = [s.strip().upper() for s in watchlist_text.split(",") if s.strip()]
+        refresh_button = st.button("🔄 Refresh", use_container_width=True)
+
     with col2:
-        st.info("✅ RL vs Manual tab works perfectly!")
-        st.info("🔄 Live stock data coming soon...")
-        
-        # Fake demo charts
-        steps = np.linspace(0, 100, 100)
-        price = 150 + 5 * np.sin(steps / 10) + np.random.normal(0, 1, 100)
-        vol = 0.02 + 0.01 * np.abs(np.sin(steps / 5)) + np.random.normal(0, 0.002, 100)
-        
-        st.subheader("💰 Price")
-        st.line_chart(price)
-        
-        st.subheader("📊 Volatility")
-        st.line_chart(vol)
+        fetcher = get_fetcher()
+        if refresh_button:
+            all_bars = fetcher.fetch(watchlist)
+        else:
+            # Whatever is already on disk, without touching the endpoint
+            all_bars = {s: fetcher.bars(s) for s in watchlist if len(fetcher.bars(s))}
+
+        for symbol in watchlist:
+            if symbol in fetcher.errors:
+                st.warning(f"{symbol}: {fetcher.errors[symbol]}")
+
+        if not all_bars:
+            st.info("Click **Refresh** to download bars for the watchlist.")
+        else:
+            engine = get_feature_engine()
+            features = {symbol: engine.features(symbol, bars) for symbol, bars in all_bars.items()}
+            st.dataframe(
+                pd.DataFrame({
+                    "Last price": {s: f["price"].iloc[-1] for s, f in features.items()},
+                    "Volatility": {s: f["volatility"].iloc[-1] for s, f in features.items()},
+                    "Bars": {s: len(f) for s, f in features.items()},
+                    "Last bar": {s: f["Datetime"].iloc[-1] for s, f in features.items()},
+                }),
+                use_container_width=True,
+            )
+
+            symbol = st.selectbox("Symbol", list(features))
+            df = features[symbol].set_index("Datetime")
+
+            st.subheader("💰 Price")
+            st.line_chart(df["price"])
+
+            st.subheader("📊 Volatility")
+            st.line_chart(df["volatility"])
@@ -1,36 +1,247 @@
-cat > dashboard/live_data.py << 'EOF'
-import streamlit as st
-import pandas as pd
+"""
+Intraday market data for the Live tab.
+
+BarFetcher keeps each symbol's bar history on disk and tops it up on
+refresh: a request only asks for bars newer than the last stored one,
+a watchlist is fetched concurrently over one pooled HTTP session, and a
+symbol refreshed less than min_refresh seconds ago is answered from memory
+without touching the endpoint.
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
 import numpy as np
+import pandas as pd
 import requests
-import io
-from datetime import datetime, timedelta
+import streamlit as st
+from requests.adapters import HTTPAdapter
 
-@st.cache_data(ttl=60)
-def fetch_stock_data(symbol: str) -> pd.DataFrame:
-    """Yahoo Finance CSV - works with all pandas versions."""
-    url = f"https://query1.finance.yahoo.com/v7/finance/download/{symbol}?period1={int((datetime.now() - timedelta(days=7)).timestamp())}&period2={int(datetime.now().timestamp())}&interval=5m&events=history&includeAdjustedClose=true"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
-    
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
+from live_features import FeatureEngine, RollingFeatures
+
+YAHOO_CSV_URL = "https://query1.finance.yahoo.com/v7/finance/download/{symbol}"
+BAR_DIR = "data/cache/bars"
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# 5-minute bars, keeping the last 7 days of them
+INTERVAL = "5m"
+HISTORY = timedelta(days=7)
+
+# A symbol is re-requested at most this often (bars only close every 5 min)
+MIN_REFRESH_SECONDS = 60
+
+# Concurrent requests (and pooled connections) per fetcher
+MAX_WORKERS = 8
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+class HttpTransport:
+    """
+    GETs over one pooled requests.Session shared by every fetch thread.
+
+    Anything with the same get(url, params) -> str method can stand in for
+    it, e.g. to serve bars from a local test server or fixtures.
+    """
+
+    def __init__(self, pool_size: int = MAX_WORKERS, timeout: float = 10, headers: dict = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers or HEADERS)
+        self.timeout = timeout
+
+    def get(self, url: str, params: dict) -> str:
+        resp = self.session.get(url, params=params, timeout=self.timeout)
         resp.raise_for_status()
-        
-        # Use io.StringIO (universal across pandas versions)
-        df = pd.read_csv(io.StringIO(resp.text))
-        df['Datetime'] = pd.to_datetime(df['Datetime'])
-        df = df.sort_values('Datetime').reset_index(drop=True)
-        return df
-    except Exception as e:
-        raise ValueError(f"No data for {symbol}: {str(e)[:100]}")
+        return resp.text
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def empty_bars() -> pd.DataFrame:
+    df = pd.DataFrame({name: np.empty(0) for name in BAR_COLUMNS})
+    df.insert(0, "Datetime", pd.to_datetime(np.empty(0, dtype=np.int64), utc=True))
+    return df
+
+
+def parse_bars(text: str) -> pd.DataFrame:
+    """Bars from a Yahoo CSV download, sorted by their UTC timestamp."""
+    df = pd.read_csv(io.StringIO(text))
+    if df.empty:
+        return empty_bars()
+    time_column = "Datetime" if "Datetime" in df.columns else "Date"
+    df["Datetime"] = pd.to_datetime(df[time_column], utc=True)
+    df = df[["Datetime", *[name for name in BAR_COLUMNS if name in df.columns]]]
+    return df.sort_values("Datetime").reset_index(drop=True)
+
+
+class BarStore:
+    """Per-symbol bar history on disk: one .npz of columns per symbol."""
+
+    def __init__(self, directory: str = BAR_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{quote(symbol, safe='')}.npz")
+
+    def load(self, symbol: str) -> pd.DataFrame:
+        try:
+            with np.load(self._path(symbol)) as data:
+                columns = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return empty_bars()
+        columns["Datetime"] = pd.to_datetime(columns["Datetime"], unit="ns", utc=True)
+        return pd.DataFrame(columns)
+
+    def save(self, symbol: str, df: pd.DataFrame) -> None:
+        columns = {name: df[name].to_numpy() for name in df.columns if name != "Datetime"}
+        # Nanoseconds whatever resolution pandas holds the timestamps in
+        columns["Datetime"] = df["Datetime"].values.astype("datetime64[ns]").view(np.int64)
+        # Write to a temp file first so readers never see a partial history
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp_path, self._path(symbol))
+
+
+class BarFetcher:
+    """
+    Incremental, concurrent bar fetcher for a watchlist.
+
+    refresh(symbol) requests only bars after the last stored timestamp
+    (the full history window on first use), appends them to the store and
+    drops bars older than the window. fetch(symbols) refreshes a whole
+    watchlist on a thread pool; failures are kept in self.errors and leave
+    the stored history untouched.
+    """
+
+    def __init__(
+        self,
+        store: BarStore = None,
+        transport=None,
+        base_url: str = YAHOO_CSV_URL,
+        interval: str = INTERVAL,
+        history: timedelta = HISTORY,
+        min_refresh: float = MIN_REFRESH_SECONDS,
+        max_workers: int = MAX_WORKERS,
+    ):
+        self.store = store or BarStore()
+        self.transport = transport or HttpTransport(pool_size=max_workers)
+        self.base_url = base_url
+        self.interval = interval
+        self.history = history
+        self.min_refresh = min_refresh
+        self.max_workers = max_workers
+        self.errors = {}
+        self.requests = 0
+
+        self._bars = {}
+        self._checked = {}
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+
+    def _request(self, symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
+        params = {
+            "period1": int(start.timestamp()),
+            "period2": int(end.timestamp()),
+            "interval": self.interval,
+            "events": "history",
+            "includeAdjustedClose": "true",
+        }
+        text = self.transport.get(self.base_url.format(symbol=quote(symbol, safe="")), params)
+        with self._lock:
+            self.requests += 1
+        return parse_bars(text)
+
+    def bars(self, symbol: str) -> pd.DataFrame:
+        """Stored bars for symbol, without any request."""
+        if symbol not in self._bars:
+            self._bars[symbol] = self.store.load(symbol)
+        return self._bars[symbol]
+
+    def refresh(self, symbol: str, now: datetime = None) -> pd.DataFrame:
+        with self._lock:
+            lock = self._symbol_locks.setdefault(symbol, threading.Lock())
+        # Sessions refreshing the same symbol wait for each other's request
+        with lock:
+            return self._refresh(symbol, now)
+
+    def _refresh(self, symbol: str, now: datetime = None) -> pd.DataFrame:
+        bars = self.bars(symbol)
+        checked = self._checked.get(symbol)
+        if checked is not None and time.monotonic() - checked < self.min_refresh:
+            return bars
+
+        now = now or datetime.now(timezone.utc)
+        if len(bars):
+            last = bars["Datetime"].iloc[-1]
+            new = self._request(symbol, last.to_pydatetime() + timedelta(seconds=1), now)
+            new = new[new["Datetime"] > last]
+        else:
+            new = self._request(symbol, now - self.history, now)
+        self._checked[symbol] = time.monotonic()
+
+        if len(new):
+            bars = pd.concat([bars, new], ignore_index=True)
+            bars = bars[bars["Datetime"] >= now - self.history].reset_index(drop=True)
+            self.store.save(symbol, bars)
+            self._bars[symbol] = bars
+        return bars
+
+    def fetch(self, symbols) -> dict:
+        """{symbol: bars} for every symbol that has any bars after refreshing."""
+        symbols = list(dict.fromkeys(symbols))
+
+        def refresh(symbol):
+            try:
+                bars = self.refresh(symbol)
+            except Exception as e:
+                self.errors[symbol] = str(e)[:100]
+                return self.bars(symbol)
+            self.errors.pop(symbol, None)
+            return bars
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(len(symbols), 1))) as pool:
+            results = dict(zip(symbols, pool.map(refresh, symbols)))
+        return {symbol: bars for symbol, bars in results.items() if len(bars)}
+
+
+@st.cache_resource
+def get_fetcher() -> BarFetcher:
+    # One fetcher (connection pool, in-memory bars) per server process
+    return BarFetcher()
+
+
+def fetch_stock_data(symbol: str) -> pd.DataFrame:
+    """Intraday bars for one symbol, refreshed incrementally."""
+    fetcher = get_fetcher()
+    bars = fetcher.fetch([symbol]).get(symbol)
+    if bars is None:
+        raise ValueError(f"No data for {symbol}: {fetcher.errors.get(symbol, 'empty response')}")
+    return bars
+
+
+@st.cache_resource
+def get_feature_engine() -> FeatureEngine:
+    # Per-symbol rolling state, shared by every session like the fetcher
+    return FeatureEngine()
+
 
 def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    returns, volatility = RollingFeatures().bootstrap(df['Close'].to_numpy())
     df = df.copy()
     df['price'] = df['Close']
-    df['return'] = df['price'].pct_change()
-    df['volatility'] = df['return'].rolling(12, min_periods=3).std()
+    df['return'] = returns
+    df['volatility'] = volatility
     return df
-EOF
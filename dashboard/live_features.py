@@ -0,0 +1,192 @@
+"""
+Incremental price features: per-bar return and rolling volatility.
+
+RollingFeatures holds one symbol's last window of returns in a ring buffer
+with a running (Welford) mean and sum of squares, so each new bar costs
+O(1) instead of recomputing pct_change and rolling std over the whole
+history. Results match pandas' price.pct_change() and
+return.rolling(window, min_periods).std(). History can be loaded in one
+vectorized pass with bootstrap(), and FeatureEngine keeps one instance per
+symbol for a watchlist.
+"""
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 12 five-minute bars = one hour
+WINDOW = 12
+MIN_PERIODS = 3
+
+
+def rolling_std(values: np.ndarray, window: int = WINDOW, min_periods: int = MIN_PERIODS) -> np.ndarray:
+    """Vectorized Series(values).rolling(window, min_periods).std(); NaNs are skipped."""
+    values = np.asarray(values, dtype=np.float64)
+    padded = np.concatenate([np.full(window - 1, np.nan), values])
+    windows = sliding_window_view(padded, window)
+
+    valid = ~np.isnan(windows)
+    count = valid.sum(axis=1)
+    mean = np.where(valid, windows, 0.0).sum(axis=1) / np.maximum(count, 1)
+    m2 = (np.where(valid, windows - mean[:, None], 0.0) ** 2).sum(axis=1)
+
+    enough = count >= max(min_periods, 2)
+    return np.where(enough, np.sqrt(m2 / np.maximum(count - 1, 1)), np.nan)
+
+
+class RollingFeatures:
+    """Return and rolling volatility of one price series, one bar at a time."""
+
+    def __init__(self, window: int = WINDOW, min_periods: int = MIN_PERIODS):
+        self.window = window
+        self.min_periods = max(min_periods, 2)
+        self.last_price = math.nan
+        self.last_return = math.nan
+
+        # Ring buffer of the last `window` returns (NaN = no value)
+        self._buffer = [math.nan] * window
+        self._pos = 0
+        # Welford state over the non-NaN values in the buffer
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def volatility(self) -> float:
+        if self._count < self.min_periods:
+            return math.nan
+        return math.sqrt(max(self._m2, 0.0) / (self._count - 1))
+
+    def update(self, price: float):
+        """Fold in the next bar's price; returns (return, volatility)."""
+        price = float(price)
+        ret = price / self.last_price - 1.0
+        self.last_price = price
+        self.last_return = ret
+
+        old = self._buffer[self._pos]
+        self._buffer[self._pos] = ret
+        self._pos = (self._pos + 1) % self.window
+
+        if old == old:  # not NaN
+            self._count -= 1
+            if self._count == 0:
+                self._mean = self._m2 = 0.0
+            else:
+                delta = old - self._mean
+                self._mean -= delta / self._count
+                self._m2 -= delta * (old - self._mean)
+        if ret == ret:
+            self._count += 1
+            delta = ret - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (ret - self._mean)
+
+        if self._pos == 0:
+            # Once per pass over the buffer: drop drift from the running removals
+            self._recompute()
+        return ret, self.volatility
+
+    def _recompute(self) -> None:
+        values = [v for v in self._buffer if v == v]
+        self._count = len(values)
+        self._mean = math.fsum(values) / self._count if values else 0.0
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+
+    def bootstrap(self, prices: np.ndarray):
+        """
+        Fold in many bars at once with vectorized NumPy, continuing from the
+        current state. Returns the (returns, volatilities) arrays of those bars,
+        the same values update() would give one price at a time.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) == 0:
+            return np.empty(0), np.empty(0)
+
+        returns = np.empty(len(prices))
+        returns[0] = prices[0] / self.last_price - 1.0
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+
+        # Returns already in the window, oldest first, provide the lead-in
+        history = self._buffer[self._pos:] + self._buffer[: self._pos]
+        series = np.concatenate([history[1:], returns])
+        volatilities = rolling_std(series, self.window, self.min_periods)[self.window - 1:]
+
+        tail = np.concatenate([history, returns])[-self.window:]
+        self._buffer = tail.tolist()
+        self._pos = 0
+        self._recompute()
+        self.last_price = float(prices[-1])
+        self.last_return = float(returns[-1])
+        return returns, volatilities
+
+
+class FeatureEngine:
+    """
+    RollingFeatures for every symbol of a watchlist, fed from bar frames.
+
+    features(symbol, bars) only processes bars newer than the last one it
+    has seen for that symbol (vectorized on first sight, O(1) per bar after
+    that) and returns the bars with price/return/volatility columns, as
+    compute_features would.
+    """
+
+    def __init__(self, window: int = WINDOW, min_periods: int = MIN_PERIODS):
+        self.window = window
+        self.min_periods = min_periods
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def _reset(self, symbol: str) -> dict:
+        state = {
+            "rolling": RollingFeatures(self.window, self.min_periods),
+            "times": np.empty(0, dtype=np.int64),
+            "returns": np.empty(0),
+            "volatility": np.empty(0),
+        }
+        self._state[symbol] = state
+        return state
+
+    def features(self, symbol: str, bars: pd.DataFrame) -> pd.DataFrame:
+        with self._lock:
+            return self._features(symbol, bars)
+
+    def _features(self, symbol: str, bars: pd.DataFrame) -> pd.DataFrame:
+        times = bars["Datetime"].values.astype("datetime64[ns]").view(np.int64)
+        prices = bars["Close"].to_numpy(dtype=np.float64)
+
+        state = self._state.get(symbol) or self._reset(symbol)
+        seen = 0
+        if len(state["times"]) and len(times):
+            # Bars already processed are the overlap of our history and this
+            # frame; anything else (gaps, rewritten history) starts over
+            start = np.searchsorted(state["times"], times[0])
+            overlap = state["times"][start:]
+            if len(overlap) <= len(times) and np.array_equal(overlap, times[: len(overlap)]):
+                seen = len(overlap)
+                for key in ("times", "returns", "volatility"):
+                    state[key] = state[key][start:]
+            else:
+                state = self._reset(symbol)
+
+        new_prices = prices[seen:]
+        if len(new_prices) > self.window:
+            returns, volatility = state["rolling"].bootstrap(new_prices)
+        else:
+            rolling = state["rolling"]
+            returns = np.empty(len(new_prices))
+            volatility = np.empty(len(new_prices))
+            for i, price in enumerate(new_prices):
+                returns[i], volatility[i] = rolling.update(price)
+
+        state["times"] = np.concatenate([state["times"], times[seen:]])
+        state["returns"] = np.concatenate([state["returns"], returns])
+        state["volatility"] = np.concatenate([state["volatility"], volatility])
+
+        df = bars.copy()
+        df["price"] = prices
+        df["return"] = state["returns"]
+        df["volatility"] = state["volatility"]
+        return df
@@ -1,85 +1,204 @@
+import atexit
+import os
+import sys
+
 import streamlit as st
 import numpy as np
 import pandas as pd
-from stable_baselines3 import PPO
-from env import LiquidityEnv
+
+# Add repo root to Python path so the dashboard shares env/liquidity_env.py
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+import env.liquidity_env as liquidity_env
+from env.liquidity_env import MAX_STEPS, LiquidityEnv
+from env.simulate import simulate
+from rl import instrumentation
+from rl.episode_runner import collect_episode, iter_episode
+from rl.inference_server import connect_shared_policy
+from rl.numpy_policy import load_policy
+from rl.planner import BEAM_WIDTH, HORIZON, N_SCENARIOS, BeamSearchPlanner
+from rl.tournament import manual_schedule, strategy_actions
+from result_cache import ResultCache, array_hash, file_hash, make_key
+
+MODEL_PATH = "rl/models/ppo_liquidity.zip"
+CACHE_DIR = "data/cache/comparisons"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump when run_comparison's output changes for the same inputs
+CACHE_VERSION = 2
+
+# Controllers the manual schedule can be compared against:
+# sidebar label -> (agent, short name shown on charts and metrics)
+AGENTS = {"PPO agent": ("ppo", "RL"), "Beam-search planner": ("planner", "Planner")}
 
 
 @st.cache_resource
+def load_local_model():
+    # In-process copy shared by every session: the exported
+    # rl/models/ppo_liquidity_policy.npz when present, which keeps torch out
+    # of the dashboard process
+    return load_policy(MODEL_PATH)
+
+
 def load_model():
-    # model file lives at rl/models/ppo_liquidity.zip
-    return PPO.load("rl/models/ppo_liquidity.zip")
-    
-
-def _reset_env(env):
-    """Handle both Gym old and new reset API."""
-    out = env.reset()
-    if isinstance(out, tuple):
-        obs, info = out
-    else:
-        obs, info = out, {}
-    return obs, info
-
-
-def _step_env(env, action):
-    """Handle both Gym old and new step API."""
-    out = env.step(action)
-    if len(out) == 5:
-        obs, reward, terminated, truncated, info = out
-        done = terminated or truncated
-    else:
-        obs, reward, done, info = out
-    return obs, float(reward), bool(done), info
-
-
-def run_comparison(manual_actions, num_steps=500):
-    """Run RL vs Manual trajectories and return a comparison DataFrame."""
-    env = LiquidityEnv()
-    model = load_model()
-
-    rl_next_obs = []
-    rl_rewards = []
-    manual_next_obs = []
-    manual_rewards = []
-
-    # -------- RL trajectory --------
-    obs, _ = _reset_env(env)
-    for t in range(num_steps):
-        obs_flat = np.array(obs, dtype=np.float32).reshape(-1)
-        rl_action, _ = model.predict(obs_flat, deterministic=True)
-
-        obs, reward, done, _ = _step_env(env, rl_action)
-        rl_next_obs.append(obs)
-        rl_rewards.append(reward)
-        if done:
-            break
-
-    # -------- Manual trajectory --------
-    manual_env = LiquidityEnv()
-    obs_m, _ = _reset_env(manual_env)
-    for t in range(num_steps):
-        action = manual_actions[min(t, len(manual_actions) - 1)]
-        obs_m, reward_m, done_m, _ = _step_env(manual_env, action)
-        manual_next_obs.append(obs_m)
-        manual_rewards.append(reward_m)
-        if done_m:
-            break
-
-    steps = min(len(rl_next_obs), len(manual_next_obs))
-    rl_next_obs = rl_next_obs[:steps]
-    rl_rewards = rl_rewards[:steps]
-    manual_next_obs = manual_next_obs[:steps]
-    manual_rewards = manual_rewards[:steps]
-
-    df = pd.DataFrame({
-        "step": range(steps),
-        "rl_liquidity": [o[0] for o in rl_next_obs],
-        "rl_volatility": [o[1] for o in rl_next_obs],
-        "rl_apy": [o[2] for o in rl_next_obs],
-        "rl_reward": rl_rewards,
-        "manual_liquidity": [o[0] for o in manual_next_obs],
-        "manual_volatility": [o[1] for o in manual_next_obs],
-        "manual_apy": [o[2] for o in manual_next_obs],
-        "manual_reward": manual_rewards,
+    # model file lives at rl/models/ppo_liquidity.zip. With a running
+    # inference server (python -m rl.inference_server serve) each session
+    # gets its own connection, so the server batches requests across
+    # sessions; the client reconnects after a server restart and falls back
+    # to the in-process copy while the server is down
+    if st.runtime.exists():
+        client = st.session_state.get("policy_client")
+        if client is None:
+            client = connect_shared_policy(MODEL_PATH)
+            if client is not None:
+                st.session_state["policy_client"] = client
+        if client is not None:
+            return client
+    return load_local_model()
+
+
+@st.cache_resource
+def load_planner():
+    # Cheap to build and deterministic, so one instance serves every session
+    return BeamSearchPlanner()
+
+
+def load_agent(agent: str = "ppo"):
+    if agent == "planner":
+        return load_planner()
+    return load_model()
+
+
+def agent_version(agent: str = "ppo"):
+    """What a cached comparison against agent depends on."""
+    if agent == "planner":
+        return {"planner": [HORIZON, BEAM_WIDTH, N_SCENARIOS]}
+    return file_hash(MODEL_PATH)
+
+
+@st.cache_resource
+def start_instrumentation():
+    # Opt-in: RL_METRICS_DIR=data/metrics streamlit run dashboard/app.py
+    metrics_dir = os.environ.get(instrumentation.METRICS_DIR_ENV)
+    if not metrics_dir:
+        return None
+    # Load the policy first so its predict() is among the timed methods
+    load_model()
+    session = instrumentation.Session(metrics_dir).start()
+    atexit.register(session.stop)
+    return session
+
+
+@st.cache_resource
+def get_result_cache():
+    # One cache object per server process; entries live on disk
+    return ResultCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES)
+
+
+def _manual_trajectory(manual_actions, num_steps, seed):
+    """
+    Manual schedule run through the batch simulator: the schedule is known up
+    front, so it needs no step loop. rl.tournament.SchedulePolicy plays the
+    same schedule against other policies.
+    """
+    schedule = manual_schedule(manual_actions, num_steps)
+    manual = simulate(schedule[None, :], seeds=[seed])
+    return {name: values[0] for name, values in manual.items()}
+
+
+def _comparison_frame(rl, manual, start, stop):
+    """Comparison rows start..stop-1 from an RL chunk and the manual trajectory."""
+    n = stop - start
+    return pd.DataFrame({
+        "step": np.arange(start, stop),
+        "rl_liquidity": rl["liquidity"][:n],
+        "rl_volatility": rl["volatility"][:n],
+        "rl_apy": rl["apy"][:n],
+        "rl_reward": rl["reward"][:n],
+        "manual_liquidity": manual["liquidity"][start:stop],
+        "manual_volatility": manual["volatility"][start:stop],
+        "manual_apy": manual["apy"][start:stop],
+        "manual_reward": manual["reward"][start:stop],
     })
-    return df
+
+
+def run_comparison(manual_actions, num_steps=500, seed=None, agent="ppo"):
+    """
+    Run RL vs Manual trajectories and return a comparison DataFrame. The
+    "rl" side is the PPO model, or the beam-search planner with
+    agent="planner".
+
+    With a seed, both trajectories see the same volatility noise and the
+    result is reproducible (and therefore cacheable).
+    """
+    rl = collect_episode(load_agent(agent), max_steps=min(num_steps, MAX_STEPS), seed=seed)
+    manual = _manual_trajectory(manual_actions, num_steps, seed)
+
+    steps = min(len(rl["step"]), len(manual["reward"]))
+    return _comparison_frame(rl, manual, 0, steps)
+
+
+def iter_comparison(manual_actions, num_steps=500, seed=None, chunk_size=50, agent="ppo"):
+    """
+    Stream the RL trajectory and yield the comparison as DataFrame chunks of
+    up to chunk_size steps, with the same columns (and, for the same seed,
+    the same values) as run_comparison.
+    """
+    manual = _manual_trajectory(manual_actions, num_steps, seed)
+    steps = len(manual["reward"])
+
+    for rl in iter_episode(load_agent(agent), max_steps=steps, seed=seed, chunk_size=chunk_size):
+        start = int(rl["step"][0])
+        chunk = _comparison_frame(rl, manual, start, start + len(rl["step"]))
+        chunk.index = chunk["step"].to_numpy()
+        yield chunk
+
+
+def comparison_cache_key(manual_actions, num_steps, seed, agent="ppo"):
+    """Content address of a run_comparison result."""
+    env = LiquidityEnv()
+    env_params = {
+        "min_apy": env.min_apy,
+        "max_apy": env.max_apy,
+        "A": env.A,
+        "B": env.B,
+        "C": env.C,
+        "apy_deltas": liquidity_env.APY_DELTAS.tolist(),
+        "anchor_apy": liquidity_env.ANCHOR_APY,
+        "initial_state": liquidity_env.INITIAL_STATE,
+        "max_steps": liquidity_env.MAX_STEPS,
+        "vol_noise_std": liquidity_env.VOL_NOISE_STD,
+    }
+    return make_key(
+        version=CACHE_VERSION,
+        model=agent_version(agent),
+        env=env_params,
+        schedule=array_hash(manual_actions),
+        num_steps=num_steps,
+        seed=seed,
+    )
+
+
+def iter_comparison_cached(manual_actions, num_steps=500, seed=0, chunk_size=50, agent="ppo"):
+    """
+    iter_comparison backed by the disk cache: a cached result is yielded as
+    a single chunk, otherwise chunks stream as they are computed and the full
+    result is stored once the run finishes.
+    """
+    cache = get_result_cache()
+    key = comparison_cache_key(manual_actions, num_steps, seed, agent)
+
+    df = cache.get(key)
+    if df is not None:
+        yield df
+        return
+
+    chunks = []
+    for chunk in iter_comparison(manual_actions, num_steps, seed=seed, chunk_size=chunk_size, agent=agent):
+        chunks.append(chunk)
+        yield chunk
+    if chunks:
+        cache.put(key, pd.concat(chunks, ignore_index=True))
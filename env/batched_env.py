@@ -0,0 +1,303 @@
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from gymnasium.utils import seeding
+from stable_baselines3.common.vec_env.base_vec_env import (
+    VecEnv,
+    VecEnvIndices,
+    VecEnvObs,
+    VecEnvStepReturn,
+)
+
+from env.liquidity_env import (
+    ANCHOR_APY,
+    APY_DELTAS,
+    INITIAL_STATE,
+    MAX_STEPS,
+    NOISE_BLOCK_SIZE,
+    VOL_NOISE_STD,
+    EnvState,
+    LiquidityEnv,
+)
+from env.market_replay import open_series
+
+
+class BatchedLiquidityEnv(VecEnv):
+    """
+    N independent liquidity pools advanced together with NumPy.
+
+    Same dynamics as LiquidityEnv, but the state of every pool lives in
+    contiguous arrays (liquidity, volatility, current_apy, step_count) and a
+    single step() call updates all of them at once. This is a native
+    Stable-Baselines3 VecEnv, so it can be passed straight to PPO instead of
+    DummyVecEnv([LiquidityEnv, ...]).
+
+    Finished pools are reset automatically; their last observation is stored
+    in info["terminal_observation"] as SB3 expects.
+
+    last_rewards holds the float64 rewards of the latest step (step() returns
+    them as float32, like DummyVecEnv).
+
+    Every pool owns a Generator seeded like LiquidityEnv.reset(seed=seed + i)
+    and noise is prefetched in blocks of noise_block_size steps, so pool i
+    reproduces the exact trajectory of a LiquidityEnv seeded the same way.
+
+    With replay=path_or_series, volatility is read from a memory-mapped
+    MarketSeries as in LiquidityEnv(replay=...): each pool draws its own
+    window start from its Generator at every reset, and every step gathers
+    one bar per pool straight from the mapped column.
+
+    env_method() supports the per-pool LiquidityEnv methods that make sense
+    on a batch: "render", "get_state" (an EnvState a LiquidityEnv, or this
+    env's set_state, continues exactly) and "set_state". Any other name
+    raises AttributeError, as DummyVecEnv does for a method its envs lack.
+    """
+
+    # LiquidityEnv methods env_method() runs on individual pools
+    POOL_METHODS = ("render", "get_state", "set_state")
+
+    def __init__(
+        self,
+        n_envs: int = 1,
+        seed: Optional[int] = None,
+        noise_block_size: int = NOISE_BLOCK_SIZE,
+        replay=None,
+        replay_columns: Tuple[str, ...] = (),
+    ):
+        self.replay = None if replay is None else open_series(replay)
+        self.replay_columns = tuple(replay_columns)
+        template = LiquidityEnv(replay=self.replay, replay_columns=self.replay_columns)
+        self.render_mode = None
+
+        # Market parameters are shared by every pool in the batch
+        self.min_apy = template.min_apy
+        self.max_apy = template.max_apy
+        self.A = template.A
+        self.B = template.B
+        self.C = template.C
+
+        # Per-pool state, one slot per environment
+        self.liquidity = np.empty(n_envs, dtype=np.float64)
+        self.volatility = np.empty(n_envs, dtype=np.float64)
+        self.current_apy = np.empty(n_envs, dtype=np.float64)
+        self.step_count = np.zeros(n_envs, dtype=np.int64)
+        self.last_rewards = np.zeros(n_envs, dtype=np.float64)
+
+        self._obs = np.empty((n_envs, 3 + len(self.replay_columns)), dtype=np.float32)
+
+        # Replay: per-pool window start, and the mapped columns to read from
+        self.replay_start = np.zeros(n_envs, dtype=np.int64)
+        if self.replay is not None:
+            self._replay_vol = self.replay.column("volatility")
+            self._replay_extra = [self.replay.column(name) for name in self.replay_columns]
+        self._actions = np.full(n_envs, 2, dtype=np.int64)
+
+        # Noise block laid out [step, pool] so each step reads one row
+        self._rngs = [
+            seeding.np_random(None if seed is None else seed + i)[0]
+            for i in range(n_envs)
+        ]
+        self.noise_block_size = noise_block_size
+        self._noise = np.empty((noise_block_size, n_envs), dtype=np.float64)
+        self._noise_pos = noise_block_size
+
+        super().__init__(n_envs, template.observation_space, template.action_space)
+        # Replay windows are first drawn by reset(), like LiquidityEnv.reset(seed=...)
+        self._reset_pools(np.ones(n_envs, dtype=bool), draw_windows=False)
+
+    # -----------------------------
+    # Batched dynamics
+    # -----------------------------
+    def _reset_pools(self, mask: np.ndarray, draw_windows: bool = True) -> None:
+        liquidity, volatility, apy = INITIAL_STATE
+        self.liquidity[mask] = liquidity
+        self.volatility[mask] = volatility
+        self.current_apy[mask] = apy
+        self.step_count[mask] = 0
+
+        if self.replay is not None:
+            if draw_windows:
+                for i in np.flatnonzero(mask):
+                    self.replay_start[i] = self.replay.sample_start(self._rngs[i], MAX_STEPS + 1)
+            self.volatility[mask] = self._replay_vol[self.replay_start[mask]]
+
+    def _refill_noise(self) -> None:
+        block_size = self.noise_block_size
+        if self._noise.shape[0] != block_size:
+            # set_state() left a block of another length
+            self._noise = np.empty((block_size, self.num_envs), dtype=np.float64)
+        for i, rng in enumerate(self._rngs):
+            self._noise[:, i] = rng.normal(0.0, VOL_NOISE_STD, block_size)
+        self._noise_pos = 0
+
+    def _set_pool_noise(self, index: int, buffered: np.ndarray) -> None:
+        """
+        Make buffered the next noise values of pool index. The other pools
+        keep their streams: the block is re-laid out with enough rows for
+        everyone, topped up from each pool's Generator (consecutive normal()
+        calls continue one stream, so this does not change any trajectory).
+        """
+        remaining = self._noise[self._noise_pos:]
+        rows = max(len(remaining), len(buffered))
+        block = np.empty((rows, self.num_envs), dtype=np.float64)
+        block[:len(remaining)] = remaining
+        for i, rng in enumerate(self._rngs):
+            have = len(buffered) if i == index else len(remaining)
+            if i == index:
+                block[:have, i] = buffered
+            block[have:, i] = rng.normal(0.0, VOL_NOISE_STD, rows - have)
+        self._noise = block
+        self._noise_pos = 0
+
+    def get_pool_state(self, index: int) -> EnvState:
+        """Snapshot of pool index, as LiquidityEnv.get_state() would take it."""
+        return EnvState(
+            liquidity=float(self.liquidity[index]),
+            volatility=float(self.volatility[index]),
+            current_apy=float(self.current_apy[index]),
+            step_count=int(self.step_count[index]),
+            rng_state=self._rngs[index].bit_generator.state,
+            noise=self._noise[self._noise_pos:, index].tolist(),
+            noise_pos=0,
+            replay_start=int(self.replay_start[index]) if self.replay is not None else -1,
+        )
+
+    def set_pool_state(self, index: int, state: EnvState) -> np.ndarray:
+        """Continue pool index from an EnvState snapshot; returns its observation."""
+        self.liquidity[index] = state.liquidity
+        self.volatility[index] = state.volatility
+        self.current_apy[index] = state.current_apy
+        self.step_count[index] = state.step_count
+        if self.replay is not None:
+            self.replay_start[index] = state.replay_start
+        self._rngs[index].bit_generator.state = state.rng_state
+        self._set_pool_noise(index, np.asarray(state.noise[state.noise_pos:], dtype=np.float64))
+        self._write_obs()
+        return self._obs[index].copy()
+
+    def _write_obs(self) -> None:
+        self._obs[:, 0] = self.liquidity
+        self._obs[:, 1] = self.volatility
+        self._obs[:, 2] = self.current_apy
+        if self.replay is not None:
+            rows = self.replay_start + self.step_count
+            for i, column in enumerate(self._replay_extra, start=3):
+                self._obs[:, i] = column[rows]
+
+    def reset(self) -> VecEnvObs:
+        # Seeds set through VecEnv.seed() only take effect at the next reset
+        if any(seed is not None for seed in self._seeds):
+            for i, seed in enumerate(self._seeds):
+                if seed is not None:
+                    self._rngs[i] = seeding.np_random(seed)[0]
+            # Drop noise drawn from the previous generators
+            self._noise_pos = self._noise.shape[0]
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_pools(np.ones(self.num_envs, dtype=bool))
+        self._write_obs()
+        return self._obs.copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        # Update APY with min/max bounds
+        np.clip(
+            self.current_apy + APY_DELTAS[self._actions],
+            self.min_apy,
+            self.max_apy,
+            out=self.current_apy,
+        )
+
+        # Higher APY -> more liquidity
+        np.clip(
+            self.liquidity + 0.5 * (self.current_apy - ANCHOR_APY),
+            0.0,
+            1.0,
+            out=self.liquidity,
+        )
+
+        if self.replay is not None:
+            # Volatility: the next bar of each pool's replay window
+            self.volatility[:] = self._replay_vol[self.replay_start + self.step_count + 1]
+        else:
+            # Volatility: decreases when liquidity is high, plus noise
+            if self._noise_pos >= self._noise.shape[0]:
+                self._refill_noise()
+            vol_noise = self._noise[self._noise_pos]
+            self._noise_pos += 1
+            np.clip(
+                self.volatility - 0.1 * self.liquidity + vol_noise,
+                0.0,
+                1.0,
+                out=self.volatility,
+            )
+
+        np.subtract(
+            self.A * self.liquidity,
+            self.B * self.volatility,
+            out=self.last_rewards,
+        )
+        self.last_rewards -= self.C * self.current_apy
+        rewards = self.last_rewards.astype(np.float32)
+
+        self.step_count += 1
+        dones = self.step_count >= MAX_STEPS
+        self._write_obs()
+
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = False
+            self._reset_pools(dones)
+            self._write_obs()
+
+        return self._obs.copy(), rewards, dones, infos
+
+    def close(self) -> None:
+        pass
+
+    # -----------------------------
+    # VecEnv plumbing
+    # -----------------------------
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        value = getattr(self, attr_name)
+        indices = self._get_indices(indices)
+        if isinstance(value, np.ndarray) and value.shape[:1] == (self.num_envs,):
+            return [value[i] for i in indices]
+        return [value for _ in indices]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        current = getattr(self, attr_name)
+        if isinstance(current, np.ndarray) and current.shape[:1] == (self.num_envs,):
+            current[list(self._get_indices(indices))] = value
+        else:
+            # Scalar parameters (reward weights, APY bounds) are shared
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        if method_name not in self.POOL_METHODS:
+            raise AttributeError(
+                f"BatchedLiquidityEnv.env_method supports {', '.join(self.POOL_METHODS)}, not '{method_name}'"
+            )
+        results = []
+        for i in self._get_indices(indices):
+            if method_name == "get_state":
+                results.append(self.get_pool_state(i, *method_args, **method_kwargs))
+            elif method_name == "set_state":
+                results.append(self.set_pool_state(i, *method_args, **method_kwargs))
+            else:
+                print(
+                    f"[{i}] Step={self.step_count[i]} | "
+                    f"Liquidity={self.liquidity[i]:.3f}, "
+                    f"Volatility={self.volatility[i]:.3f}, "
+                    f"APY={self.current_apy[i]:.4f}"
+                )
+                results.append(None)
+        return results
+
+    def env_is_wrapped(self, wrapper_class, indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
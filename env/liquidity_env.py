@@ -1,8 +1,54 @@
-from typing import Tuple
+from typing import NamedTuple, Tuple
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 
+from env.market_replay import open_series
+
+
+# Action index -> APY change, shared by every LiquidityEnv implementation
+APY_DELTAS = np.array([-0.002, -0.001, 0.0, 0.001, 0.002])
+
+# "Neutral" APY level: above it liquidity flows in, below it flows out
+ANCHOR_APY = 0.05
+
+# Starting conditions of every episode: liquidity, volatility, APY
+INITIAL_STATE = (0.5, 0.2, 0.05)
+
+# Episode length in steps
+MAX_STEPS = 500
+
+# Std of the Gaussian volatility noise added every step
+VOL_NOISE_STD = 0.01
+
+# Noise values drawn per Generator call
+NOISE_BLOCK_SIZE = 1024
+
+
+class EnvState(NamedTuple):
+    """Everything a LiquidityEnv needs to continue an episode exactly."""
+
+    liquidity: float
+    volatility: float
+    current_apy: float
+    step_count: int
+    # bit_generator.state of the env's Generator
+    rng_state: dict
+    # Noise block being consumed (replaced on refill, never changed in place,
+    # so snapshots share it) and the position of the next value
+    noise: list
+    noise_pos: int
+    # Row of the replay series the episode started at (-1 without replay)
+    replay_start: int
+
+
+def make_observation_space(n_extra: int = 0) -> spaces.Box:
+    """[liquidity, volatility, current_apy] plus n_extra unbounded replayed series."""
+    return spaces.Box(
+        low=np.array([0.0, 0.0, 0.0] + [-np.inf] * n_extra, dtype=np.float32),
+        high=np.array([1.0, 1.0, 0.5] + [np.inf] * n_extra, dtype=np.float32),  # APY up to 50%
+    )
+
 
 class LiquidityEnv(gym.Env):
     """
@@ -28,18 +74,75 @@ class LiquidityEnv(gym.Env):
         - higher liquidity,
         - lower volatility,
         - lower cost of rewards (APY).
+
+    Fast path:
+        LiquidityEnv(fast_path=True) steps without NumPy dispatch: action
+        deltas come from a tuple, clamping uses min/max on Python floats, and
+        the observation is written into one preallocated buffer that every
+        reset()/step() returns. Callers that keep observations across steps
+        must copy them.
+
+    Noise:
+        Volatility noise comes from the env's own seeded Generator
+        (self.np_random) and is drawn NOISE_BLOCK_SIZE values at a time, then
+        consumed one per step. The stream for a given reset(seed=...) is the
+        same whatever the block size, so runs are reproducible per seed in any
+        process. pregenerate_episode=True draws a whole episode's noise at
+        every reset() instead.
+
+    Historical replay:
+        LiquidityEnv(replay=path_or_series) takes volatility from a
+        memory-mapped MarketSeries (env/market_replay.py) instead of the
+        synthetic rule plus noise. Every reset() starts at a random offset
+        drawn from self.np_random and the episode reads the following
+        MAX_STEPS + 1 bars in place. replay_columns=("return", ...) appends
+        those exogenous series to the observation.
+
+    Snapshots:
+        get_state() returns an EnvState (the dynamics state, the Generator
+        state and the position in the noise block) in a few microseconds;
+        set_state() puts an env back there, so the episode continues exactly
+        as it would have from the snapshot. env/simulate.py's branch()
+        expands one state into many action sequences at once.
+
+    Many pools:
+        env/multi_pool_env.py's MultiPoolLiquidityEnv steps a whole portfolio
+        with sparse cross-pool coupling; with one pool and no coupling it
+        reproduces this env exactly.
     """
 
     metadata = {"render_modes": ["human"]}
 
-    def __init__(self):
+    def __init__(
+        self,
+        fast_path: bool = False,
+        noise_block_size: int = NOISE_BLOCK_SIZE,
+        pregenerate_episode: bool = False,
+        replay=None,
+        replay_columns: Tuple[str, ...] = (),
+    ):
         super().__init__()
 
-        # Observation space: 3 continuous values
-        self.observation_space = spaces.Box(
-            low=np.array([0.0, 0.0, 0.0], dtype=np.float32),
-            high=np.array([1.0, 1.0, 0.5], dtype=np.float32),  # APY up to 50%
-        )
+        self.fast_path = fast_path
+        self.noise_block_size = noise_block_size
+        self.pregenerate_episode = pregenerate_episode
+        self._noise = []
+        self._noise_pos = 0
+        self._apy_deltas = tuple(float(d) for d in APY_DELTAS)
+
+        self.replay = None if replay is None else open_series(replay)
+        self.replay_columns = tuple(replay_columns)
+        if self.replay_columns and self.replay is None:
+            raise ValueError("replay_columns need a replay series")
+        for name in self.replay_columns:
+            self.replay.column(name)
+        self._replay_vol = None
+        self._replay_extra = []
+        self._replay_start = -1
+        self._obs = np.empty(3 + len(self.replay_columns), dtype=np.float32)
+
+        # Observation space: 3 continuous values, plus any replayed series
+        self.observation_space = make_observation_space(len(self.replay_columns))
 
         # Discrete action space with 5 actions
         self.action_space = spaces.Discrete(5)
@@ -59,20 +162,31 @@ class LiquidityEnv(gym.Env):
         # Standard Gymnasium reset pattern
         super().reset(seed=seed)
 
+        if self.replay is not None:
+            self._start_replay()
+        elif self.pregenerate_episode:
+            self._refill_noise(MAX_STEPS)
+        elif seed is not None:
+            # Drop noise drawn from the previous generator
+            self._noise = []
+            self._noise_pos = 0
+
         # Start from moderate conditions
-        self.liquidity = 0.5
-        self.volatility = 0.2
-        self.current_apy = 0.05  # 5%
+        self.liquidity, self.volatility, self.current_apy = INITIAL_STATE
+        if self.replay is not None:
+            self.volatility = float(self._replay_vol[0])
 
         self.step_count = 0
 
-        obs = np.array(
-            [self.liquidity, self.volatility, self.current_apy],
-            dtype=np.float32,
-        )
-        return obs, {}
+        if self.fast_path:
+            return self._write_obs(), {}
+
+        return self._make_obs(), {}
 
     def step(self, action: int):
+        if self.fast_path:
+            return self._fast_step(action)
+
         # Map action index to delta APY
         delta_map = {
             0: -0.002,  # -20 bp
@@ -92,18 +206,20 @@ class LiquidityEnv(gym.Env):
         # Simple toy market dynamics
         # -----------------------------
         # Higher APY -> more liquidity
-        # anchor_apy is a "neutral" level
-        anchor_apy = 0.05
-        liquidity_change = 0.5 * (self.current_apy - anchor_apy)
+        liquidity_change = 0.5 * (self.current_apy - ANCHOR_APY)
         self.liquidity = float(
             np.clip(self.liquidity + liquidity_change, 0.0, 1.0)
         )
 
-        # Volatility: decreases when liquidity is high, plus noise
-        vol_noise = np.random.normal(0.0, 0.01)
-        self.volatility = float(
-            np.clip(self.volatility - 0.1 * self.liquidity + vol_noise, 0.0, 1.0)
-        )
+        if self.replay is not None:
+            # Volatility: the next bar of the replayed market series
+            self.volatility = float(self._replay_vol[self.step_count + 1])
+        else:
+            # Volatility: decreases when liquidity is high, plus noise
+            vol_noise = self._next_noise()
+            self.volatility = float(
+                np.clip(self.volatility - 0.1 * self.liquidity + vol_noise, 0.0, 1.0)
+            )
 
         # Reward combines all three components
         reward = (
@@ -113,15 +229,112 @@ class LiquidityEnv(gym.Env):
         )
 
         self.step_count += 1
-        terminated = self.step_count >= 500  # episode ends after 500 steps
+        terminated = self.step_count >= MAX_STEPS
         truncated = False
 
+        obs = self._make_obs()
+        info = {}
+        return obs, reward, terminated, truncated, info
+
+    def _start_replay(self) -> None:
+        """Pick this episode's window of the replay series (views, no copies)."""
+        length = MAX_STEPS + 1
+        start = self.replay.sample_start(self.np_random, length)
+        self._set_replay_window(start)
+
+    def _set_replay_window(self, start: int) -> None:
+        length = MAX_STEPS + 1
+        self._replay_start = start
+        self._replay_vol = self.replay.column("volatility")[start:start + length]
+        self._replay_extra = [
+            self.replay.column(name)[start:start + length] for name in self.replay_columns
+        ]
+
+    def get_state(self) -> EnvState:
+        """Snapshot of the episode so far; see set_state()."""
+        return EnvState(
+            liquidity=self.liquidity,
+            volatility=self.volatility,
+            current_apy=self.current_apy,
+            step_count=self.step_count,
+            rng_state=self.np_random.bit_generator.state,
+            noise=self._noise,
+            noise_pos=self._noise_pos,
+            replay_start=self._replay_start,
+        )
+
+    def set_state(self, state: EnvState) -> np.ndarray:
+        """Continue from a get_state() snapshot; returns the observation there."""
+        self.liquidity = state.liquidity
+        self.volatility = state.volatility
+        self.current_apy = state.current_apy
+        self.step_count = state.step_count
+        self.np_random.bit_generator.state = state.rng_state
+        self._noise = state.noise
+        self._noise_pos = state.noise_pos
+        if self.replay is not None:
+            self._set_replay_window(state.replay_start)
+
+        if self.fast_path:
+            return self._write_obs()
+        return self._make_obs()
+
+    def _make_obs(self) -> np.ndarray:
         obs = np.array(
             [self.liquidity, self.volatility, self.current_apy],
             dtype=np.float32,
         )
-        info = {}
-        return obs, reward, terminated, truncated, info
+        if self._replay_extra:
+            extra = [column[self.step_count] for column in self._replay_extra]
+            obs = np.concatenate([obs, np.array(extra, dtype=np.float32)])
+        return obs
+
+    def _refill_noise(self, size: int = None) -> None:
+        self._noise = self.np_random.normal(
+            0.0, VOL_NOISE_STD, size or self.noise_block_size
+        ).tolist()
+        self._noise_pos = 0
+
+    def _next_noise(self) -> float:
+        if self._noise_pos >= len(self._noise):
+            self._refill_noise()
+        noise = self._noise[self._noise_pos]
+        self._noise_pos += 1
+        return noise
+
+    def _write_obs(self) -> np.ndarray:
+        obs = self._obs
+        obs[0] = self.liquidity
+        obs[1] = self.volatility
+        obs[2] = self.current_apy
+        for i, column in enumerate(self._replay_extra, start=3):
+            obs[i] = column[self.step_count]
+        return obs
+
+    def _fast_step(self, action: int):
+        """Same dynamics as step(), without per-step allocations."""
+        apy = self.current_apy + self._apy_deltas[int(action)]
+        apy = min(max(apy, self.min_apy), self.max_apy)
+
+        liquidity = self.liquidity + 0.5 * (apy - ANCHOR_APY)
+        liquidity = min(max(liquidity, 0.0), 1.0)
+
+        if self.replay is not None:
+            volatility = float(self._replay_vol[self.step_count + 1])
+        else:
+            volatility = self.volatility - 0.1 * liquidity + self._next_noise()
+            volatility = min(max(volatility, 0.0), 1.0)
+
+        self.current_apy = apy
+        self.liquidity = liquidity
+        self.volatility = volatility
+
+        reward = self.A * liquidity - self.B * volatility - self.C * apy
+
+        self.step_count += 1
+        terminated = self.step_count >= MAX_STEPS
+
+        return self._write_obs(), reward, terminated, False, {}
 
     def render(self):
         # Simple print for debugging
@@ -0,0 +1,113 @@
+"""
+Memory-mapped market series for historical replay.
+
+A series is a directory holding one raw float32 file per column
+(volatility, plus optional exogenous columns such as return or price), the
+end offset of every segment (one segment per source CSV, so an episode
+never spans two symbols) and a meta.json with the column names and the
+volatility scale. scripts/build_market_series.py builds it once from
+downloaded bar CSVs; MarketSeries maps it read-only, so opening millions of
+bars is instant and episode windows are views, never copies.
+"""
+import json
+import os
+
+import numpy as np
+
+META_FILE = "meta.json"
+OFFSETS_FILE = "offsets.i64"
+SERIES_DTYPE = np.float32
+
+
+def _column_file(name: str) -> str:
+    return f"{name}.{np.dtype(SERIES_DTYPE).str.lstrip('<>|=')}"
+
+
+def write_series(path: str, segments, meta: dict = None) -> int:
+    """
+    Write segments (a list of {column: 1-D array}, all with the same columns
+    and a "volatility" one) as a new series at path. Returns the row count.
+    """
+    if not segments:
+        raise ValueError("No segments to write")
+    columns = list(segments[0])
+    if "volatility" not in columns:
+        raise ValueError("Every segment needs a 'volatility' column")
+
+    os.makedirs(path, exist_ok=True)
+    ends = []
+    total = 0
+    files = {name: open(os.path.join(path, _column_file(name)), "wb") for name in columns}
+    try:
+        for segment in segments:
+            lengths = {len(segment[name]) for name in columns}
+            if len(lengths) != 1:
+                raise ValueError(f"Segment columns have different lengths: {sorted(lengths)}")
+            for name in columns:
+                np.asarray(segment[name], dtype=SERIES_DTYPE).tofile(files[name])
+            total += lengths.pop()
+            ends.append(total)
+    finally:
+        for f in files.values():
+            f.close()
+
+    np.array(ends, dtype=np.int64).tofile(os.path.join(path, OFFSETS_FILE))
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump({"columns": columns, "dtype": np.dtype(SERIES_DTYPE).str, **(meta or {})}, f, indent=2)
+    return total
+
+
+class MarketSeries:
+    """Read-only, memory-mapped view of a series written by write_series()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+
+        ends = np.fromfile(os.path.join(path, OFFSETS_FILE), dtype=np.int64)
+        self.offsets = np.concatenate([[0], ends]).astype(np.int64)
+        self._columns = {
+            name: np.memmap(
+                os.path.join(path, _column_file(name)),
+                dtype=SERIES_DTYPE,
+                mode="r",
+                shape=(self.n_rows,),
+            )
+            for name in self.columns
+        }
+        # Cumulative count of valid episode starts per segment, by window length
+        self._starts = {}
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.offsets[-1])
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.offsets) - 1
+
+    def column(self, name: str) -> np.ndarray:
+        """One column over every segment back to back, memory-mapped."""
+        if name not in self._columns:
+            raise KeyError(f"{self.path} has no column '{name}' (columns: {self.columns})")
+        return self._columns[name]
+
+    def sample_start(self, rng: np.random.Generator, length: int) -> int:
+        """Row where a window of length bars starts, uniform over all windows."""
+        if length not in self._starts:
+            valid = np.maximum(np.diff(self.offsets) - length + 1, 0)
+            if valid.sum() == 0:
+                raise ValueError(f"No segment of {self.path} holds {length} bars")
+            self._starts[length] = (valid, np.cumsum(valid))
+        valid, cumulative = self._starts[length]
+
+        k = int(rng.integers(cumulative[-1]))
+        segment = int(np.searchsorted(cumulative, k, side="right"))
+        return int(self.offsets[segment] + k - (cumulative[segment] - valid[segment]))
+
+
+def open_series(replay) -> MarketSeries:
+    """A MarketSeries from either an open series or its path."""
+    return replay if isinstance(replay, MarketSeries) else MarketSeries(replay)
@@ -0,0 +1,221 @@
+from typing import NamedTuple, Optional
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+
+from env.liquidity_env import (
+    APY_DELTAS,
+    INITIAL_STATE,
+    MAX_STEPS,
+    NOISE_BLOCK_SIZE,
+    VOL_NOISE_STD,
+    LiquidityEnv,
+)
+from env.simulate import advance
+
+
+class PoolCoupling(NamedTuple):
+    """
+    Sparse [n_pools, n_pools] matrix as a list of edges: entry
+    (target[k], source[k]) is weight[k]. Edges are sorted by target;
+    row_sum caches the sum of every row (built by make_coupling).
+    """
+
+    target: np.ndarray
+    source: np.ndarray
+    weight: np.ndarray
+    row_sum: Optional[np.ndarray] = None
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.weight)
+
+    def dot(self, x: np.ndarray, n_pools: int) -> np.ndarray:
+        """Matrix-vector product, O(n_pools + n_edges)."""
+        return np.bincount(self.target, weights=self.weight * x[self.source], minlength=n_pools)
+
+    def flow(self, x: np.ndarray, n_pools: int) -> np.ndarray:
+        """sum_j matrix[i, j] * (x[i] - x[j]) for every i, O(n_pools + n_edges)."""
+        row_sum = self.row_sum
+        if row_sum is None:
+            row_sum = np.bincount(self.target, weights=self.weight, minlength=n_pools)
+        return row_sum * x - self.dot(x, n_pools)
+
+
+def make_coupling(matrix, n_pools: int) -> PoolCoupling:
+    """
+    PoolCoupling from None (no coupling), a PoolCoupling, a (target, source,
+    weight) triple of arrays, a dense [n_pools, n_pools] array or any sparse
+    matrix with a .tocoo() method (e.g. scipy.sparse).
+    """
+    if matrix is None:
+        target = source = np.zeros(0, dtype=np.int64)
+        weight = np.zeros(0)
+    elif hasattr(matrix, "tocoo"):
+        coo = matrix.tocoo()
+        target, source, weight = coo.row, coo.col, coo.data
+    elif isinstance(matrix, tuple):
+        target, source, weight = matrix[:3]
+    else:
+        dense = np.asarray(matrix, dtype=np.float64)
+        if dense.shape != (n_pools, n_pools):
+            raise ValueError(f"Coupling matrix has shape {dense.shape}, expected {(n_pools, n_pools)}")
+        target, source = np.nonzero(dense)
+        weight = dense[target, source]
+
+    target = np.asarray(target, dtype=np.int64)
+    source = np.asarray(source, dtype=np.int64)
+    weight = np.asarray(weight, dtype=np.float64)
+    if not len(target) == len(source) == len(weight):
+        raise ValueError("Coupling target, source and weight need the same length")
+    if len(target) and (min(target.min(), source.min()) < 0 or max(target.max(), source.max()) >= n_pools):
+        raise ValueError(f"Coupling edges must connect pools 0 .. {n_pools - 1}")
+
+    order = np.argsort(target, kind="stable")
+    target, source, weight = target[order], source[order], weight[order]
+    return PoolCoupling(target, source, weight, np.bincount(target, weights=weight, minlength=n_pools))
+
+
+def random_coupling(n_pools: int, degree: int = 4, weight: float = 0.01, seed: Optional[int] = None) -> PoolCoupling:
+    """Every pool coupled to `degree` random other pools, weight / degree per edge."""
+    rng = np.random.default_rng(seed)
+    target = np.repeat(np.arange(n_pools), degree)
+    # Offsets 1 .. n_pools - 1 never point a pool at itself
+    source = (target + rng.integers(1, max(n_pools, 2), size=len(target))) % n_pools
+    return make_coupling((target, source, np.full(len(target), weight / degree)), n_pools)
+
+
+class MultiPoolLiquidityEnv(gym.Env):
+    """
+    A portfolio of liquidity pools stepped together, with sparse coupling.
+
+    State (observation):
+        [n_pools, 3] array, one LiquidityEnv observation
+        [liquidity, volatility, current_apy] per pool.
+
+    Actions:
+        MultiDiscrete([5] * n_pools): one APY move per pool, mapped through
+        APY_DELTAS like LiquidityEnv's action. Any single-pool policy can
+        drive the portfolio: model.predict(obs) on the [n_pools, 3]
+        observation returns exactly such an action vector.
+
+    Dynamics, per pool i, on top of the LiquidityEnv rules:
+        liquidity  += sum_j migration[i, j] * (apy_i - apy_j)
+            liquidity moves towards pools paying more than their neighbours
+            (in units of each pool's own capacity)
+        volatility += sum_j spillover[i, j] * volatility_j
+            a share of the neighbours' previous volatility spills over
+    Both matrices are sparse (see make_coupling), so a step costs
+    O(n_pools + n_edges). The step itself is env.simulate.advance() with
+    these two terms switched on. Volatility noise is drawn from the env's
+    seeded Generator, noise_block_size values per call, pools in order.
+
+    Reward:
+        The sum of the per-pool LiquidityEnv rewards; last_rewards holds the
+        per-pool values of the latest step.
+
+    With n_pools=1 and no coupling this is LiquidityEnv: after
+    reset(seed=s) both draw the same noise, and observations (as obs[0])
+    and rewards match step for step.
+    """
+
+    metadata = {"render_modes": ["human"]}
+
+    def __init__(
+        self,
+        n_pools: int = 1,
+        migration=None,
+        spillover=None,
+        noise_block_size: int = NOISE_BLOCK_SIZE,
+    ):
+        super().__init__()
+
+        self.n_pools = n_pools
+        self.migration = make_coupling(migration, n_pools)
+        self.spillover = make_coupling(spillover, n_pools)
+
+        # Market parameters are shared by every pool
+        template = LiquidityEnv()
+        self.min_apy = template.min_apy
+        self.max_apy = template.max_apy
+        self.A = template.A
+        self.B = template.B
+        self.C = template.C
+
+        single = template.observation_space
+        self.observation_space = spaces.Box(
+            low=np.tile(single.low, (n_pools, 1)),
+            high=np.tile(single.high, (n_pools, 1)),
+            dtype=np.float32,
+        )
+        self.action_space = spaces.MultiDiscrete(np.full(n_pools, len(APY_DELTAS)))
+
+        # Per-pool state
+        self.liquidity = np.empty(n_pools, dtype=np.float64)
+        self.volatility = np.empty(n_pools, dtype=np.float64)
+        self.current_apy = np.empty(n_pools, dtype=np.float64)
+        self.last_rewards = np.zeros(n_pools, dtype=np.float64)
+        self.step_count = 0
+        self._obs = np.empty((n_pools, 3), dtype=np.float32)
+
+        # Noise block laid out [step, pool]; whole steps per Generator call
+        self._noise_rows = max(1, noise_block_size // n_pools)
+        self._noise = np.empty((0, n_pools))
+        self._noise_pos = 0
+
+        self.reset()
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if seed is not None:
+            # Drop noise drawn from the previous generator
+            self._noise = np.empty((0, self.n_pools))
+            self._noise_pos = 0
+
+        liquidity, volatility, apy = INITIAL_STATE
+        self.liquidity.fill(liquidity)
+        self.volatility.fill(volatility)
+        self.current_apy.fill(apy)
+        self.step_count = 0
+        return self._write_obs(), {}
+
+    def _next_noise(self) -> np.ndarray:
+        if self._noise_pos >= len(self._noise):
+            self._noise = self.np_random.normal(0.0, VOL_NOISE_STD, (self._noise_rows, self.n_pools))
+            self._noise_pos = 0
+        noise = self._noise[self._noise_pos]
+        self._noise_pos += 1
+        return noise
+
+    def _write_obs(self) -> np.ndarray:
+        self._obs[:, 0] = self.liquidity
+        self._obs[:, 1] = self.volatility
+        self._obs[:, 2] = self.current_apy
+        return self._obs.copy()
+
+    def step(self, action):
+        actions = np.asarray(action, dtype=np.int64).reshape(self.n_pools)
+        self.last_rewards[:] = advance(
+            self.liquidity,
+            self.volatility,
+            self.current_apy,
+            APY_DELTAS[actions],
+            self._next_noise(),
+            env=self,
+            # Uncoupled portfolios skip the coupling terms entirely
+            migration=self.migration if self.migration.n_edges else None,
+            spillover=self.spillover if self.spillover.n_edges else None,
+        )
+
+        self.step_count += 1
+        terminated = self.step_count >= MAX_STEPS
+        return self._write_obs(), float(self.last_rewards.sum()), terminated, False, {}
+
+    def render(self):
+        print(
+            f"Step={self.step_count} | pools={self.n_pools} | "
+            f"mean Liquidity={self.liquidity.mean():.3f}, "
+            f"mean Volatility={self.volatility.mean():.3f}, "
+            f"mean APY={self.current_apy.mean():.4f}"
+        )
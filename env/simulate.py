@@ -0,0 +1,191 @@
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+from gymnasium.utils import seeding
+
+from env.liquidity_env import (
+    ANCHOR_APY,
+    APY_DELTAS,
+    INITIAL_STATE,
+    MAX_STEPS,
+    VOL_NOISE_STD,
+    EnvState,
+    LiquidityEnv,
+)
+
+
+def noise_matrix(seeds: Sequence[Optional[int]], n_steps: int) -> np.ndarray:
+    """
+    Volatility noise for len(seeds) episodes, shape [N, n_steps].
+
+    Row i is the stream LiquidityEnv draws after reset(seed=seeds[i]).
+    """
+    noise = np.empty((len(seeds), n_steps), dtype=np.float64)
+    for i, seed in enumerate(seeds):
+        rng, _ = seeding.np_random(seed)
+        noise[i] = rng.normal(0.0, VOL_NOISE_STD, n_steps)
+    return noise
+
+
+def advance(
+    liquidity: np.ndarray,
+    volatility: np.ndarray,
+    apy: np.ndarray,
+    deltas: np.ndarray,
+    noise=None,
+    next_volatility=None,
+    *,
+    env: LiquidityEnv,
+    migration=None,
+    spillover=None,
+) -> np.ndarray:
+    """
+    One step of the LiquidityEnv dynamics on arrays of states, in place.
+
+    deltas (APY changes) and noise broadcast against the state arrays. With
+    next_volatility (replay), volatility is set to it instead of following
+    the synthetic rule. env supplies the APY bounds and reward weights.
+    Returns the rewards of the step.
+
+    migration and spillover couple the entries of 1-d state arrays (one
+    entry per pool), as sparse matrices with the PoolCoupling interface of
+    env/multi_pool_env.py; see MultiPoolLiquidityEnv for the terms they add.
+    """
+    n_pools = len(liquidity) if migration is not None or spillover is not None else None
+    # Neighbours' volatility before this step's update
+    spilled = None if spillover is None else spillover.dot(volatility, n_pools)
+
+    np.clip(apy + deltas, env.min_apy, env.max_apy, out=apy)
+    inflow = 0.5 * (apy - ANCHOR_APY)
+    if migration is not None:
+        inflow += migration.flow(apy, n_pools)
+    np.clip(liquidity + inflow, 0.0, 1.0, out=liquidity)
+    if next_volatility is None:
+        drift = volatility - 0.1 * liquidity + noise
+        if spilled is not None:
+            drift += spilled
+        np.clip(drift, 0.0, 1.0, out=volatility)
+    else:
+        volatility[...] = next_volatility
+    return env.A * liquidity - env.B * volatility - env.C * apy
+
+
+def simulate(
+    actions: np.ndarray,
+    seeds: Union[None, int, Sequence[Optional[int]]] = None,
+    env: Optional[LiquidityEnv] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Run N fixed action schedules of T steps through the LiquidityEnv dynamics.
+
+    :param actions: integer action indices, shape [N, T] (or [T] for one run),
+        T <= MAX_STEPS since every episode ends after MAX_STEPS steps.
+    :param seeds: one seed per schedule, a base seed (schedule i uses
+        seed + i) or None for fresh entropy. Schedule i then follows exactly
+        the trajectory of LiquidityEnv().reset(seed=seeds[i]).
+    :param env: LiquidityEnv whose APY bounds and reward weights are used
+        (defaults to a fresh LiquidityEnv()).
+    :return: dict of [N, T] arrays "liquidity", "volatility", "apy", "reward",
+        holding the state after each step, like the observations of env.step.
+    """
+    actions = np.asarray(actions, dtype=np.int64)
+    if actions.ndim == 1:
+        actions = actions[None, :]
+    n_runs, n_steps = actions.shape
+    if n_steps > MAX_STEPS:
+        raise ValueError(f"Schedules longer than {MAX_STEPS} steps run past the end of an episode")
+
+    if seeds is None or isinstance(seeds, (int, np.integer)):
+        seeds = [None if seeds is None else int(seeds) + i for i in range(n_runs)]
+    if len(seeds) != n_runs:
+        raise ValueError(f"Got {len(seeds)} seeds for {n_runs} schedules")
+
+    if env is None:
+        env = LiquidityEnv()
+
+    noise = noise_matrix(seeds, n_steps)
+    deltas = APY_DELTAS[actions]
+
+    liquidity = np.full(n_runs, INITIAL_STATE[0])
+    volatility = np.full(n_runs, INITIAL_STATE[1])
+    apy = np.full(n_runs, INITIAL_STATE[2])
+
+    out = {
+        name: np.empty((n_runs, n_steps), dtype=np.float64)
+        for name in ("liquidity", "volatility", "apy", "reward")
+    }
+
+    # Advance every schedule one step at a time, all in one NumPy call
+    for t in range(n_steps):
+        out["reward"][:, t] = advance(liquidity, volatility, apy, deltas[:, t], noise[:, t], env=env)
+        out["liquidity"][:, t] = liquidity
+        out["volatility"][:, t] = volatility
+        out["apy"][:, t] = apy
+
+    return out
+
+
+def future_noise(state: EnvState, n_steps: int) -> np.ndarray:
+    """
+    The next n_steps noise values an env at state would draw: the rest of its
+    noise block, then fresh draws from a copy of its Generator.
+    """
+    buffered = np.asarray(state.noise[state.noise_pos:state.noise_pos + n_steps], dtype=np.float64)
+    if len(buffered) == n_steps:
+        return buffered
+    rng = np.random.Generator(getattr(np.random, state.rng_state["bit_generator"])())
+    rng.bit_generator.state = state.rng_state
+    return np.concatenate([buffered, rng.normal(0.0, VOL_NOISE_STD, n_steps - len(buffered))])
+
+
+def branch(
+    env: LiquidityEnv,
+    action_sequences: np.ndarray,
+    state: Optional[EnvState] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Expand one env state into K children, one per action sequence, in a
+    single vectorized rollout. env itself is left untouched.
+
+    Every child sees the noise (or replayed bars) env would meet next, so
+    children differ only by their actions and child k matches stepping a
+    copy of env through action_sequences[k].
+
+    :param env: LiquidityEnv providing the dynamics parameters and, unless
+        state is given, the state to branch from (env.get_state()).
+    :param action_sequences: integer actions, shape [K, H] (or [H]). Steps
+        past the end of the episode are dropped.
+    :return: dict of [K, H'] arrays "liquidity", "volatility", "apy",
+        "reward" with H' = min(H, MAX_STEPS - state.step_count).
+    """
+    state = env.get_state() if state is None else state
+    actions = np.asarray(action_sequences, dtype=np.int64)
+    if actions.ndim == 1:
+        actions = actions[None, :]
+    n_children = len(actions)
+    n_steps = min(actions.shape[1], MAX_STEPS - state.step_count)
+    deltas = APY_DELTAS[actions[:, :n_steps]]
+
+    if env.replay is not None:
+        first = state.replay_start + state.step_count + 1
+        replayed = env.replay.column("volatility")[first:first + n_steps].astype(np.float64)
+    else:
+        noise = future_noise(state, n_steps)
+
+    liquidity = np.full(n_children, state.liquidity)
+    volatility = np.full(n_children, state.volatility)
+    apy = np.full(n_children, state.current_apy)
+    out = {
+        name: np.empty((n_children, n_steps), dtype=np.float64)
+        for name in ("liquidity", "volatility", "apy", "reward")
+    }
+    for t in range(n_steps):
+        if env.replay is not None:
+            out["reward"][:, t] = advance(liquidity, volatility, apy, deltas[:, t], next_volatility=replayed[t], env=env)
+        else:
+            out["reward"][:, t] = advance(liquidity, volatility, apy, deltas[:, t], noise[t], env=env)
+        out["liquidity"][:, t] = liquidity
+        out["volatility"][:, t] = volatility
+        out["apy"][:, t] = apy
+
+    return out
@@ -0,0 +1,204 @@
+"""
+Periodic evaluation and checkpointing that never stalls PPO data collection.
+
+AsyncEvalCallback copies the actor weights every eval_freq timesteps (a few
+KB, microseconds) and queues them for a background process (rl/eval_worker.py),
+which rebuilds the policy as a NumpyPolicy, runs seeded evaluation episodes
+at the lowest CPU priority and appends the scores to a CSV learning curve.
+The worker is a plain NumPy subprocess, started and warmed up before
+training begins, and training never waits on an evaluation. Every
+checkpoint_freq timesteps the model is saved to checkpoint_dir atomically,
+keeping only the newest keep_checkpoints files; latest_checkpoint() finds
+the one train_ppo --resume continues from.
+"""
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+from env.liquidity_env import MAX_STEPS
+from env.market_replay import MarketSeries
+from rl.eval_worker import encode_snapshot
+from rl.numpy_policy import policy_arrays
+
+# Repository root, put on the worker's import path
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECKPOINT_PREFIX = "ppo_liquidity"
+_CHECKPOINT_RE = re.compile(rf"^{CHECKPOINT_PREFIX}_(\d+)_steps\.zip$")
+
+
+def checkpoint_path(directory: str, timesteps: int) -> str:
+    return os.path.join(directory, f"{CHECKPOINT_PREFIX}_{timesteps}_steps.zip")
+
+
+def list_checkpoints(directory: str) -> list:
+    """(timesteps, path) of every checkpoint in directory, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = _CHECKPOINT_RE.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def latest_checkpoint(directory: str):
+    """Path of the newest checkpoint in directory, or None."""
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1][1] if checkpoints else None
+
+
+def save_checkpoint(model, directory: str, keep: int = 3) -> str:
+    """Save model atomically, then delete all but the newest keep checkpoints."""
+    os.makedirs(directory, exist_ok=True)
+    path = checkpoint_path(directory, model.num_timesteps)
+
+    # Write to a temp file first so a crash never leaves a truncated checkpoint
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        model.save(f)
+    os.replace(tmp_path, path)
+
+    for _, old_path in list_checkpoints(directory)[:-keep]:
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass
+    return path
+
+
+class BackgroundEvaluator:
+    """A worker process scoring policy snapshots off the training process."""
+
+    def __init__(self, log_path: str, n_episodes: int = 10, seed: int = 0,
+                 max_steps: int = MAX_STEPS, env_kwargs: dict = None):
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        env_kwargs = dict(env_kwargs or {})
+        if isinstance(env_kwargs.get("replay"), MarketSeries):
+            # The worker maps the series itself; only the path is sent
+            env_kwargs["replay"] = env_kwargs["replay"].path
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT, env.get("PYTHONPATH")]))
+        self._process = subprocess.Popen(
+            [
+                sys.executable, "-m", "rl.eval_worker",
+                "--log-path", log_path,
+                "--n-episodes", str(n_episodes),
+                "--seed", str(seed),
+                "--max-steps", str(max_steps),
+                "--env-kwargs", json.dumps(env_kwargs),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+        # Warm up before training starts: wait until the worker has imported
+        # everything, so its start-up never runs alongside learn()
+        if self._process.stdout.readline().strip() != b"ready":
+            raise RuntimeError(f"Evaluation worker exited during start-up (code {self._process.wait()})")
+
+        # Unbounded: put() never blocks the trainer, even when the worker
+        # (at the lowest priority) falls behind and the pipe is full
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_snapshots, daemon=True)
+        self._writer.start()
+
+    def _write_snapshots(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            self._process.stdin.write(frame)
+            self._process.stdin.flush()
+        self._process.stdin.close()
+
+    def submit(self, timesteps: int, arrays: dict) -> None:
+        self._queue.put(encode_snapshot(timesteps, arrays))
+
+    def close(self) -> None:
+        """Wait for the queued evaluations to finish, then stop the worker."""
+        self._queue.put(None)
+        self._writer.join()
+        self._process.wait()
+
+
+class AsyncEvalCallback(BaseCallback):
+    """
+    Queue an evaluation every eval_freq timesteps and write a checkpoint every
+    checkpoint_freq timesteps (0 disables either).
+
+    The evaluator process starts, and finishes starting, with the callback,
+    so its start-up is not paid inside learn(). The final policy is queued when training ends;
+    close() waits for every queued evaluation to be written.
+    """
+
+    def __init__(
+        self,
+        eval_freq: int,
+        log_path: str,
+        checkpoint_freq: int = 0,
+        checkpoint_dir: str = None,
+        keep_checkpoints: int = 3,
+        n_episodes: int = 10,
+        seed: int = 0,
+        env_kwargs: dict = None,
+        verbose: int = 0,
+    ):
+        super().__init__(verbose)
+        self.eval_freq = eval_freq
+        self.log_path = log_path
+        self.checkpoint_freq = checkpoint_freq
+        self.checkpoint_dir = checkpoint_dir
+        self.keep_checkpoints = keep_checkpoints
+        self.n_episodes = n_episodes
+        self.seed = seed
+        self.env_kwargs = env_kwargs or {}
+        self._last_eval = None
+        self.evaluator = None
+        if eval_freq > 0:
+            self.evaluator = BackgroundEvaluator(log_path, n_episodes, seed, env_kwargs=self.env_kwargs)
+
+    @staticmethod
+    def _next_multiple(timesteps: int, freq: int) -> int:
+        return (timesteps // freq + 1) * freq
+
+    def _on_training_start(self) -> None:
+        # Continue the schedule where a resumed run left off
+        if self.eval_freq > 0:
+            self._next_eval = self._next_multiple(self.num_timesteps, self.eval_freq)
+        if self.checkpoint_freq > 0:
+            self._next_checkpoint = self._next_multiple(self.num_timesteps, self.checkpoint_freq)
+
+    def _submit_eval(self) -> None:
+        self.evaluator.submit(self.num_timesteps, policy_arrays(self.model.policy))
+        self._last_eval = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        if self.eval_freq > 0 and self.num_timesteps >= self._next_eval:
+            self._submit_eval()
+            self._next_eval = self._next_multiple(self.num_timesteps, self.eval_freq)
+
+        if self.checkpoint_freq > 0 and self.num_timesteps >= self._next_checkpoint:
+            path = save_checkpoint(self.model, self.checkpoint_dir, self.keep_checkpoints)
+            self._next_checkpoint = self._next_multiple(self.num_timesteps, self.checkpoint_freq)
+            if self.verbose:
+                print(f"Saved checkpoint {path}")
+        return True
+
+    def _on_training_end(self) -> None:
+        if self.evaluator is not None and self._last_eval != self.num_timesteps:
+            self._submit_eval()
+
+    def close(self) -> None:
+        """Finish the queued evaluations and stop the evaluator."""
+        if self.evaluator is not None:
+            self.evaluator.close()
+            self.evaluator = None
@@ -2,22 +2,14 @@ import sys
 sys.path.append("/content/rl-liquidity-project")
 
 import numpy as np
-from stable_baselines3 import PPO
-from env.liquidity_env import LiquidityEnv
+from env.simulate import simulate
+from rl.episode_runner import collect_episode, run_episodes_batched
+from rl.inference_server import load_shared_policy
+from rl.tournament import TournamentStats
 
 
 def run_episode_with_model(model, env, max_steps=500):
-    obs, info = env.reset()
-    total_reward = 0.0
-
-    for _ in range(max_steps):
-        action, _ = model.predict(obs, deterministic=True)
-        obs, reward, terminated, truncated, info = env.step(int(action))
-        total_reward += reward
-        if terminated or truncated:
-            break
-
-    return total_reward
+    return float(collect_episode(model, env, max_steps=max_steps)["reward"].sum())
 
 
 def rule_based_policy(obs):
@@ -37,46 +29,60 @@ def rule_based_policy(obs):
         return 2  # 0 bp
 
 
+class RuleBasedPolicy:
+    """rule_based_policy for observation batches, with the model.predict() signature."""
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(observation)
+        liquidity = obs.reshape(-1, 3)[:, 0]
+        actions = np.where(liquidity < 0.4, 4, np.where(liquidity > 0.6, 1, 2))
+        return (actions[0] if obs.ndim == 1 else actions), None
+
+
 def run_episode_with_rule(env, max_steps=500):
-    obs, info = env.reset()
-    total_reward = 0.0
+    return run_episode_with_model(RuleBasedPolicy(), env, max_steps=max_steps)
+
 
-    for _ in range(max_steps):
-        action = rule_based_policy(obs)
-        obs, reward, terminated, truncated, info = env.step(int(action))
-        total_reward += reward
-        if terminated or truncated:
-            break
+def rule_based_schedule(max_steps=500):
+    """
+    Action sequence of rule_based_policy over one episode.
 
-    return total_reward
+    Liquidity only depends on the APY path, never on the volatility noise, so
+    the rule policy takes the same actions in every episode and can be scored
+    open-loop with simulate().
+    """
+    return collect_episode(RuleBasedPolicy(), max_steps=max_steps)["action"]
 
 
 def main():
     # Load trained PPO model
     model_path = "rl/models/ppo_liquidity"
-    model = PPO.load(model_path)
+    model = load_shared_policy(model_path)
 
     n_episodes = 10
-    rl_rewards = []
-    rule_rewards = []
-
-    for i in range(n_episodes):
-        # New env for each run to avoid state carryover
-        env_rl = LiquidityEnv()
-        env_rule = LiquidityEnv()
+    # Both policies play episodes seeded seed .. seed + n_episodes - 1, so
+    # episode i sees the same volatility noise under either policy
+    seed = 0
 
-        rl_total = run_episode_with_model(model, env_rl)
-        rule_total = run_episode_with_rule(env_rule)
+    # All RL episodes in lockstep, one batched predict per timestep
+    rl_rewards = run_episodes_batched(model, n_episodes, seed=seed)["total_reward"]
 
-        rl_rewards.append(rl_total)
-        rule_rewards.append(rule_total)
+    # All rule-based episodes in one batched simulation
+    schedule = rule_based_schedule()
+    rule_rewards = simulate(np.tile(schedule, (n_episodes, 1)), seeds=seed)["reward"].sum(axis=1)
 
-        print(f"Episode {i+1}: RL reward = {rl_total:.3f}, Rule reward = {rule_total:.3f}")
+    for i in range(n_episodes):
+        print(f"Episode {i+1}: RL reward = {rl_rewards[i]:.3f}, Rule reward = {rule_rewards[i]:.3f}")
 
     print("=====================================")
     print(f"RL mean total reward   : {np.mean(rl_rewards):.3f} ± {np.std(rl_rewards):.3f}")
     print(f"Rule mean total reward : {np.mean(rule_rewards):.3f} ± {np.std(rule_rewards):.3f}")
 
+    stats = TournamentStats(["RL", "Rule"])
+    stats.update(np.stack([rl_rewards, rule_rewards]))
+    diff = stats.diffs.mean[0, 1]
+    print(f"RL - Rule (paired)     : {diff:+.3f} ± {stats.diffs.ci95()[0, 1]:.3f} (95% CI)")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,284 @@
+"""
+Finite-horizon value iteration for the optimal LiquidityEnv policy on a grid.
+
+    python -m rl.dp_solver --out rl/models/dp_policy.npz --grid 51 26 231
+    python -m rl.tournament --policies dp ppo rule
+
+The state [liquidity, volatility, current_apy] is bounded and 3-dimensional,
+there are 5 actions and the dynamics are known, so the optimal policy can be
+computed instead of learned. solve() discretizes the state on a grid (the
+default APY axis is the 0.1% lattice the APY actually moves on), integrates
+the Gaussian volatility noise with Gauss-Hermite quadrature and runs the
+MAX_STEPS-step episode backwards, one whole-grid NumPy pass per step:
+
+- An action moves APY and liquidity deterministically; only the volatility
+  update clip(volatility - 0.1 * liquidity + noise) is random. The expected
+  value of each post-decision state (next liquidity, next APY, volatility
+  before noise) is therefore one matmul along the volatility axis.
+- The value of an action at a grid node interpolates that post-decision
+  value linearly at its successor. Post-decision volatility shares the
+  volatility spacing, so every node of a volatility row shifts by the same
+  amount and the interpolation reads whole contiguous rows.
+
+Far from the end of the episode the greedy policy stops changing and every
+value grows by the same gain per step. Once the action table is unchanged
+and the per-step value increment is flat to SPAN_TOLERANCE, the remaining
+steps reuse that table and the values are extrapolated, which skips most of
+the 500 backward steps.
+
+The saved .npz holds:
+    table   the step-0 action table, readable by TabulatedPolicy.load() as a
+            stationary policy
+    tables  the distinct per-step action tables, and steps, the index into
+            them for each step of the episode; DPPolicy plays them in order
+    values  the optimal expected return from every grid node at step 0, up
+            to discretization error
+    low, high
+            the grid corners (as in rl/tabulate_policy.py)
+Tables are indexed [liquidity, volatility, apy] like the observation.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from env.liquidity_env import ANCHOR_APY, APY_DELTAS, INITIAL_STATE, MAX_STEPS, VOL_NOISE_STD, LiquidityEnv
+from rl.tabulate_policy import grid_bounds
+
+# Grid nodes per axis: liquidity, volatility, APY (231 = the 0.1% APY lattice).
+# Volatility only enters the reward linearly, so a coarse axis costs nothing
+# measurable: 51 volatility nodes take twice as long for the same policy.
+GRID_SHAPE = (51, 26, 231)
+
+# Gauss-Hermite nodes for the volatility noise
+N_QUADRATURE = 7
+
+# Stop iterating once the per-step value increment varies by less than this
+# across the grid (and the action table no longer changes)
+SPAN_TOLERANCE = 1e-9
+
+# Actions whose values are this close count as tied and the lowest index
+# wins, so rounding noise never flips the table between equivalent actions
+TIE_TOLERANCE = 1e-9
+
+# Interpolation coordinates this close to a node are snapped onto it, so
+# successors on the grid lattice read a single node
+SNAP_TOLERANCE = 1e-9
+
+
+def noise_quadrature(n: int = N_QUADRATURE):
+    """Nodes and weights with sum(w * f(x)) ~ E[f(noise)], noise ~ N(0, VOL_NOISE_STD**2)."""
+    z, w = np.polynomial.hermite_e.hermegauss(n)
+    return VOL_NOISE_STD * z, w / w.sum()
+
+
+def _linear_weights(x, low: float, step: float, n: int):
+    """Lower node index and upper node weight of x on a regular n-node axis."""
+    coords = np.clip((np.asarray(x) - low) / step, 0, n - 1)
+    nearest = np.rint(coords)
+    coords = np.where(np.abs(coords - nearest) < SNAP_TOLERANCE, nearest, coords)
+    base = np.minimum(np.floor(coords).astype(np.intp), n - 2)
+    return base, coords - base
+
+
+class DPSolution:
+    """Per-step action tables and step-0 values of a solved grid."""
+
+    def __init__(self, tables: np.ndarray, steps: np.ndarray, values: np.ndarray, low, high,
+                 converged_at: int = 0):
+        self.tables = np.asarray(tables, dtype=np.uint8)
+        self.steps = np.asarray(steps, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        # Steps before this one reuse its table (0: iterated all the way)
+        self.converged_at = converged_at
+
+    def value(self, observation) -> float:
+        """Optimal expected return of an episode starting at observation (trilinear)."""
+        shape = self.values.shape
+        obs = np.asarray(observation, dtype=np.float64)[:3]
+        weights = [
+            _linear_weights(obs[i], self.low[i], (self.high[i] - self.low[i]) / (shape[i] - 1), shape[i])
+            for i in range(3)
+        ]
+        total = 0.0
+        for corner in range(8):
+            offset = [(corner >> 2) & 1, (corner >> 1) & 1, corner & 1]
+            weight = np.prod([frac if o else 1.0 - frac for o, (_, frac) in zip(offset, weights)])
+            total += weight * self.values[tuple(base + o for o, (base, _) in zip(offset, weights))]
+        return float(total)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            table=self.tables[self.steps[0]],
+            tables=self.tables,
+            steps=self.steps,
+            values=self.values.astype(np.float32),
+            low=self.low,
+            high=self.high,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "DPSolution":
+        with np.load(path) as data:
+            return cls(data["tables"], data["steps"], data["values"], data["low"], data["high"])
+
+
+def solve(shape=GRID_SHAPE, n_quadrature: int = N_QUADRATURE, horizon: int = MAX_STEPS,
+          env: LiquidityEnv = None) -> DPSolution:
+    """
+    Backward value iteration over `horizon` steps on a `shape` grid spanning
+    grid_bounds(env); returns the greedy action table of every step.
+    """
+    env = env or LiquidityEnv()
+    low, high = grid_bounds(env)
+    n_l, n_v, n_p = shape
+    l_axis, v_axis, p_axis = (np.linspace(lo, hi, n) for n, lo, hi in zip(shape, low, high))
+    h_l, h_v, h_p = ((hi - lo) / (n - 1) for n, lo, hi in zip(shape, low, high))
+
+    # Post-decision volatility m = volatility - 0.1 * next liquidity, on the
+    # volatility spacing extended n_below nodes under the volatility grid
+    n_below = int(np.ceil(0.1 / h_v - SNAP_TOLERANCE))
+    n_m = n_v + n_below
+    m_axis = low[1] + h_v * (np.arange(n_m) - n_below)
+
+    # E[f(clip(m + noise))] = K @ f(v_axis) for f linear between nodes
+    noise, weights = noise_quadrature(n_quadrature)
+    next_vol = np.clip(m_axis[:, None] + noise, 0.0, 1.0)
+    vb, vf = _linear_weights(next_vol, low[1], h_v, n_v)
+    rows = np.broadcast_to(np.arange(n_m)[:, None], vb.shape)
+    K = np.zeros((n_m, n_v))
+    np.add.at(K, (rows, vb), weights * (1.0 - vf))
+    np.add.at(K, (rows, vb + 1), weights * vf)
+
+    # Expected reward by post-decision state, laid out [liquidity, apy, m]
+    reward = (
+        env.A * l_axis[:, None, None]
+        - env.C * p_axis[None, :, None]
+        - env.B * (next_vol @ weights)[None, None, :]
+    )
+
+    # Successor of every (liquidity, apy) node under every action: [A, n_l, n_p]
+    next_apy = np.clip(p_axis + APY_DELTAS[:, None], env.min_apy, env.max_apy)[:, None, :]
+    next_liq = np.clip(l_axis[None, :, None] + 0.5 * (next_apy - ANCHOR_APY), 0.0, 1.0)
+    lb, lf = _linear_weights(next_liq, low[0], h_l, n_l)
+    pb, pf = _linear_weights(np.broadcast_to(next_apy, next_liq.shape), low[2], h_p, n_p)
+    # Volatility node j moves to m-coordinate j + shift: one shift per successor
+    mb, mf = _linear_weights(n_below - 0.1 * next_liq / h_v, 0.0, 1.0, n_below + 2)
+
+    # (liquidity index, apy index, m offset, weight) of every interpolation
+    # corner that carries weight somewhere
+    corners = []
+    for il, wl in ((lb, 1.0 - lf), (lb + 1, lf)):
+        for ip, wp in ((pb, 1.0 - pf), (pb + 1, pf)):
+            for im, wm in ((mb, 1.0 - mf), (mb + 1, mf)):
+                w = wl * wp * wm
+                if w.any():
+                    corners.append((il, ip, im, w[..., None]))
+
+    # values[l, p, v]: optimal return from the next step on (0 past the end)
+    values = np.zeros((n_l, n_p, n_v))
+    tables, steps = [], np.empty(horizon, dtype=np.int64)
+    converged_at = 0
+    for t in reversed(range(horizon)):
+        post = values @ K.T + reward
+        # One padding column keeps the window of the largest offset in range
+        post = np.concatenate([post, post[..., -1:]], axis=-1)
+        windows = sliding_window_view(post, n_v, axis=-1)
+        q = sum(windows[il, ip, im] * w for il, ip, im, w in corners)
+
+        best = q.max(axis=0)
+        increment = best - values
+        values = best
+        actions = np.argmax(q >= best - TIE_TOLERANCE, axis=0).astype(np.uint8)
+
+        if tables and np.array_equal(actions, tables[-1]) and np.ptp(increment) < SPAN_TOLERANCE:
+            # Stationary from here back: same table, constant gain per step
+            steps[:t + 1] = len(tables) - 1
+            values = values + t * increment
+            converged_at = t
+            break
+        if not tables or not np.array_equal(actions, tables[-1]):
+            tables.append(actions)
+        steps[t] = len(tables) - 1
+
+    # [l, p, v] -> [l, v, p], the observation order
+    tables = np.stack(tables).transpose(0, 1, 3, 2)
+    return DPSolution(tables, steps, values.transpose(0, 2, 1), low, high, converged_at)
+
+
+class DPPolicy:
+    """
+    Time-dependent lookup of a DPSolution with the model.predict() signature.
+
+    The returned state is each episode's next step index, passed back on the
+    next call like SchedulePolicy's; every observation is looked up at its
+    nearest grid node in the table of its step.
+    """
+
+    def __init__(self, solution: DPSolution):
+        self.solution = solution
+        self._shape = np.array(solution.tables.shape[1:])
+        self._scale = (self._shape - 1) / (solution.high - solution.low)
+
+    @classmethod
+    def load(cls, path: str) -> "DPPolicy":
+        return cls(DPSolution.load(path))
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(observation, dtype=np.float64)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, obs.shape[-1])[:, :3]
+
+        t = np.zeros(len(obs), dtype=np.int64) if state is None else np.asarray(state, dtype=np.int64)
+        if episode_start is not None:
+            t = np.where(episode_start, 0, t)
+        steps = self.solution.steps
+        table = steps[np.minimum(t, len(steps) - 1)]
+
+        coords = np.clip((obs - self.solution.low) * self._scale, 0, self._shape - 1)
+        idx = np.rint(coords).astype(np.intp)
+        actions = self.solution.tables[table, idx[:, 0], idx[:, 1], idx[:, 2]].astype(np.int64)
+        return (actions[0] if single else actions), t + 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Solve LiquidityEnv by finite-horizon value iteration")
+    parser.add_argument("--out", default="rl/models/dp_policy.npz")
+    parser.add_argument("--grid", type=int, nargs=3, default=list(GRID_SHAPE), metavar=("LIQ", "VOL", "APY"))
+    parser.add_argument("--n-quadrature", type=int, default=N_QUADRATURE, help="Gauss-Hermite noise nodes")
+    parser.add_argument("--n-episodes", type=int, default=100, help="seeded episodes to check the policy on")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    from rl.tournament import play_batch
+
+    args = parse_args()
+
+    start = time.perf_counter()
+    solution = solve(tuple(args.grid), args.n_quadrature)
+    elapsed = time.perf_counter() - start
+    solution.save(args.out)
+    print(
+        f"Solved {tuple(args.grid)} grid in {elapsed:.1f}s "
+        f"(stationary before step {solution.converged_at}, {len(solution.tables)} distinct tables)"
+    )
+    print(f"Saved policy and value tables to {args.out}")
+
+    returns = play_batch(DPPolicy(solution), args.seed, args.n_episodes)
+    ci = 1.96 * returns.std(ddof=1) / np.sqrt(len(returns)) if len(returns) > 1 else 0.0
+    print("=====================================")
+    print(f"Optimal expected return (grid) : {solution.value(INITIAL_STATE):.3f}")
+    print(f"DP policy over {args.n_episodes} episodes : {returns.mean():.3f} ± {ci:.3f}")
+
+
+if __name__ == "__main__":
+    main()
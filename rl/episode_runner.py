@@ -1,46 +1,167 @@
 import sys
 sys.path.append("/content/rl-liquidity-project")
 
-from stable_baselines3 import PPO
-from env.liquidity_env import LiquidityEnv
+import numpy as np
+from env.liquidity_env import MAX_STEPS, LiquidityEnv
+from rl.inference_server import load_shared_policy
 
 
-def load_trained_model(model_path: str = "rl/models/ppo_liquidity") -> PPO:
-    """Load the trained PPO model from disk."""
-    return PPO.load(model_path)
+def load_trained_model(model_path: str = "rl/models/ppo_liquidity"):
+    """
+    The trained policy for inference: served by the inference server when
+    one is running, else loaded from disk (the exported NumpyPolicy when
+    available, no torch import, otherwise the PPO model).
+    """
+    return load_shared_policy(model_path)
 
 
-def run_episode_with_model(model: PPO, max_steps: int = 500):
-    """Run a single episode and return per-step data."""
-    env = LiquidityEnv()
-    obs, info = env.reset()
+# Columns recorded for every step: the observation after the step (what the
+# policy sees next), the reward and the action that produced them
+EPISODE_COLUMNS = {
+    "step": np.int64,
+    "liquidity": np.float32,
+    "volatility": np.float32,
+    "apy": np.float32,
+    "reward": np.float64,
+    "action": np.int64,
+}
 
-    steps = []
-    liquidities = []
-    volatilities = []
-    apys = []
-    rewards = []
-    actions = []
 
-    for t in range(max_steps):
+def _empty_columns(size: int) -> dict:
+    return {name: np.empty(size, dtype=dtype) for name, dtype in EPISODE_COLUMNS.items()}
+
+
+def _fill(model, env, obs, columns: dict, first_step: int, size: int, render: bool):
+    """
+    Step env with model into columns[:size].
+
+    Returns (obs, n_filled, done); n_filled < size only when the episode ended.
+    """
+    steps, liquidity, volatility, apy, rewards, actions = (columns[name] for name in EPISODE_COLUMNS)
+
+    for i in range(size):
         action, _ = model.predict(obs, deterministic=True)
-        obs, reward, terminated, truncated, info = env.step(int(action))
+        action = int(action)
+        obs, reward, terminated, truncated, info = env.step(action)
 
-        steps.append(t)
-        liquidities.append(float(obs[0]))
-        volatilities.append(float(obs[1]))
-        apys.append(float(obs[2]))
-        rewards.append(float(reward))
-        actions.append(int(action))
+        steps[i] = first_step + i
+        liquidity[i] = obs[0]
+        volatility[i] = obs[1]
+        apy[i] = obs[2]
+        rewards[i] = reward
+        actions[i] = action
+
+        if render:
+            env.render()
 
         if terminated or truncated:
+            return obs, i + 1, True
+
+    return obs, size, False
+
+
+def iter_episode(model, env=None, max_steps: int = MAX_STEPS, seed=None,
+                 chunk_size: int = None, render: bool = False):
+    """
+    Run one episode and yield it while it runs.
+
+    chunk_size=None yields one {column: scalar} dict per step. With a
+    chunk_size, each yield is a {column: array} dict of up to chunk_size
+    steps in fresh arrays, so memory stays bounded however long the horizon
+    and consumers may keep chunks. Columns are EPISODE_COLUMNS.
+    """
+    env = env or LiquidityEnv(fast_path=True)
+    obs, info = env.reset(seed=seed)
+    names = tuple(EPISODE_COLUMNS)
+
+    if chunk_size is None:
+        row = _empty_columns(1)
+        for t in range(max_steps):
+            obs, n, done = _fill(model, env, obs, row, t, 1, render)
+            yield {name: row[name][0].item() for name in names}
+            if done:
+                return
+        return
+
+    for t in range(0, max_steps, chunk_size):
+        size = min(chunk_size, max_steps - t)
+        columns = _empty_columns(size)
+        obs, n, done = _fill(model, env, obs, columns, t, size, render)
+        yield {name: columns[name][:n] for name in names}
+        if done:
+            return
+
+
+def collect_episode(model, env=None, max_steps: int = MAX_STEPS, seed=None, render: bool = False) -> dict:
+    """
+    Run one episode into preallocated [max_steps] arrays and return them
+    trimmed to the episode's length, as {column: array}.
+    """
+    env = env or LiquidityEnv(fast_path=True)
+    obs, info = env.reset(seed=seed)
+
+    columns = _empty_columns(max_steps)
+    obs, n, done = _fill(model, env, obs, columns, 0, max_steps, render)
+    return {name: column[:n] for name, column in columns.items()}
+
+
+def run_episode_with_model(model, max_steps: int = MAX_STEPS):
+    """Run a single episode and return per-step data."""
+    return collect_episode(model, max_steps=max_steps)
+
+
+def run_episodes_batched(model, n_episodes: int, max_steps: int = MAX_STEPS, seed=None, **env_kwargs):
+    """
+    Run n_episodes in lockstep with one model.predict call per timestep.
+
+    All episodes live in one BatchedLiquidityEnv (episode i seeded with
+    seed + i) and the policy sees the whole [n_episodes, 3] observation batch
+    at once. Finished episodes are masked out, so histories hold NaN after
+    each episode's last step.
+
+    Returns per-episode "total_reward" and "length" arrays of shape [N], plus
+    [N, max_steps] histories "liquidity", "volatility", "apy", "rewards" and
+    "action" (-1 after the episode ended). env_kwargs (e.g. replay=...) go
+    to BatchedLiquidityEnv.
+    """
+    # Imported here: BatchedLiquidityEnv pulls in stable_baselines3 (and torch)
+    from env.batched_env import BatchedLiquidityEnv
+
+    env = BatchedLiquidityEnv(n_episodes, seed=seed, **env_kwargs)
+    obs = env.reset()
+
+    history = {
+        name: np.full((n_episodes, max_steps), np.nan, dtype=np.float64)
+        for name in ("liquidity", "volatility", "apy", "rewards")
+    }
+    action_history = np.full((n_episodes, max_steps), -1, dtype=np.int64)
+    lengths = np.zeros(n_episodes, dtype=np.int64)
+    active = np.ones(n_episodes, dtype=bool)
+
+    for t in range(max_steps):
+        actions, _ = model.predict(obs, deterministic=True)
+        obs, _, dones, infos = env.step(actions)
+        action_history[active, t] = np.asarray(actions).reshape(n_episodes)[active]
+
+        # Finished pools were auto-reset; record their terminal observation
+        next_obs = obs.copy()
+        for i in np.flatnonzero(dones):
+            next_obs[i] = infos[i]["terminal_observation"]
+
+        history["liquidity"][active, t] = next_obs[active, 0]
+        history["volatility"][active, t] = next_obs[active, 1]
+        history["apy"][active, t] = next_obs[active, 2]
+        history["rewards"][active, t] = env.last_rewards[active]
+        lengths[active] += 1
+
+        active &= ~dones
+        if not active.any():
             break
 
+    env.close()
     return {
-        "step": steps,
-        "liquidity": liquidities,
-        "volatility": volatilities,
-        "apy": apys,
-        "reward": rewards,
-        "action": actions,
+        "total_reward": np.nansum(history["rewards"], axis=1),
+        "length": lengths,
+        "action": action_history,
+        **history,
     }
@@ -1,67 +1,80 @@
 import sys
 sys.path.append("/content/rl-liquidity-project")
 
-import numpy as np
-from stable_baselines3 import PPO
-from env.liquidity_env import LiquidityEnv
-
-
-def run_single_episode(model, env, max_steps=500, render=False):
-    obs, info = env.reset()
-    total_reward = 0.0
-
-    liquidity_history = []
-    volatility_history = []
-    apy_history = []
-    reward_history = []
-
-    for step in range(max_steps):
-        action, _ = model.predict(obs, deterministic=True)
-        obs, reward, terminated, truncated, info = env.step(int(action))
-
-        total_reward += reward
+import argparse
 
-        # obs = [liquidity, volatility, current_apy]
-        liquidity_history.append(float(obs[0]))
-        volatility_history.append(float(obs[1]))
-        apy_history.append(float(obs[2]))
-        reward_history.append(float(reward))
+import numpy as np
+from env.liquidity_env import INITIAL_STATE, LiquidityEnv
+from rl import instrumentation
+from rl.dp_solver import DPSolution
+from rl.episode_runner import collect_episode, load_trained_model, run_episodes_batched
 
-        if render:
-            env.render()
 
-        if terminated or truncated:
-            break
+def run_single_episode(model, env, max_steps=500, render=False, seed=None):
+    episode = collect_episode(model, env, max_steps=max_steps, seed=seed, render=render)
 
     return {
-        "total_reward": total_reward,
-        "liquidity": liquidity_history,
-        "volatility": volatility_history,
-        "apy": apy_history,
-        "rewards": reward_history,
+        "total_reward": float(episode["reward"].sum()),
+        "liquidity": episode["liquidity"],
+        "volatility": episode["volatility"],
+        "apy": episode["apy"],
+        "rewards": episode["reward"],
     }
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate the trained PPO model")
+    parser.add_argument("--n-episodes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="run one episode at a time instead of all episodes in lockstep",
+    )
+    parser.add_argument(
+        "--optimal",
+        default=None,
+        help="dp_solver output to score the mean against (e.g. rl/models/dp_policy.npz)",
+    )
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
+
+
 def main():
-    # Load trained PPO model
-    model_path = "rl/models/ppo_liquidity"
-    model = PPO.load(model_path)
+    args = parse_args()
 
-    # Create a fresh environment
-    env = LiquidityEnv()
+    # Load trained PPO model (or reach it on the inference server)
+    model_path = "rl/models/ppo_liquidity"
+    model = load_trained_model(model_path)
 
     # Run multiple evaluation episodes
-    n_episodes = 5
-    episode_rewards = []
-
-    for i in range(n_episodes):
-        result = run_single_episode(model, env, render=False)
-        episode_rewards.append(result["total_reward"])
-        print(f"Episode {i+1}: total_reward = {result['total_reward']:.3f}")
+    n_episodes = args.n_episodes
+
+    with instrumentation.session_from_args(args):
+        if args.sequential:
+            # Create a fresh environment
+            env = LiquidityEnv(fast_path=True)
+            episode_rewards = []
+            for i in range(n_episodes):
+                seed = None if args.seed is None else args.seed + i
+                result = run_single_episode(model, env, render=False, seed=seed)
+                episode_rewards.append(result["total_reward"])
+        else:
+            # All episodes in lockstep, one batched predict per timestep
+            episode_rewards = run_episodes_batched(model, n_episodes, seed=args.seed)["total_reward"]
+
+    for i, total_reward in enumerate(episode_rewards[:20]):
+        print(f"Episode {i+1}: total_reward = {total_reward:.3f}")
+    if n_episodes > 20:
+        print(f"... ({n_episodes - 20} more episodes)")
 
     print("===================================")
     print(f"Mean total reward over {n_episodes} episodes: {np.mean(episode_rewards):.3f}")
     print(f"Std of total reward: {np.std(episode_rewards):.3f}")
+    if args.optimal:
+        optimal = DPSolution.load(args.optimal).value(INITIAL_STATE)
+        print(f"Optimal expected return (DP): {optimal:.3f} ({np.mean(episode_rewards) / optimal:.1%} reached)")
+    instrumentation.print_summary()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+"""
+Evaluation worker process for rl/background_eval.py, NumPy only.
+
+    python -m rl.eval_worker --log-path data/training/eval_curve.csv
+
+BackgroundEvaluator starts this module as a plain subprocess and writes
+policy snapshots (policy_arrays() as .npz bytes, length-prefixed) to its
+stdin. Every snapshot is rebuilt as a NumpyPolicy, scored on seeded episodes
+and appended to the CSV learning curve. The process never imports torch or
+stable_baselines3, neither directly nor by re-importing the trainer's main
+module the way multiprocessing's spawn/forkserver children do, so it starts
+in a fraction of a second and only competes with training for the few
+milliseconds an evaluation takes. It prints one line once it is ready and
+exits when stdin is closed.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import csv
+import io
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from env.liquidity_env import MAX_STEPS, LiquidityEnv
+from rl.numpy_policy import NumpyPolicy
+
+EVAL_LOG_FIELDS = ["timesteps", "mean_reward", "std_reward", "min_reward", "max_reward",
+                   "n_episodes", "wall_time"]
+
+# Frame header: payload length in bytes
+_HEADER = struct.Struct("<Q")
+
+
+def encode_snapshot(timesteps: int, arrays: dict) -> bytes:
+    """One stdin frame: the timestep count and policy_arrays() as .npz bytes."""
+    buffer = io.BytesIO()
+    np.savez(buffer, timesteps=np.int64(timesteps), **arrays)
+    payload = buffer.getvalue()
+    return _HEADER.pack(len(payload)) + payload
+
+
+def read_snapshot(stream):
+    """(timesteps, NumpyPolicy) from the next frame, or None at end of stream."""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    with np.load(io.BytesIO(stream.read(size)), allow_pickle=False) as data:
+        return int(data["timesteps"]), NumpyPolicy.from_arrays(data)
+
+
+def evaluate(policy, n_episodes: int, max_steps: int = MAX_STEPS, seed: int = 0, **env_kwargs) -> np.ndarray:
+    """
+    Total reward of n_episodes in lockstep, episode i seeded with seed + i.
+
+    Same episodes and totals as run_episodes_batched(...)["total_reward"],
+    stepped on LiquidityEnv instances so no VecEnv (and no torch) is needed.
+    """
+    envs = [LiquidityEnv(fast_path=True, **env_kwargs) for _ in range(n_episodes)]
+    obs = np.stack([env.reset(seed=seed + i)[0] for i, env in enumerate(envs)])
+    # Every episode lasts MAX_STEPS, so they all end together
+    rewards = np.zeros((n_episodes, min(max_steps, MAX_STEPS)), dtype=np.float64)
+    for t in range(rewards.shape[1]):
+        actions, _ = policy.predict(obs, deterministic=True)
+        for i, env in enumerate(envs):
+            obs[i], rewards[i, t], *_ = env.step(int(actions[i]))
+    return rewards.sum(axis=1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score policy snapshots read from stdin")
+    parser.add_argument("--log-path", required=True)
+    parser.add_argument("--n-episodes", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS)
+    parser.add_argument("--env-kwargs", default="{}", help="JSON LiquidityEnv arguments, e.g. replay")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    env_kwargs = json.loads(args.env_kwargs)
+    if "replay_columns" in env_kwargs:
+        env_kwargs["replay_columns"] = tuple(env_kwargs["replay_columns"])
+
+    print("ready", flush=True)
+    # Stay out of the trainer's way: evaluations only use otherwise idle CPU
+    os.nice(19)
+
+    while True:
+        snapshot = read_snapshot(sys.stdin.buffer)
+        if snapshot is None:
+            break
+        timesteps, policy = snapshot
+        rewards = evaluate(policy, args.n_episodes, args.max_steps, args.seed, **env_kwargs)
+
+        new_file = not os.path.exists(args.log_path)
+        with open(args.log_path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=EVAL_LOG_FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerow({
+                "timesteps": timesteps,
+                "mean_reward": float(np.mean(rewards)),
+                "std_reward": float(np.std(rewards)),
+                "min_reward": float(np.min(rewards)),
+                "max_reward": float(np.max(rewards)),
+                "n_episodes": args.n_episodes,
+                "wall_time": time.time(),
+            })
+
+
+if __name__ == "__main__":
+    main()
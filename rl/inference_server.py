@@ -0,0 +1,536 @@
+"""
+Local inference server: one warm copy of each policy, shared by every process.
+
+    python -m rl.inference_server serve --model rl/models/ppo_liquidity
+    python -m rl.inference_server load rl/models/ppo_liquidity_v2 --activate
+    python -m rl.inference_server info
+
+The server listens on a Unix domain socket and loads each model version once
+(load_policy: the NumpyPolicy export when it matches the zip, else the PPO
+zip), keyed by the sha256 of its zip. Requests for the same model are
+coalesced: a batcher thread per model takes every observation queued by
+then, waits up to window_ms for the other recently active clients to add
+theirs, and answers them all with one batched forward pass. A client alone
+never waits: its requests run straight on its connection thread. Observations whose width
+does not match the model's input are rejected before they are queued, and if
+a batched forward pass fails each request is rerun alone, so one bad request
+only fails its own sender.
+
+PolicyClient mirrors model.predict(), so episode_runner, the scripts and the
+dashboard use it like any local policy; load_shared_policy() returns one
+when a server is running and falls back to loading in-process otherwise.
+Clients predict with the server's active model unless they pin a hash with
+use(); activate() swaps the active model for everyone else.
+
+Predictions travel as raw float32/int64 frames and control messages (load,
+activate, info) as JSON, so nothing a client sends is ever unpickled. The
+socket is still created readable and writable by its owner only.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import json
+import os
+import queue
+import signal
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from rl.numpy_policy import load_policy, model_hash
+
+SOCKET_PATH = "data/run/inference.sock"
+SOCKET_ENV = "RL_INFERENCE_SOCKET"
+
+# Longest a batch is held open for other clients, and the most observations
+# answered by one forward pass
+WINDOW_MS = 2.0
+MAX_BATCH = 4096
+
+# Clients that predicted this recently are expected to send another request
+ACTIVE_SECONDS = 1.0
+
+# Least time between a fallen-back client's attempts to reach the server again
+RECONNECT_SECONDS = 5.0
+
+# Frame kinds: predict request (key, shape, float32 observations), control
+# request (JSON list), actions reply (int64), control or error reply
+# (JSON [status, value])
+PREDICT, CONTROL, ACTIONS, REPLY = b"P", b"C", b"A", b"R"
+_KEY_BYTES = 64
+_SHAPE = struct.Struct("<II")
+_OBS_OFFSET = 1 + _KEY_BYTES + _SHAPE.size
+
+
+def socket_path(path: str = None) -> str:
+    """Explicit path, else $RL_INFERENCE_SOCKET, else SOCKET_PATH."""
+    return path or os.environ.get(SOCKET_ENV) or SOCKET_PATH
+
+
+def input_width(policy) -> int:
+    """Observation columns a policy's forward pass expects."""
+    if hasattr(policy, "weights"):
+        return policy.weights[0].shape[0]  # NumpyPolicy
+    return policy.observation_space.shape[0]
+
+
+class _Batcher:
+    """Thread that answers queued observations of one model in batches."""
+
+    def __init__(self, policy, window: float, max_batch: int, active_clients):
+        self.policy = policy
+        self.width = input_width(policy)
+        self.window = window
+        self.max_batch = max_batch
+        # Callable: how many clients are likely to join a batch
+        self._active_clients = active_clients
+        self.requests = 0
+        self.batches = 0
+        # Held for every forward pass, batched or inline
+        self._busy = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        # Requests taken off the queue that did not fit the last batch
+        self._held = []
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, obs: np.ndarray) -> Future:
+        future = Future()
+        self._queue.put((obs, future))
+        return future
+
+    def idle(self) -> bool:
+        return self._queue.empty() and not self._held and not self._busy.locked()
+
+    def _forward(self, obs: np.ndarray, n_requests: int) -> np.ndarray:
+        with self._busy:
+            actions, _ = self.policy.predict(obs, deterministic=True)
+            self.requests += n_requests
+            self.batches += 1
+        return np.asarray(actions).reshape(-1)
+
+    def predict_inline(self, obs: np.ndarray) -> np.ndarray:
+        """Forward pass on the calling thread, skipping the queue."""
+        return self._forward(obs, 1)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first) -> tuple:
+        """
+        first plus whatever joins it within the window with the same number of
+        columns; (pending, stop). Other requests are held for the next batch.
+        """
+        pending = [first]
+        size = len(first[0])
+        width = first[0].shape[1]
+        deadline = time.perf_counter() + self.window
+        while size < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                # Every client that could add a request already has one here
+                timeout = deadline - time.perf_counter()
+                if len(pending) >= self._active_clients() or timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                return pending, True
+            if item[0].shape[1] != width:
+                self._held.append(item)
+                continue
+            pending.append(item)
+            size += len(item[0])
+        return pending, False
+
+    def _answer(self, pending) -> None:
+        if len(pending) > 1:
+            try:
+                actions = self._forward(np.concatenate([obs for obs, _ in pending]), len(pending))
+            except Exception:
+                pass
+            else:
+                offset = 0
+                for obs, future in pending:
+                    future.set_result(actions[offset:offset + len(obs)])
+                    offset += len(obs)
+                return
+
+        # Alone, or the batch failed: only the request that breaks gets the error
+        for obs, future in pending:
+            try:
+                future.set_result(self._forward(obs, 1))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop or self._held:
+            item = self._held.pop(0) if self._held else self._queue.get()
+            if item is None:
+                break
+            if stop:
+                pending = [item]
+            else:
+                pending, stop = self._collect(item)
+            self._answer(pending)
+
+
+class InferenceServer:
+    """Serves batched predictions of any number of loaded model versions."""
+
+    def __init__(self, path: str = None, window_ms: float = WINDOW_MS, max_batch: int = MAX_BATCH):
+        self.path = socket_path(path)
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.active = None
+        self._models = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._connections = 0
+        # Connection id -> time of its latest predict request
+        self._last_predict = {}
+        self._listener = None
+
+    def load(self, model_path: str) -> str:
+        """Load model_path unless that version is already loaded; returns its hash."""
+        key = model_hash(model_path)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = _Batcher(load_policy(model_path), self.window, self.max_batch, self.active_clients)
+                self._paths[key] = model_path
+            if self.active is None:
+                self.active = key
+        return key
+
+    def active_clients(self) -> int:
+        """Connections that sent a predict request in the last ACTIVE_SECONDS."""
+        cutoff = time.perf_counter() - ACTIVE_SECONDS
+        return sum(t > cutoff for t in list(self._last_predict.values()))
+
+    def activate(self, key: str) -> None:
+        if key not in self._models:
+            raise KeyError(f"Model {key[:12]} is not loaded")
+        self.active = key
+
+    def info(self) -> dict:
+        return {
+            "active": self.active,
+            "connections": self._connections,
+            "models": {
+                key: {
+                    "path": self._paths[key],
+                    "requests": batcher.requests,
+                    "batches": batcher.batches,
+                }
+                for key, batcher in self._models.items()
+            },
+        }
+
+    def predict(self, key, obs: np.ndarray) -> np.ndarray:
+        batcher = self._models.get(key or self.active)
+        if batcher is None:
+            raise KeyError(f"Model {key[:12] if key else None} is not loaded")
+        if obs.ndim != 2 or obs.shape[1] != batcher.width:
+            raise ValueError(f"Observations have shape {obs.shape}, the model expects [N, {batcher.width}]")
+        if self.active_clients() <= 1 and batcher.idle():
+            # Nobody to batch with: a thread handoff would only add latency
+            return batcher.predict_inline(obs)
+        return batcher.submit(obs).result()
+
+    def _dispatch(self, message):
+        if not isinstance(message, list) or not message:
+            raise ValueError("Control messages are non-empty JSON lists")
+        op, *args = message
+        if op == "load":
+            key = self.load(args[0])
+            if args[1]:
+                self.activate(key)
+            return key
+        if op == "activate":
+            return self.activate(args[0])
+        if op == "info":
+            return self.info()
+        raise ValueError(f"Unknown request '{op}'")
+
+    def _handle(self, conn) -> None:
+        with self._lock:
+            self._connections += 1
+        try:
+            while True:
+                try:
+                    frame = conn.recv_bytes()
+                except (EOFError, OSError):
+                    break
+                try:
+                    if frame[:1] == PREDICT:
+                        self._last_predict[id(conn)] = time.perf_counter()
+                        key = frame[1:1 + _KEY_BYTES].rstrip(b"\0").decode() or None
+                        rows, cols = _SHAPE.unpack_from(frame, 1 + _KEY_BYTES)
+                        obs = np.frombuffer(frame, dtype=np.float32, offset=_OBS_OFFSET).reshape(rows, cols)
+                        reply = ACTIONS + self.predict(key, obs).astype(np.int64).tobytes()
+                    else:
+                        reply = REPLY + json.dumps(["ok", self._dispatch(json.loads(frame[1:]))]).encode()
+                except Exception as e:
+                    reply = REPLY + json.dumps(["error", f"{type(e).__name__}: {e}"]).encode()
+                conn.send_bytes(reply)
+        finally:
+            with self._lock:
+                self._connections -= 1
+                self._last_predict.pop(id(conn), None)
+            conn.close()
+
+    def serve_forever(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            try:
+                Client(self.path, family="AF_UNIX").close()
+            except OSError:
+                os.remove(self.path)  # left behind by a server that died
+            else:
+                raise RuntimeError(f"An inference server is already listening on {self.path}")
+
+        old_umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.path, family="AF_UNIX")
+        finally:
+            os.umask(old_umask)
+
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break  # listener closed
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        for batcher in self._models.values():
+            batcher.close()
+
+
+class PolicyClient:
+    """
+    A model on the inference server with the model.predict() signature.
+
+    Safe to share between threads (calls are serialized on the connection),
+    but every thread then waits on the same connection: give each concurrent
+    user its own client so the server can batch them.
+
+    When the connection breaks (server restarted or stopped) the client
+    reconnects and, if it was created with model_path, loads that version on
+    the new server again. If the server stays unreachable, predict() falls
+    back to load_policy(model_path) in-process and tries the server again
+    every RECONNECT_SECONDS.
+    """
+
+    def __init__(self, path: str = None, model: str = None, model_path: str = None):
+        self.path = socket_path(path)
+        self.model = model
+        self.model_path = model_path
+        self._conn = Client(self.path, family="AF_UNIX")
+        self._lock = threading.Lock()
+        self._fallback = None
+        self._last_attempt = 0.0
+
+    def _roundtrip(self, frame: bytes) -> bytes:
+        self._conn.send_bytes(frame)
+        return self._conn.recv_bytes()
+
+    def _reconnect(self) -> bool:
+        """Open a new connection (and reload model_path there); False when unreachable."""
+        self._last_attempt = time.monotonic()
+        try:
+            conn = Client(self.path, family="AF_UNIX")
+        except OSError:
+            return False
+        self._conn.close()
+        self._conn = conn
+        if self.model_path is not None:
+            try:
+                self._parse(self._roundtrip(CONTROL + json.dumps(["load", self.model_path, False]).encode()))
+            except (EOFError, OSError):
+                return False
+        self._fallback = None
+        return True
+
+    def _request(self, frame: bytes, fallback=None):
+        """
+        Send frame and parse the reply. With a fallback callable, a server
+        that cannot be reached is answered by fallback() instead.
+        """
+        with self._lock:
+            if self._fallback is not None:
+                due = time.monotonic() - self._last_attempt >= RECONNECT_SECONDS
+                if fallback is not None and not due:
+                    return fallback()
+                if not self._reconnect():
+                    if fallback is None:
+                        raise ConnectionError(f"No inference server on {self.path}")
+                    return fallback()
+            try:
+                reply = self._roundtrip(frame)
+            except (EOFError, OSError):
+                if not self._reconnect():
+                    if fallback is None or self.model_path is None:
+                        raise
+                    self._fallback = load_policy(self.model_path)
+                    return fallback()
+                reply = self._roundtrip(frame)
+        return self._parse(reply)
+
+    @staticmethod
+    def _parse(reply: bytes):
+        if reply[:1] == ACTIONS:
+            return np.frombuffer(reply, dtype=np.int64, offset=1)
+        status, value = json.loads(reply[1:])
+        if status == "error":
+            raise RuntimeError(f"Inference server: {value}")
+        return value
+
+    def _call(self, *message):
+        return self._request(CONTROL + json.dumps(message).encode())
+
+    def load(self, model_path: str, activate: bool = False) -> str:
+        """Have the server load model_path (once per version); returns its hash."""
+        return self._call("load", os.path.abspath(model_path), activate)
+
+    def pin(self, model_path: str) -> None:
+        """Load model_path, use it, and keep using it across server restarts."""
+        self.use(self.load(model_path))
+        self.model_path = os.path.abspath(model_path)
+
+    def use(self, key: str) -> None:
+        """Pin this client to a loaded model version (None: the active one)."""
+        self.model = key
+
+    def activate(self, key: str) -> None:
+        """Make a loaded version the one unpinned clients use."""
+        self._call("activate", key)
+
+    def info(self) -> dict:
+        return self._call("info")
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.ndim == 1
+        obs = np.ascontiguousarray(obs.reshape(1, -1) if single else obs)
+        key = (self.model or "").encode().ljust(_KEY_BYTES, b"\0")
+        actions = self._request(
+            PREDICT + key + _SHAPE.pack(*obs.shape) + obs.tobytes(),
+            fallback=lambda: np.asarray(self._fallback.predict(obs, deterministic=True)[0]).reshape(-1),
+        )
+        return (actions[0] if single else actions), None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "PolicyClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def connect_shared_policy(model_path: str = "rl/models/ppo_liquidity", path: str = None):
+    """
+    A new PolicyClient pinned to model_path on the running inference server
+    (loaded there once; a later activate() does not change it), or None when
+    no server is reachable.
+    """
+    path = socket_path(path)
+    if not os.path.exists(path):
+        return None
+    try:
+        client = PolicyClient(path)
+    except OSError:
+        return None
+    client.pin(model_path)
+    return client
+
+
+def load_shared_policy(model_path: str = "rl/models/ppo_liquidity", path: str = None):
+    """
+    model_path served by the running inference server (see
+    connect_shared_policy), or loaded in-process with load_policy() when no
+    server is reachable.
+    """
+    return connect_shared_policy(model_path, path) or load_policy(model_path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shared batched inference over a Unix socket")
+    parser.add_argument("--socket", default=None, help=f"default: ${SOCKET_ENV} or {SOCKET_PATH}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the server")
+    serve.add_argument("--model", nargs="+", default=["rl/models/ppo_liquidity"], help="preloaded; the first is active")
+    serve.add_argument("--window-ms", type=float, default=WINDOW_MS)
+    serve.add_argument("--max-batch", type=int, default=MAX_BATCH)
+
+    load = commands.add_parser("load", help="load a model version on the running server")
+    load.add_argument("model")
+    load.add_argument("--activate", action="store_true", help="make it the active model")
+
+    activate = commands.add_parser("activate", help="make a loaded model version (hash prefix) active")
+    activate.add_argument("hash")
+
+    commands.add_parser("info", help="loaded models and request counts")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "serve":
+        server = InferenceServer(args.socket, window_ms=args.window_ms, max_batch=args.max_batch)
+        for model_path in args.model:
+            print(f"Loaded {model_path} as {server.load(model_path)[:12]}")
+        # SIGTERM shuts down like Ctrl-C
+        signal.signal(signal.SIGTERM, lambda *_: server.close())
+        print(f"Serving on {server.path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if os.path.exists(server.path):
+                os.remove(server.path)
+        return
+
+    with PolicyClient(args.socket) as client:
+        if args.command == "load":
+            key = client.load(args.model, activate=args.activate)
+            print(f"Loaded {args.model} as {key[:12]}{' (active)' if args.activate else ''}")
+        elif args.command == "activate":
+            matches = [key for key in client.info()["models"] if key.startswith(args.hash)]
+            if len(matches) != 1:
+                raise SystemExit(f"'{args.hash}' matches {len(matches)} loaded models")
+            client.activate(matches[0])
+            print(f"Activated {matches[0][:12]}")
+        else:
+            info = client.info()
+            print(f"{info['connections']} connected client(s)")
+            for key, model in info["models"].items():
+                marker = "*" if key == info["active"] else " "
+                mean_batch = model["requests"] / max(model["batches"], 1)
+                print(
+                    f"{marker} {key[:12]} {model['path']}: {model['requests']} requests "
+                    f"in {model['batches']} batches ({mean_batch:.1f} per batch)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Opt-in timing instrumentation and profiling for the hot paths.
+
+    python -m rl.train_ppo --metrics-dir data/metrics --profile cprofile
+    RL_METRICS_DIR=data/metrics streamlit run dashboard/app.py
+
+enable() wraps the methods listed in HOOKS with timers that record call
+count, total and max wall time per section (env.step, policy.predict,
+ppo.rollout, ...); disable() puts the original methods back. Nothing is
+wrapped until then, so a run without instrumentation pays nothing. Sections
+nest: ppo.rollout includes the vec_env.step and policy forward passes made
+while collecting.
+
+A Session adds periodic export: every interval seconds one JSON line is
+appended to metrics.jsonl and metrics.prom is rewritten in Prometheus text
+format. It can also profile the run, with cProfile (profile.prof and a
+profile.txt summary) or the built-in sampling profiler (profile.folded,
+collapsed stacks for flamegraph.pl or speedscope), saved next to the
+metrics. Only the calling process is measured: shared-memory env workers
+show up as vec_env.step time in the trainer.
+"""
+import argparse
+import contextlib
+import cProfile
+import functools
+import importlib
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+METRICS_DIR = "data/metrics"
+METRICS_DIR_ENV = "RL_METRICS_DIR"
+PROFILERS = ("cprofile", "sample")
+
+# (module, class, method, section). Modules that need stable_baselines3 are
+# only hooked once it has been imported, so enabling never pulls in torch.
+HOOKS = (
+    ("env.liquidity_env", "LiquidityEnv", "step", "env.step"),
+    ("env.liquidity_env", "LiquidityEnv", "reset", "env.reset"),
+    ("rl.numpy_policy", "NumpyPolicy", "predict", "policy.predict"),
+    ("rl.inference_server", "PolicyClient", "predict", "policy.predict"),
+    ("env.batched_env", "BatchedLiquidityEnv", "step_wait", "vec_env.step"),
+    ("env.batched_env", "BatchedLiquidityEnv", "reset", "vec_env.reset"),
+    ("rl.shm_vec_env", "SharedMemoryVecEnv", "step_wait", "vec_env.step"),
+    ("rl.shm_vec_env", "SharedMemoryVecEnv", "reset", "vec_env.reset"),
+    ("stable_baselines3.common.base_class", "BaseAlgorithm", "predict", "policy.predict"),
+    ("stable_baselines3.common.on_policy_algorithm", "OnPolicyAlgorithm", "collect_rollouts", "ppo.rollout"),
+    ("stable_baselines3.ppo.ppo", "PPO", "train", "ppo.update"),
+)
+_TORCH_FREE = ("env.liquidity_env", "rl.numpy_policy", "rl.inference_server")
+
+
+class Metrics:
+    """Call count, total and max seconds per section."""
+
+    def __init__(self):
+        self._sections = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def section(self, name: str) -> list:
+        """The [calls, seconds, max_seconds] list of a section, updated in place."""
+        with self._lock:
+            return self._sections.setdefault(name, [0, 0.0, 0.0])
+
+    def record(self, section: str, seconds: float) -> None:
+        stats = self.section(section)
+        with self._lock:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+
+    @contextlib.contextmanager
+    def timer(self, section: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(section, time.perf_counter() - start)
+
+    def reset(self) -> None:
+        # Zeroed in place: installed timers hold on to their lists
+        with self._lock:
+            for stats in self._sections.values():
+                stats[:] = [0, 0.0, 0.0]
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            sections = {name: list(stats) for name, stats in self._sections.items()}
+        return {
+            name: {
+                "calls": calls,
+                "seconds": total,
+                "mean_seconds": total / calls,
+                "max_seconds": longest,
+            }
+            for name, (calls, total, longest) in sorted(sections.items())
+            if calls
+        }
+
+
+METRICS = Metrics()
+
+# (class, method name, original attribute) of every installed hook
+_installed = []
+
+
+def _timed(section: str, method):
+    stats = METRICS.section(section)
+    lock = METRICS._lock
+    perf_counter = time.perf_counter
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = perf_counter() - start
+            with lock:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+
+    return wrapper
+
+
+def enable() -> None:
+    """Install the timers of HOOKS (idempotent)."""
+    if _installed:
+        return
+    with_sb3 = "stable_baselines3" in sys.modules
+    for module_name, class_name, method_name, section in HOOKS:
+        if module_name not in _TORCH_FREE and not with_sb3:
+            continue
+        cls = getattr(importlib.import_module(module_name), class_name)
+        original = cls.__dict__[method_name]
+        setattr(cls, method_name, _timed(section, original))
+        _installed.append((cls, method_name, original))
+
+
+def disable() -> None:
+    """Restore every method enable() wrapped."""
+    while _installed:
+        cls, method_name, original = _installed.pop()
+        setattr(cls, method_name, original)
+
+
+def _write_atomic(path: str, text: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def prometheus_text(snapshot: dict) -> str:
+    """A Metrics snapshot in Prometheus text exposition format."""
+    families = (
+        ("rl_section_calls_total", "counter", "Calls of an instrumented section.", "calls"),
+        ("rl_section_seconds_total", "counter", "Wall time spent in an instrumented section.", "seconds"),
+        ("rl_section_max_seconds", "gauge", "Longest single call of an instrumented section.", "max_seconds"),
+    )
+    lines = []
+    for metric, kind, help_text, field in families:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for section, stats in snapshot.items():
+            lines.append(f'{metric}{{section="{section}"}} {stats[field]!r}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Append METRICS to metrics.jsonl and rewrite metrics.prom every interval seconds."""
+
+    def __init__(self, out_dir: str, interval: float = 10.0, metrics: Metrics = METRICS):
+        os.makedirs(out_dir, exist_ok=True)
+        self.jsonl_path = os.path.join(out_dir, "metrics.jsonl")
+        self.prom_path = os.path.join(out_dir, "metrics.prom")
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    def start(self) -> "MetricsExporter":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self) -> None:
+        snapshot = self.metrics.snapshot()
+        now = time.time()
+        with open(self.jsonl_path, "a") as f:
+            f.write(json.dumps({
+                "time": now,
+                "elapsed": now - self.metrics.started,
+                "pid": os.getpid(),
+                "sections": snapshot,
+            }) + "\n")
+        _write_atomic(self.prom_path, prometheus_text(snapshot))
+
+    def stop(self) -> None:
+        """Stop the thread and write one last export."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.export()
+
+
+class SamplingProfiler:
+    """
+    Sample one thread's Python stack every interval seconds from a
+    background thread; save() writes the counts as collapsed stacks.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Session:
+    """
+    Instrument everything between start() and stop() (or a with block):
+    timers on, periodic export to out_dir and, optionally, a profile of the
+    calling thread ("cprofile" or "sample") saved there on stop.
+    """
+
+    def __init__(self, out_dir: str = METRICS_DIR, interval: float = 10.0, profiler: str = None):
+        if profiler not in (None, *PROFILERS):
+            raise ValueError(f"Unknown profiler {profiler!r}; expected one of {PROFILERS}")
+        self.out_dir = out_dir
+        self.interval = interval
+        self.profiler = profiler
+        self._exporter = None
+        self._profile = None
+
+    def start(self) -> "Session":
+        METRICS.reset()
+        enable()
+        self._exporter = MetricsExporter(self.out_dir, self.interval).start()
+        if self.profiler == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.profiler == "sample":
+            self._profile = SamplingProfiler().start()
+        return self
+
+    def stop(self) -> None:
+        if self._exporter is None:
+            return
+        if self.profiler == "cprofile":
+            self._profile.disable()
+            self._profile.dump_stats(os.path.join(self.out_dir, "profile.prof"))
+            summary = io.StringIO()
+            pstats.Stats(self._profile, stream=summary).sort_stats("cumulative").print_stats(40)
+            with open(os.path.join(self.out_dir, "profile.txt"), "w") as f:
+                f.write(summary.getvalue())
+        elif self.profiler == "sample":
+            self._profile.stop()
+            self._profile.save(os.path.join(self.out_dir, "profile.folded"))
+        self._exporter.stop()
+        self._exporter = self._profile = None
+        disable()
+
+    def __enter__(self) -> "Session":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument(
+        "--metrics-dir",
+        default=None,
+        help=f"time the hot paths and export metrics here (default with --profile: {METRICS_DIR})",
+    )
+    group.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between metric exports")
+    group.add_argument("--profile", choices=PROFILERS, default=None, help="also profile the run")
+
+
+def session_from_args(args):
+    """A Session for the parsed add_arguments() flags, or a no-op context."""
+    if args.metrics_dir is None and args.profile is None:
+        return contextlib.nullcontext()
+    return Session(args.metrics_dir or METRICS_DIR, args.metrics_interval, args.profile)
+
+
+def print_summary(snapshot: dict = None) -> None:
+    """Per-section table of a Metrics snapshot (the live one by default)."""
+    snapshot = METRICS.snapshot() if snapshot is None else snapshot
+    if not snapshot:
+        return
+    print(f"{'section':<16} {'calls':>10} {'total s':>10} {'mean us':>10} {'max ms':>10}")
+    for section, stats in snapshot.items():
+        print(
+            f"{section:<16} {stats['calls']:>10} {stats['seconds']:>10.2f} "
+            f"{stats['mean_seconds'] * 1e6:>10.1f} {stats['max_seconds'] * 1e3:>10.2f}"
+        )
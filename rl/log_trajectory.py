@@ -1,28 +1,69 @@
 import sys
 sys.path.append("/content/rl-liquidity-project")
 
-import os
-import pandas as pd
+import argparse
 
-from rl.episode_runner import load_trained_model, run_episode_with_model
+import numpy as np
+
+from rl.episode_runner import iter_episode, load_trained_model, run_episodes_batched
+from rl.numpy_policy import model_hash
+from rl.trajectory_store import TrajectoryStore, TrajectoryWriter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Log PPO episodes to a columnar trajectory store")
+    parser.add_argument("--model", default="rl/models/ppo_liquidity")
+    parser.add_argument("--store", default="data/trajectories/ppo_liquidity")
+    parser.add_argument("--n-episodes", type=int, default=1)
+    parser.add_argument("--max-steps", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None, help="episode i uses seed + i")
+    parser.add_argument("--csv", default=None, help="also export the whole store to this CSV file")
+    parser.add_argument("--chunk-size", type=int, default=256, help="steps written to the store at a time")
+    parser.add_argument(
+        "--batched",
+        action="store_true",
+        help="run all episodes in lockstep in memory (faster for many short episodes)",
+    )
+    return parser.parse_args()
 
 
 def main():
-    # Load trained PPO model
-    model = load_trained_model("rl/models/ppo_liquidity")
+    args = parse_args()
 
-    # Run one long episode and collect data as dict of lists
-    data = run_episode_with_model(model, max_steps=500)
+    # Load trained PPO model
+    model = load_trained_model(args.model)
+    writer = TrajectoryWriter(args.store, model_hash=model_hash(args.model))
 
-    # Ensure data directory exists
-    os.makedirs("data", exist_ok=True)
-    csv_path = "data/ppo_trajectory.csv"
+    if args.batched:
+        # Run all episodes in lockstep and collect columnar histories
+        data = run_episodes_batched(model, args.n_episodes, max_steps=args.max_steps, seed=args.seed)
+        for i in range(args.n_episodes):
+            length = int(data["length"][i])
+            writer.append_episode(
+                {
+                    "step": np.arange(length),
+                    "liquidity": data["liquidity"][i, :length],
+                    "volatility": data["volatility"][i, :length],
+                    "apy": data["apy"][i, :length],
+                    "reward": data["rewards"][i, :length],
+                    "action": data["action"][i, :length],
+                },
+                seed=None if args.seed is None else args.seed + i,
+            )
+    else:
+        # Stream each episode to disk chunk by chunk as it runs
+        for i in range(args.n_episodes):
+            seed = None if args.seed is None else args.seed + i
+            for chunk in iter_episode(model, max_steps=args.max_steps, seed=seed, chunk_size=args.chunk_size):
+                writer.write_steps(chunk)
+            writer.end_episode(seed)
 
-    # Convert to DataFrame and save
-    df = pd.DataFrame(data)
-    df.to_csv(csv_path, index=False)
+    store = TrajectoryStore(args.store)
+    print(f"Appended {args.n_episodes} episodes to {args.store} ({store.n_episodes} episodes in total)")
 
-    print(f"Saved {len(df)} steps to {csv_path}")
+    if args.csv:
+        n_rows = store.to_csv(args.csv)
+        print(f"Exported {n_rows} steps to {args.csv}")
 
 
 if __name__ == "__main__":
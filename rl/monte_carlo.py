@@ -0,0 +1,219 @@
+"""
+Large-scale Monte Carlo evaluation with streaming statistics.
+
+    python -m rl.monte_carlo --n-episodes 20000 --policies ppo rule --workers 4
+
+Seeded episodes are split into shards and evaluated across a process pool.
+Each worker runs its shard in lockstep batches and keeps only running
+aggregates (Welford mean/variance of the episode return, a quantile sketch,
+and per-step reward statistics), never the episodes themselves. The main
+process merges the aggregates as shards finish, so memory stays flat no
+matter how many episodes are run.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from env.liquidity_env import MAX_STEPS, LiquidityEnv
+from rl.stats import HistogramSketch, QuantileSketch, RunningStats
+
+# Per-step reward histograms: bins across the reward range
+STEP_REWARD_BINS = 512
+
+
+def reward_bounds(env: LiquidityEnv = None):
+    """Smallest and largest per-step reward the env can produce."""
+    env = env or LiquidityEnv()
+    low = -env.B * 1.0 - env.C * env.max_apy
+    high = env.A * 1.0 - env.C * env.min_apy
+    return low, high
+
+
+class PolicyAggregate:
+    """Mergeable summary of any number of episodes of one policy."""
+
+    def __init__(self, max_steps: int = MAX_STEPS, seed: int = None):
+        low, high = reward_bounds()
+        self.returns = RunningStats()
+        self.return_sketch = QuantileSketch(seed=seed)
+        self.step_rewards = RunningStats((max_steps,))
+        self.step_sketch = HistogramSketch(low, high, STEP_REWARD_BINS, shape=(max_steps,))
+
+    @property
+    def n_episodes(self) -> int:
+        return int(self.returns.count)
+
+    def update(self, rewards: np.ndarray, mask: np.ndarray) -> None:
+        """Fold in a batch of episodes: rewards/mask are [batch, max_steps]."""
+        returns = np.where(mask, rewards, 0.0).sum(axis=1)
+        self.returns.update(returns)
+        self.return_sketch.update(returns)
+        self.step_rewards.update(rewards, mask)
+        self.step_sketch.update(rewards, mask)
+
+    def merge(self, other: "PolicyAggregate") -> "PolicyAggregate":
+        self.returns.merge(other.returns)
+        self.return_sketch.merge(other.return_sketch)
+        self.step_rewards.merge(other.step_rewards)
+        self.step_sketch.merge(other.step_sketch)
+        return self
+
+    def summary(self) -> dict:
+        p5, p50, p95 = self.return_sketch.quantile([0.05, 0.5, 0.95])
+        return {
+            "n_episodes": self.n_episodes,
+            "mean": float(self.returns.mean),
+            "ci95": float(self.returns.ci95()),
+            "std": float(self.returns.std),
+            "p5": float(p5),
+            "p50": float(p50),
+            "p95": float(p95),
+        }
+
+
+def load_eval_policy(name: str, model_path: str):
+    """Policy object with a batched predict(): 'ppo' (the trained model) or 'rule'."""
+    if name == "ppo":
+        from rl.numpy_policy import load_policy
+
+        return load_policy(model_path)
+    if name == "rule":
+        from rl.compare_policies import RuleBasedPolicy
+
+        return RuleBasedPolicy()
+    raise ValueError(f"Unknown policy '{name}' (expected 'ppo' or 'rule')")
+
+
+# Loaded once per worker process, keyed by (name, model_path)
+_POLICIES = {}
+
+
+def evaluate_shard(policy_name: str, model_path: str, first_seed: int, n_episodes: int,
+                   batch_size: int, max_steps: int = MAX_STEPS) -> PolicyAggregate:
+    """Aggregate episodes seeded first_seed .. first_seed + n_episodes - 1."""
+    from env.batched_env import BatchedLiquidityEnv
+
+    key = (policy_name, model_path)
+    if key not in _POLICIES:
+        _POLICIES[key] = load_eval_policy(policy_name, model_path)
+        if "torch" in sys.modules:
+            # One torch thread per worker so the pool does not oversubscribe cores
+            sys.modules["torch"].set_num_threads(1)
+    policy = _POLICIES[key]
+
+    aggregate = PolicyAggregate(max_steps, seed=first_seed)
+    for start in range(0, n_episodes, batch_size):
+        n = min(batch_size, n_episodes - start)
+        env = BatchedLiquidityEnv(n, seed=first_seed + start)
+        obs = env.reset()
+
+        rewards = np.zeros((n, max_steps))
+        mask = np.zeros((n, max_steps), dtype=bool)
+        active = np.ones(n, dtype=bool)
+        for t in range(max_steps):
+            actions, _ = policy.predict(obs, deterministic=True)
+            obs, _, dones, _ = env.step(actions)
+            rewards[:, t] = env.last_rewards
+            mask[:, t] = active
+            active &= ~dones
+            if not active.any():
+                break
+
+        aggregate.update(rewards, mask)
+    return aggregate
+
+
+def run_monte_carlo(policies, n_episodes: int, model_path: str = "rl/models/ppo_liquidity",
+                    workers: int = None, shard_size: int = 2000, batch_size: int = 1000,
+                    seed: int = 0, max_steps: int = MAX_STEPS) -> dict:
+    """
+    Evaluate every policy on the same n_episodes seeds (seed .. seed + n - 1).
+
+    Returns {policy_name: PolicyAggregate}.
+    """
+    workers = workers or os.cpu_count() or 1
+    aggregates = {name: PolicyAggregate(max_steps, seed=seed) for name in policies}
+    shards = [
+        (name, model_path, seed + start, min(shard_size, n_episodes - start), batch_size, max_steps)
+        for name in policies
+        for start in range(0, n_episodes, shard_size)
+    ]
+
+    if workers == 1:
+        for shard in shards:
+            aggregates[shard[0]].merge(evaluate_shard(*shard))
+        return aggregates
+
+    ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+        futures = {pool.submit(evaluate_shard, *shard): shard[0] for shard in shards}
+        for future in as_completed(futures):
+            aggregates[futures[future]].merge(future.result())
+    return aggregates
+
+
+def save_bands(path: str, aggregates: dict) -> None:
+    """Per-step reward bands (mean, std, p5/p50/p95) of every policy to an .npz."""
+    arrays = {}
+    for name, agg in aggregates.items():
+        arrays[f"{name}_mean"] = agg.step_rewards.mean
+        arrays[f"{name}_std"] = agg.step_rewards.std
+        arrays[f"{name}_count"] = agg.step_rewards.count
+        for q in (0.05, 0.5, 0.95):
+            arrays[f"{name}_p{int(q * 100)}"] = agg.step_sketch.quantile(q)
+    np.savez(path, **arrays)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Monte Carlo evaluation over many seeded episodes")
+    parser.add_argument("--policies", nargs="+", default=["ppo", "rule"], choices=["ppo", "rule"])
+    parser.add_argument("--model", default="rl/models/ppo_liquidity")
+    parser.add_argument("--n-episodes", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--shard-size", type=int, default=2000, help="episodes per pool task")
+    parser.add_argument("--batch-size", type=int, default=1000, help="episodes stepped in lockstep")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="write the summary to this file")
+    parser.add_argument("--bands", default=None, help="write per-step reward bands to this .npz")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    aggregates = run_monte_carlo(
+        args.policies,
+        args.n_episodes,
+        model_path=args.model,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        batch_size=args.batch_size,
+        seed=args.seed,
+    )
+
+    summary = {name: agg.summary() for name, agg in aggregates.items()}
+    print("=====================================")
+    for name, s in summary.items():
+        print(
+            f"{name:6s}: mean total reward {s['mean']:.4f} ± {s['ci95']:.4f} (95% CI, "
+            f"n={s['n_episodes']}), std {s['std']:.3f}, "
+            f"p5/p50/p95 {s['p5']:.3f} / {s['p50']:.3f} / {s['p95']:.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved summary to {args.json}")
+    if args.bands:
+        save_bands(args.bands, aggregates)
+        print(f"Saved per-step reward bands to {args.bands}")
+
+
+if __name__ == "__main__":
+    main()
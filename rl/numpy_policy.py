@@ -0,0 +1,178 @@
+"""
+Torch-free inference for the trained MlpPolicy.
+
+    python -m rl.numpy_policy --model rl/models/ppo_liquidity
+
+exports the actor of the PPO zip (policy MLP + action head) to
+rl/models/ppo_liquidity_policy.npz. NumpyPolicy loads that file and runs the
+deterministic forward pass in pure NumPy, so inference-only code never has
+to import stable_baselines3 or torch. The export records the sha256 of the
+zip it came from; load_policy() only uses an .npz that matches the zip next
+to it.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import hashlib
+import os
+
+import numpy as np
+
+_ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0.0),
+    "Identity": lambda x: x,
+}
+
+
+def numpy_policy_path(model_path: str) -> str:
+    """rl/models/ppo_liquidity[.zip] -> rl/models/ppo_liquidity_policy.npz"""
+    if model_path.endswith(".zip"):
+        model_path = model_path[: -len(".zip")]
+    return model_path + "_policy.npz"
+
+
+def model_zip(model_path: str) -> str:
+    return model_path if model_path.endswith(".zip") else model_path + ".zip"
+
+
+def model_hash(model_path: str) -> str:
+    """sha256 of a saved model's zip."""
+    digest = hashlib.sha256()
+    with open(model_zip(model_path), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def policy_arrays(policy) -> dict:
+    """Copies of the actor weights of a live MlpPolicy, as saved by export_policy."""
+    import torch.nn as nn
+
+    arrays = {}
+    linears = [m for m in policy.mlp_extractor.policy_net if isinstance(m, nn.Linear)]
+    for i, layer in enumerate(linears):
+        arrays[f"w{i}"] = layer.weight.detach().cpu().numpy().T.copy()
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().copy()
+    arrays["action_w"] = policy.action_net.weight.detach().cpu().numpy().T.copy()
+    arrays["action_b"] = policy.action_net.bias.detach().cpu().numpy().copy()
+    arrays["activation"] = np.array(policy.activation_fn.__name__)
+    return arrays
+
+
+def export_policy(model_path: str, out_path: str = None) -> str:
+    """
+    Write the actor weights of a saved PPO MlpPolicy to an .npz file, along
+    with the sha256 of the zip they were read from (model_hash).
+    """
+    from stable_baselines3 import PPO
+
+    out_path = out_path or numpy_policy_path(model_path)
+    policy = PPO.load(model_path, device="cpu").policy
+    np.savez(out_path, model_hash=np.array(model_hash(model_path)), **policy_arrays(policy))
+    return out_path
+
+
+def exported_hash(npz_path: str):
+    """model_hash recorded by export_policy, or None for an older export."""
+    with np.load(npz_path) as data:
+        return str(data["model_hash"]) if "model_hash" in data.files else None
+
+
+class NumpyPolicy:
+    """
+    Deterministic MlpPolicy actor in pure NumPy.
+
+    predict() mirrors SB3's model.predict(): it accepts one observation or an
+    [N, obs_dim] batch and returns (actions, None), with a 0-d action array
+    for a single observation. Only deterministic (argmax) inference is
+    supported.
+    """
+
+    def __init__(self, weights, biases, action_w, action_b, activation: str = "Tanh"):
+        if activation not in _ACTIVATIONS:
+            raise ValueError(f"Unsupported activation '{activation}'")
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.action_w = np.asarray(action_w, dtype=np.float32)
+        self.action_b = np.asarray(action_b, dtype=np.float32)
+        self.activation = activation
+        self._act = _ACTIVATIONS[activation]
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "NumpyPolicy":
+        """Build from a mapping laid out like policy_arrays() / the .npz file."""
+        n_layers = sum(1 for key in arrays.keys() if key.startswith("w"))
+        return cls(
+            [arrays[f"w{i}"] for i in range(n_layers)],
+            [arrays[f"b{i}"] for i in range(n_layers)],
+            arrays["action_w"],
+            arrays["action_b"],
+            str(arrays["activation"]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            return cls.from_arrays(data)
+
+    def logits(self, obs: np.ndarray) -> np.ndarray:
+        """Action logits for an [N, obs_dim] batch."""
+        x = np.asarray(obs, dtype=np.float32)
+        for w, b in zip(self.weights, self.biases):
+            x = self._act(x @ w + b)
+        return x @ self.action_w + self.action_b
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(observation, dtype=np.float32)
+        single = obs.ndim == 1
+        actions = self.logits(obs.reshape(-1, self.weights[0].shape[0])).argmax(axis=1)
+        return (actions[0] if single else actions), None
+
+
+def load_policy(model_path: str = "rl/models/ppo_liquidity"):
+    """
+    Inference-only policy for model_path: the exported NumpyPolicy when its
+    .npz exists next to the zip and was exported from that zip, otherwise
+    the PPO model itself. A stale or unhashed export (the zip was retrained
+    or replaced since) is ignored. Without the zip the .npz is used as is.
+    """
+    npz_path = numpy_policy_path(model_path)
+    if os.path.exists(npz_path):
+        if not os.path.exists(model_zip(model_path)) or exported_hash(npz_path) == model_hash(model_path):
+            return NumpyPolicy.load(npz_path)
+
+    from stable_baselines3 import PPO
+
+    return PPO.load(model_path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export a PPO MlpPolicy actor to NumPy")
+    parser.add_argument("--model", default="rl/models/ppo_liquidity")
+    parser.add_argument("--out", default=None, help="defaults to <model>_policy.npz")
+    parser.add_argument("--n-check", type=int, default=100000, help="random states compared against the model")
+    return parser.parse_args()
+
+
+def main():
+    from stable_baselines3 import PPO
+
+    args = parse_args()
+    out_path = export_policy(args.model, args.out)
+    print(f"Saved NumPy policy to {out_path}")
+
+    # Check the export against the original network
+    model = PPO.load(args.model, device="cpu")
+    policy = NumpyPolicy.load(out_path)
+    space = model.observation_space
+    obs = np.random.default_rng(0).uniform(space.low, space.high, size=(args.n_check, space.shape[0]))
+    obs = obs.astype(np.float32)
+    theirs, _ = model.predict(obs, deterministic=True)
+    ours, _ = policy.predict(obs)
+    print(f"Action agreement with PPO.predict on {args.n_check} states: {np.mean(ours == theirs):.4%}")
+
+
+if __name__ == "__main__":
+    main()
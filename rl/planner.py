@@ -0,0 +1,93 @@
+"""
+Receding-horizon beam-search planner: a non-learned baseline for PPO.
+
+    python -m rl.tournament --policies ppo planner rule
+
+At every step BeamSearchPlanner looks `horizon` steps ahead from the
+observation: each of the beam_width best action sequences so far is
+extended by all 5 APY actions, the extensions are scored by their return
+averaged over n_scenarios volatility-noise paths, and the beam_width best
+survive. It then plays the first action of the best full sequence and
+plans again at the next step.
+
+All sequences, beams and observations of a batch advance together through
+env.simulate.advance (the env's own dynamics), one NumPy call per depth.
+The noise paths are drawn once, from seed, and shared by every sequence, so
+sequences are compared on common noise and the planner is a deterministic
+function of the observation (reproducible and cacheable, like a trained
+policy). It never sees the env's future noise; for exact what-if rollouts
+from an env state use env.simulate.branch.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import numpy as np
+
+from env.liquidity_env import APY_DELTAS, VOL_NOISE_STD, LiquidityEnv
+from env.simulate import advance
+
+HORIZON = 12
+BEAM_WIDTH = 16
+N_SCENARIOS = 8
+
+
+class BeamSearchPlanner:
+    """Beam search over APY action sequences, with the model.predict() signature."""
+
+    def __init__(self, horizon: int = HORIZON, beam_width: int = BEAM_WIDTH,
+                 n_scenarios: int = N_SCENARIOS, seed: int = 0, env: LiquidityEnv = None):
+        self.horizon = horizon
+        self.beam_width = beam_width
+        # Dynamics parameters (APY bounds, reward weights)
+        self.env = env or LiquidityEnv()
+        if n_scenarios > 0:
+            self.noise = np.random.default_rng(seed).normal(0.0, VOL_NOISE_STD, (n_scenarios, horizon))
+        else:
+            # Plan on the noise-free (expected) dynamics
+            self.noise = np.zeros((1, horizon))
+
+    def plan(self, observations: np.ndarray):
+        """
+        Best first action and its planned mean return for each observation of
+        an [N, obs_dim] batch (only the first three columns are used).
+        """
+        obs = np.asarray(observations, dtype=np.float64)
+        obs = obs.reshape(-1, obs.shape[-1])[:, :3]
+        n = len(obs)
+        n_actions = len(APY_DELTAS)
+        n_scenarios = len(self.noise)
+        rows = np.arange(n)[:, None]
+
+        # State of every beam under every scenario: [N, beams, scenarios]
+        liquidity, volatility, apy = (
+            np.repeat(obs[:, i, None, None], n_scenarios, axis=2) for i in range(3)
+        )
+        value = np.zeros((n, 1))
+        first = np.zeros((n, 1), dtype=np.int64)
+
+        for depth in range(self.horizon):
+            n_beams = liquidity.shape[1]
+            # Children: beam b, action a -> column b * n_actions + a
+            liquidity, volatility, apy = (np.repeat(x, n_actions, axis=1) for x in (liquidity, volatility, apy))
+            deltas = np.tile(APY_DELTAS, n_beams)[None, :, None]
+            rewards = advance(liquidity, volatility, apy, deltas, self.noise[:, depth], env=self.env)
+
+            value = np.repeat(value, n_actions, axis=1) + rewards.mean(axis=2)
+            if depth == 0:
+                first = np.broadcast_to(np.arange(n_actions), (n, n_actions))
+            else:
+                first = np.repeat(first, n_actions, axis=1)
+
+            if value.shape[1] > self.beam_width:
+                keep = np.argpartition(-value, self.beam_width - 1, axis=1)[:, : self.beam_width]
+                liquidity, volatility, apy = liquidity[rows, keep], volatility[rows, keep], apy[rows, keep]
+                value, first = value[rows, keep], first[rows, keep]
+
+        best = value.argmax(axis=1)
+        return first[np.arange(n), best], value[np.arange(n), best]
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(observation)
+        single = obs.ndim == 1
+        actions, _ = self.plan(obs)
+        return (actions[0] if single else actions), None
@@ -0,0 +1,249 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import (
+    VecEnv,
+    VecEnvIndices,
+    VecEnvObs,
+    VecEnvStepReturn,
+)
+
+from env.batched_env import BatchedLiquidityEnv
+from env.liquidity_env import LiquidityEnv
+from env.market_replay import MarketSeries
+
+# Hot-path commands are raw bytes, nothing on the step path is pickled
+_STEP = b"s"
+_RESET = b"r"
+_CALL = b"c"
+_CLOSE = b"x"
+_DONE = b"k"
+
+
+def _buffer_layout(n_envs: int, obs_dim: int = 3):
+    """(name, shape, dtype) of every array living in the shared block."""
+    return [
+        ("actions", (n_envs,), np.int64),
+        ("obs", (n_envs, obs_dim), np.float32),
+        ("terminal_obs", (n_envs, obs_dim), np.float32),
+        ("rewards", (n_envs,), np.float32),
+        ("dones", (n_envs,), np.bool_),
+    ]
+
+
+def _buffer_size(n_envs: int, obs_dim: int = 3) -> int:
+    return sum(
+        int(np.prod(shape)) * np.dtype(dtype).itemsize
+        for _, shape, dtype in _buffer_layout(n_envs, obs_dim)
+    )
+
+
+def _attach_arrays(buf, n_envs: int, obs_dim: int = 3) -> dict:
+    """NumPy views over the shared block, one per field of _buffer_layout."""
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in _buffer_layout(n_envs, obs_dim):
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return arrays
+
+
+def _worker(
+    conn,
+    shm_name: str,
+    n_envs: int,
+    start: int,
+    stop: int,
+    seed: Optional[int],
+    replay: Optional[str],
+    replay_columns: Tuple[str, ...],
+) -> None:
+    """Step pools [start, stop) of the shared batch until told to close."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = _attach_arrays(shm.buf, n_envs, 3 + len(replay_columns))
+    actions = arrays["actions"][start:stop]
+    obs_buf = arrays["obs"][start:stop]
+    terminal_buf = arrays["terminal_obs"][start:stop]
+    reward_buf = arrays["rewards"][start:stop]
+    done_buf = arrays["dones"][start:stop]
+
+    # Each worker maps the replay series itself; nothing but the path is sent
+    env = BatchedLiquidityEnv(
+        stop - start,
+        seed=None if seed is None else seed + start,
+        replay=replay,
+        replay_columns=replay_columns,
+    )
+
+    try:
+        while True:
+            cmd = conn.recv_bytes()
+            if cmd == _STEP:
+                obs, rewards, dones, infos = env.step(actions)
+                obs_buf[:] = obs
+                reward_buf[:] = rewards
+                done_buf[:] = dones
+                for i in np.flatnonzero(dones):
+                    terminal_buf[i] = infos[i]["terminal_observation"]
+                conn.send_bytes(_DONE)
+            elif cmd == _RESET:
+                env._seeds = conn.recv()
+                obs_buf[:] = env.reset()
+                conn.send_bytes(_DONE)
+            elif cmd == _CALL:
+                method, args, kwargs, indices = conn.recv()
+                try:
+                    conn.send((True, getattr(env, method)(*args, indices=indices, **kwargs)))
+                except Exception as exc:
+                    # Raised again in the caller; the worker keeps serving
+                    conn.send((False, exc))
+            elif cmd == _CLOSE:
+                break
+    finally:
+        del actions, obs_buf, terminal_buf, reward_buf, done_buf, arrays
+        shm.close()
+        conn.close()
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    BatchedLiquidityEnv split across worker processes.
+
+    Each worker owns a contiguous slice of the n_envs pools and steps it with
+    BatchedLiquidityEnv. Actions, observations, rewards, dones and terminal
+    observations are exchanged through one shared-memory block; the pipes to
+    the workers only carry one-byte "step"/"reset" commands and the replies.
+    get_attr/set_attr/env_method (with their arguments) are pickled to the
+    workers owning the requested pools, off the hot path.
+
+    Pool i is seeded with seed + i, exactly as in BatchedLiquidityEnv, so
+    results do not depend on the number of workers. replay/replay_columns
+    are passed on to every worker's BatchedLiquidityEnv.
+    """
+
+    def __init__(
+        self,
+        n_envs: int,
+        n_workers: int,
+        seed: Optional[int] = None,
+        start_method: Optional[str] = None,
+        replay=None,
+        replay_columns: Tuple[str, ...] = (),
+    ):
+        if not 1 <= n_workers <= n_envs:
+            raise ValueError(f"n_workers must be between 1 and n_envs ({n_envs}), got {n_workers}")
+
+        replay_path = replay.path if isinstance(replay, MarketSeries) else replay
+        replay_columns = tuple(replay_columns)
+        obs_dim = 3 + len(replay_columns)
+
+        self.render_mode = None
+        self._shm = shared_memory.SharedMemory(create=True, size=_buffer_size(n_envs, obs_dim))
+        self._arrays = _attach_arrays(self._shm.buf, n_envs, obs_dim)
+
+        if start_method is None:
+            # Same default as SB3's SubprocVecEnv: fork is unsafe with threads
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        self._slices = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+        self._conns = []
+        self._processes = []
+        for start, stop in self._slices:
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(child_conn, self._shm.name, n_envs, start, stop, seed, replay_path, replay_columns),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+        template = LiquidityEnv(replay=replay, replay_columns=replay_columns)
+        self.closed = False
+        super().__init__(n_envs, template.observation_space, template.action_space)
+
+    def _broadcast(self, cmd: bytes) -> None:
+        for conn in self._conns:
+            conn.send_bytes(cmd)
+
+    def _wait(self) -> None:
+        for conn in self._conns:
+            conn.recv_bytes()
+
+    def reset(self) -> VecEnvObs:
+        for conn, (start, stop) in zip(self._conns, self._slices):
+            conn.send_bytes(_RESET)
+            conn.send(self._seeds[start:stop])
+        self._wait()
+        self._reset_seeds()
+        self._reset_options()
+        return self._arrays["obs"].copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._arrays["actions"][:] = np.asarray(actions).reshape(self.num_envs)
+        self._broadcast(_STEP)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        self._wait()
+        dones = self._arrays["dones"].copy()
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        for i in np.flatnonzero(dones):
+            infos[i]["terminal_observation"] = self._arrays["terminal_obs"][i].copy()
+            infos[i]["TimeLimit.truncated"] = False
+        return self._arrays["obs"].copy(), self._arrays["rewards"].copy(), dones, infos
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._broadcast(_CLOSE)
+        for process in self._processes:
+            process.join()
+        for conn in self._conns:
+            conn.close()
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+        self.closed = True
+
+    # -----------------------------
+    # VecEnv plumbing
+    # -----------------------------
+    def _call(self, method: str, args: Sequence, indices: VecEnvIndices, kwargs: Optional[dict] = None) -> List[Any]:
+        """Run a BatchedLiquidityEnv method in every worker owning one of indices."""
+        results = []
+        wanted = list(self._get_indices(indices))
+        for conn, (start, stop) in zip(self._conns, self._slices):
+            local = [i - start for i in wanted if start <= i < stop]
+            if not local:
+                continue
+            conn.send_bytes(_CALL)
+            conn.send((method, tuple(args), kwargs or {}, local))
+            ok, result = conn.recv()
+            if not ok:
+                raise result
+            results.append(result)
+        return results
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        if attr_name == "render_mode":
+            return [self.render_mode for _ in self._get_indices(indices)]
+        return [value for chunk in self._call("get_attr", (attr_name,), indices) for value in chunk]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        self._call("set_attr", (attr_name, value), indices)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        return [
+            value
+            for chunk in self._call("env_method", (method_name, *method_args), indices, method_kwargs)
+            for value in chunk
+        ]
+
+    def env_is_wrapped(self, wrapper_class, indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,188 @@
+"""
+Streaming, mergeable statistics for large evaluations.
+
+Memory stays bounded however many samples an accumulator sees (constant,
+or logarithmic for QuantileSketch), and accumulators filled in different
+processes merge into one equivalent to having seen every sample in one
+place.
+"""
+import numpy as np
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+class RunningStats:
+    """
+    Welford mean/variance, elementwise over arrays of a fixed shape.
+
+    shape=() tracks one scalar series; shape=(T,) tracks T series at once
+    (e.g. the reward at every timestep). Batches are folded in with Chan et
+    al.'s parallel update, which is also how merge() combines workers.
+    """
+
+    def __init__(self, shape=()):
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+
+    def _combine(self, count, mean, m2) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        safe_total = np.maximum(total, 1)
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / safe_total
+        self.count = total
+
+    def update(self, values: np.ndarray, mask: np.ndarray = None) -> None:
+        """Fold in a batch of samples, shape [batch, *shape]; mask drops samples."""
+        values = np.asarray(values, dtype=np.float64)
+        if mask is None:
+            mask = np.ones(values.shape, dtype=bool)
+        else:
+            mask = np.broadcast_to(mask, values.shape)
+
+        count = mask.sum(axis=0)
+        safe_count = np.maximum(count, 1)
+        mean = np.where(mask, values, 0.0).sum(axis=0) / safe_count
+        m2 = np.where(mask, (values - mean) ** 2, 0.0).sum(axis=0)
+        self._combine(count, mean, m2)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Sample variance (ddof=1); NaN with fewer than two samples."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    def ci95(self) -> np.ndarray:
+        """Half-width of the normal 95% confidence interval of the mean."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return Z_95 * self.std / np.sqrt(self.count)
+
+
+class HistogramSketch:
+    """
+    Fixed-bin quantile sketch over a known [low, high] range.
+
+    Counts are exact and add up under merge(); quantiles are accurate to one
+    bin width, (high - low) / n_bins. Values outside the range land in the
+    first/last bin, and the exact min/max are kept alongside. With shape=(T,)
+    it sketches T series at once.
+    """
+
+    def __init__(self, low: float, high: float, n_bins: int = 2048, shape=()):
+        self.low = float(low)
+        self.high = float(high)
+        self.n_bins = n_bins
+        self.shape = tuple(shape)
+        self.counts = np.zeros(self.shape + (n_bins,), dtype=np.int64)
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+
+    def update(self, values: np.ndarray, mask: np.ndarray = None) -> None:
+        """Fold in a batch of samples, shape [batch, *shape]; mask drops samples."""
+        values = np.asarray(values, dtype=np.float64)
+        if mask is None:
+            mask = np.ones(values.shape, dtype=bool)
+        else:
+            mask = np.broadcast_to(mask, values.shape)
+
+        bins = ((values - self.low) / (self.high - self.low) * self.n_bins).astype(np.int64)
+        np.clip(bins, 0, self.n_bins - 1, out=bins)
+
+        # Flatten (series, bin) pairs into one bincount over the whole table
+        n_series = int(np.prod(self.shape)) if self.shape else 1
+        series = np.broadcast_to(np.arange(n_series).reshape(self.shape or (1,)), values.shape)
+        flat = (series * self.n_bins + bins)[mask]
+        self.counts += np.bincount(flat, minlength=n_series * self.n_bins).reshape(self.counts.shape)
+
+        self.min = np.minimum(self.min, np.where(mask, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(mask, values, -np.inf).max(axis=0))
+
+    def merge(self, other: "HistogramSketch") -> "HistogramSketch":
+        if (other.low, other.high, other.n_bins, other.shape) != (self.low, self.high, self.n_bins, self.shape):
+            raise ValueError("Can only merge sketches with the same range, bins and shape")
+        self.counts += other.counts
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """Approximate q-quantile (bin midpoint), clamped to the observed min/max."""
+        cumulative = np.cumsum(self.counts, axis=-1)
+        total = cumulative[..., -1:]
+        target = np.maximum(np.ceil(q * total), 1)
+        idx = (cumulative < target).sum(axis=-1)
+        idx = np.minimum(idx, self.n_bins - 1)
+
+        width = (self.high - self.low) / self.n_bins
+        value = self.low + (idx + 0.5) * width
+        with np.errstate(invalid="ignore"):
+            value = np.clip(value, self.min, self.max)
+        return np.where(total[..., 0] > 0, value, np.nan)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch for one scalar series (KLL-style compactors).
+
+    Level h holds samples that each stand for 2**h originals. When a level
+    reaches 2 * k items it is sorted and every other item (random offset) is
+    promoted to the next level. Memory is O(k log(n / k)) and the rank error
+    shrinks like 1 / k, whatever the spread of the data, so it stays useful
+    for tightly clustered values where a fixed-bin histogram would not.
+    """
+
+    def __init__(self, k: int = 1024, seed: int = None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) >= 2 * self.k:
+                items = np.sort(self.levels[h])
+                keep = items[len(items) - len(items) % 2:]
+                items = items[: len(items) - len(items) % 2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = keep
+            h += 1
+
+    def quantile(self, q) -> np.ndarray:
+        """Approximate q-quantile(s); NaN when empty."""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0**h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cumulative = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side="left")
+        return items[np.minimum(idx, len(items) - 1)]
@@ -0,0 +1,326 @@
+"""
+Hyperparameter and reward-weight sweeps for PPO on LiquidityEnv.
+
+    python -m rl.sweep --random 24 --workers 4 --timesteps 50000
+    python -m rl.sweep --grid --param learning_rate=1e-4,3e-4 --param B=0.25,0.5,1.0
+
+Every trial trains PPO with one config (PPO arguments plus the env reward
+weights A, B, C) in its own pool process, pinned to a single thread. Every
+eval_freq timesteps the policy is scored on fixed seeded episodes under the
+default reward, so configs with different reward weights stay comparable.
+A trial whose score is below the median of the other trials at the same
+point is stopped early. Configs, intermediate scores, timings and final
+scores all go to a SQLite file, which any number of sweeps can share.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+DB_PATH = "data/sweeps.sqlite"
+
+# Values tried for every parameter; --param name=v1,v2,... overrides one
+SEARCH_SPACE = {
+    "learning_rate": [1e-4, 3e-4, 1e-3],
+    "n_steps": [128, 256, 512],
+    "batch_size": [64, 128],
+    "gamma": [0.95, 0.99, 0.995],
+    "gae_lambda": [0.9, 0.95],
+    "ent_coef": [0.0, 0.01],
+    "clip_range": [0.1, 0.2, 0.3],
+    "A": [1.0],
+    "B": [0.25, 0.5, 1.0],
+    "C": [0.1, 0.2, 0.4],
+}
+
+# Environment variables read by the BLAS/OpenMP runtimes at import time
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY,
+    sweep TEXT NOT NULL,
+    config TEXT NOT NULL,
+    status TEXT NOT NULL,
+    score REAL,
+    timesteps INTEGER,
+    train_seconds REAL,
+    started REAL,
+    finished REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    trial_id INTEGER NOT NULL REFERENCES trials(id),
+    timesteps INTEGER NOT NULL,
+    score REAL NOT NULL,
+    train_seconds REAL NOT NULL,
+    PRIMARY KEY (trial_id, timesteps)
+);
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Connection to the results store, created on first use."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    # Trials in other processes write concurrently: WAL plus a generous timeout
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def grid_configs(space: dict) -> list:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_configs(space: dict, n: int, seed: int = None) -> list:
+    """n distinct configs drawn uniformly from the grid (all of it if smaller)."""
+    sizes = [len(values) for values in space.values()]
+    total = int(np.prod(sizes))
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(total, size=min(n, total), replace=False)
+    configs = []
+    for flat in picks:
+        idx = np.unravel_index(flat, sizes)
+        configs.append({name: values[i] for (name, values), i in zip(space.items(), idx)})
+    return configs
+
+
+def median_score(conn: sqlite3.Connection, sweep: str, trial_id: int, timesteps: int):
+    """Median score of the sweep's other trials at this point, and how many there are."""
+    rows = conn.execute(
+        "SELECT e.score FROM evaluations e JOIN trials t ON t.id = e.trial_id "
+        "WHERE t.sweep = ? AND e.trial_id != ? AND e.timesteps = ?",
+        (sweep, trial_id, timesteps),
+    ).fetchall()
+    if not rows:
+        return None, 0
+    return float(np.median([score for (score,) in rows])), len(rows)
+
+
+@contextlib.contextmanager
+def _thread_env(threads: int):
+    """Set THREAD_ENV_VARS for pools started inside the block, then restore them."""
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _pin_threads(threads: int) -> None:
+    """Pool initializer: one trial per core, torch included."""
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def run_trial(db_path: str, sweep: str, trial_id: int, config: dict, settings: dict) -> dict:
+    """Train one config, reporting evaluations as it goes; returns its final row."""
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    from rl.episode_runner import run_episodes_batched
+    from rl.train_ppo import apply_reward_weights, make_vec_env, split_config
+
+    conn = connect(db_path)
+    started = time.time()
+    conn.execute("UPDATE trials SET status = 'running', started = ? WHERE id = ?", (started, trial_id))
+    conn.commit()
+
+    def evaluate(model) -> float:
+        # Default reward weights, fixed seeds: comparable across every trial
+        episodes = run_episodes_batched(model, settings["eval_episodes"], seed=settings["eval_seed"])
+        return float(np.mean(episodes["total_reward"]))
+
+    class EarlyStopping(BaseCallback):
+        """Evaluate every eval_freq timesteps; stop below the median of the other trials."""
+
+        def __init__(self):
+            super().__init__()
+            self.next_eval = settings["eval_freq"]
+            self.train_seconds = 0.0
+            self.last_resume = time.perf_counter()
+            self.pruned = False
+
+        def _on_step(self) -> bool:
+            if self.num_timesteps < self.next_eval:
+                return True
+            self.train_seconds += time.perf_counter() - self.last_resume
+            checkpoint = self.next_eval
+            self.next_eval += settings["eval_freq"]
+
+            score = evaluate(self.model)
+            conn.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?)",
+                (trial_id, checkpoint, score, self.train_seconds),
+            )
+            conn.commit()
+
+            median, n_others = median_score(conn, sweep, trial_id, checkpoint)
+            self.last_resume = time.perf_counter()
+            if (
+                checkpoint >= settings["min_timesteps"]
+                and n_others >= settings["min_trials"]
+                and score < median
+            ):
+                self.pruned = True
+                return False
+            return True
+
+    try:
+        ppo_kwargs, weights = split_config(config)
+        env = make_vec_env(settings["n_envs"], 1, seed=settings["seed"])
+        apply_reward_weights(env, weights)
+        model = PPO("MlpPolicy", env, seed=settings["seed"], verbose=0, **ppo_kwargs)
+
+        callback = EarlyStopping()
+        model.learn(total_timesteps=settings["timesteps"], callback=callback)
+        callback.train_seconds += time.perf_counter() - callback.last_resume
+        env.close()
+
+        row = {
+            "status": "pruned" if callback.pruned else "completed",
+            "score": evaluate(model),
+            "timesteps": int(model.num_timesteps),
+            "train_seconds": callback.train_seconds,
+            "error": None,
+        }
+    except Exception as e:
+        row = {"status": "failed", "score": None, "timesteps": None, "train_seconds": None, "error": repr(e)}
+
+    row["finished"] = time.time()
+    conn.execute(
+        "UPDATE trials SET status = ?, score = ?, timesteps = ?, train_seconds = ?, error = ?, finished = ? "
+        "WHERE id = ?",
+        (row["status"], row["score"], row["timesteps"], row["train_seconds"], row["error"], row["finished"], trial_id),
+    )
+    conn.commit()
+    conn.close()
+    return {"id": trial_id, "config": config, **row}
+
+
+def run_sweep(configs, db_path: str = DB_PATH, sweep: str = None, workers: int = None,
+              threads_per_worker: int = 1, **settings) -> list:
+    """Run every config as a trial of one sweep; returns the final trial rows."""
+    sweep = sweep or time.strftime("sweep-%Y%m%d-%H%M%S")
+    conn = connect(db_path)
+    trial_ids = []
+    for config in configs:
+        cursor = conn.execute(
+            "INSERT INTO trials (sweep, config, status) VALUES (?, ?, 'pending')",
+            (sweep, json.dumps(config, sort_keys=True)),
+        )
+        trial_ids.append(cursor.lastrowid)
+    conn.commit()
+    conn.close()
+
+    workers = workers or os.cpu_count() or 1
+    ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+    results = []
+    # Workers start fresh interpreters, so BLAS/OpenMP pick these up at import;
+    # the caller's own environment is restored once the pool has shut down
+    with _thread_env(threads_per_worker), ProcessPoolExecutor(
+        workers, mp_context=ctx, initializer=_pin_threads, initargs=(threads_per_worker,)
+    ) as pool:
+        futures = [
+            pool.submit(run_trial, db_path, sweep, trial_id, config, settings)
+            for trial_id, config in zip(trial_ids, configs)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            score = "-" if result["score"] is None else f"{result['score']:.3f}"
+            print(
+                f"[{len(results)}/{len(futures)}] trial {result['id']} {result['status']:9s} "
+                f"score={score} {json.dumps(result['config'], sort_keys=True)}",
+                flush=True,
+            )
+    return results
+
+
+def parse_param(text: str):
+    """'name=v1,v2' -> (name, [v1, v2]) with numeric values parsed."""
+    name, _, values = text.partition("=")
+    if name not in SEARCH_SPACE or not values:
+        raise argparse.ArgumentTypeError(f"expected name=v1,v2,... with name in {sorted(SEARCH_SPACE)}")
+    return name, [json.loads(v) for v in values.split(",")]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sweep PPO hyperparameters and reward weights")
+    search = parser.add_mutually_exclusive_group()
+    search.add_argument("--grid", action="store_true", help="every combination of the search space")
+    search.add_argument("--random", type=int, default=16, help="number of random configs (default)")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help="override one parameter's values: name=v1,v2,...")
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--timesteps", type=int, default=50000, help="per trial")
+    parser.add_argument("--n-envs", type=int, default=8)
+    parser.add_argument("--eval-freq", type=int, default=10000, help="timesteps between evaluations")
+    parser.add_argument("--eval-episodes", type=int, default=10)
+    parser.add_argument("--min-trials", type=int, default=3,
+                        help="other trials needed at a checkpoint before pruning against their median")
+    parser.add_argument("--min-timesteps", type=int, default=20000, help="never prune before this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--name", default=None, help="sweep name (default: timestamp)")
+    parser.add_argument("--best-json", default=None, help="write the best config here (for train_ppo --config)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    space = dict(SEARCH_SPACE)
+    space.update(dict(args.param))
+    configs = grid_configs(space) if args.grid else random_configs(space, args.random, seed=args.seed)
+    print(f"Running {len(configs)} trials")
+
+    results = run_sweep(
+        configs,
+        db_path=args.db,
+        sweep=args.name,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        timesteps=args.timesteps,
+        n_envs=args.n_envs,
+        eval_freq=args.eval_freq,
+        eval_episodes=args.eval_episodes,
+        eval_seed=args.seed + 10_000,
+        min_trials=args.min_trials,
+        min_timesteps=args.min_timesteps,
+        seed=args.seed,
+    )
+
+    scored = sorted((r for r in results if r["score"] is not None), key=lambda r: -r["score"])
+    print("=====================================")
+    for r in scored[:5]:
+        print(f"trial {r['id']}: score {r['score']:.3f} ({r['status']}, {r['train_seconds']:.0f}s) {r['config']}")
+    print(f"Results stored in {args.db}")
+
+    if args.best_json and scored:
+        with open(args.best_json, "w") as f:
+            json.dump(scored[0]["config"], f, indent=2)
+        print(f"Saved best config to {args.best_json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Precompute a trained policy on a 3-D state grid for torch-free O(1) lookup.
+
+    python -m rl.tabulate_policy --model rl/models/ppo_liquidity \
+        --out rl/models/ppo_liquidity_table.npz --grid 64 64 64
+
+The observation is [liquidity, volatility, current_apy], three bounded
+floats, so the deterministic policy can be evaluated once on every grid node
+and stored as a uint8 action table. TabulatedPolicy.predict() then answers
+with an index computation instead of a network forward pass.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+
+import numpy as np
+
+from env.liquidity_env import LiquidityEnv
+
+# Forward passes per model.predict call while filling the table
+PREDICT_CHUNK = 65536
+
+
+def grid_bounds(env: LiquidityEnv = None):
+    """
+    Lower/upper grid corners: the observation space, with APY limited to the
+    env's [min_apy, max_apy] since the APY never leaves that range.
+    """
+    env = env or LiquidityEnv()
+    low = env.observation_space.low.astype(np.float64)
+    high = env.observation_space.high.astype(np.float64)
+    low[2], high[2] = env.min_apy, env.max_apy
+    return low, high
+
+
+def grid_points(shape, low, high) -> np.ndarray:
+    """All grid nodes as an [prod(shape), 3] float32 array in C order."""
+    axes = [np.linspace(lo, hi, n) for n, lo, hi in zip(shape, low, high)]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return np.stack([m.ravel() for m in mesh], axis=1).astype(np.float32)
+
+
+def build_table(model, shape=(64, 64, 64), low=None, high=None) -> np.ndarray:
+    """Deterministic action of `model` at every grid node, shape `shape`, uint8."""
+    if low is None or high is None:
+        low, high = grid_bounds()
+    points = grid_points(shape, low, high)
+
+    actions = np.empty(len(points), dtype=np.uint8)
+    for start in range(0, len(points), PREDICT_CHUNK):
+        chunk = points[start:start + PREDICT_CHUNK]
+        actions[start:start + len(chunk)], _ = model.predict(chunk, deterministic=True)
+    return actions.reshape(shape)
+
+
+def save_table(path: str, table: np.ndarray, low, high) -> None:
+    np.savez(path, table=table, low=np.asarray(low), high=np.asarray(high))
+
+
+class TabulatedPolicy:
+    """
+    Lookup-table policy with the model.predict() call signature.
+
+    mode="nearest" returns the action stored at the closest grid node.
+    mode="interpolate" lets the 8 surrounding nodes vote with their trilinear
+    weights and returns the action with the largest total weight.
+    """
+
+    def __init__(self, table: np.ndarray, low, high, mode: str = "nearest"):
+        if mode not in ("nearest", "interpolate"):
+            raise ValueError(f"Unknown lookup mode '{mode}'")
+        self.table = np.asarray(table, dtype=np.uint8)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.mode = mode
+        self.n_actions = int(self.table.max()) + 1
+
+        self._shape = np.array(self.table.shape)
+        self._scale = (self._shape - 1) / (self.high - self.low)
+
+    @classmethod
+    def load(cls, path: str, mode: str = "nearest") -> "TabulatedPolicy":
+        with np.load(path) as data:
+            return cls(data["table"], data["low"], data["high"], mode=mode)
+
+    def _coords(self, obs: np.ndarray) -> np.ndarray:
+        """Fractional grid coordinates of each observation, clipped to the grid."""
+        coords = (obs - self.low) * self._scale
+        return np.clip(coords, 0, self._shape - 1)
+
+    def _nearest(self, obs: np.ndarray) -> np.ndarray:
+        idx = np.rint(self._coords(obs)).astype(np.intp)
+        return self.table[idx[:, 0], idx[:, 1], idx[:, 2]]
+
+    def _interpolate(self, obs: np.ndarray) -> np.ndarray:
+        coords = self._coords(obs)
+        base = np.minimum(np.floor(coords).astype(np.intp), self._shape - 2)
+        frac = coords - base
+
+        votes = np.zeros((len(obs), max(self.n_actions, 1)))
+        rows = np.arange(len(obs))
+        for corner in range(8):
+            offset = np.array([(corner >> 2) & 1, (corner >> 1) & 1, corner & 1])
+            weight = np.prod(np.where(offset, frac, 1.0 - frac), axis=1)
+            idx = base + offset
+            actions = self.table[idx[:, 0], idx[:, 1], idx[:, 2]]
+            np.add.at(votes, (rows, actions), weight)
+        return votes.argmax(axis=1).astype(np.uint8)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        """Same return convention as SB3: (actions, None); 0-d for one observation."""
+        obs = np.asarray(observation, dtype=np.float64)
+        single = obs.ndim == 1
+        obs = obs.reshape(-1, 3)
+
+        if self.mode == "nearest":
+            actions = self._nearest(obs)
+        else:
+            actions = self._interpolate(obs)
+
+        actions = actions.astype(np.int64)
+        return (actions[0] if single else actions), None
+
+
+def agreement(policy, model, observations: np.ndarray) -> float:
+    """Fraction of observations where policy and model pick the same action."""
+    ours, _ = policy.predict(observations)
+    theirs, _ = model.predict(observations, deterministic=True)
+    return float(np.mean(ours == theirs))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tabulate a trained PPO policy on a state grid")
+    parser.add_argument("--model", default="rl/models/ppo_liquidity")
+    parser.add_argument("--out", default="rl/models/ppo_liquidity_table.npz")
+    parser.add_argument("--grid", type=int, nargs=3, default=[64, 64, 64], metavar=("LIQ", "VOL", "APY"))
+    parser.add_argument("--n-samples", type=int, default=100000, help="uniform states checked for agreement")
+    parser.add_argument("--n-episodes", type=int, default=20, help="policy rollouts checked for agreement")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    from stable_baselines3 import PPO
+
+    from rl.episode_runner import run_episodes_batched
+
+    args = parse_args()
+    model = PPO.load(args.model)
+
+    low, high = grid_bounds()
+    table = build_table(model, tuple(args.grid), low, high)
+    save_table(args.out, table, low, high)
+    print(f"Saved {table.shape} action table ({table.nbytes / 1024:.0f} KiB) to {args.out}")
+
+    # States sampled uniformly inside the grid
+    rng = np.random.default_rng(args.seed)
+    uniform_obs = rng.uniform(low, high, size=(args.n_samples, 3)).astype(np.float32)
+
+    # States the trained policy actually visits
+    rollout = run_episodes_batched(model, args.n_episodes, seed=args.seed)
+    visited = np.stack(
+        [rollout["liquidity"].ravel(), rollout["volatility"].ravel(), rollout["apy"].ravel()],
+        axis=1,
+    )
+    visited = visited[~np.isnan(visited).any(axis=1)].astype(np.float32)
+
+    print("=====================================")
+    for mode in ("nearest", "interpolate"):
+        policy = TabulatedPolicy(table, low, high, mode=mode)
+        print(
+            f"{mode:12s}: agreement {agreement(policy, model, uniform_obs):.2%} on uniform states, "
+            f"{agreement(policy, model, visited):.2%} on visited states"
+        )
+
+
+if __name__ == "__main__":
+    main()
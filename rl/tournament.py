@@ -0,0 +1,330 @@
+"""
+Multi-policy tournaments with common random numbers.
+
+    python -m rl.tournament --policies ppo rule table manual:constant --n-episodes 2000 --until-confident
+
+Every policy plays the same seeded episodes: pool i of a BatchedLiquidityEnv
+seeded with s replays LiquidityEnv.reset(seed=s + i) exactly, so for a given
+seed each policy meets the same volatility noise (and, with replay=..., the
+same market window). Comparing returns seed by seed then cancels the noise
+the policies share, and the paired differences have a far smaller variance
+than the difference of two independent means. Rankings come from those
+paired differences, and with until_confident the tournament stops as soon
+as every neighbour in the ranking is separated at 95%.
+
+Any object with the model.predict(obs_batch, state=...) signature can play:
+PPO models, NumpyPolicy, TabulatedPolicy, RuleBasedPolicy, DPPolicy and
+SchedulePolicy for manual (open-loop) schedules; the last two keep their
+step index in the recurrent state SB3 hands back and forth.
+"""
+import sys
+sys.path.append("/content/rl-liquidity-project")
+
+import argparse
+import json
+
+import numpy as np
+
+from env.liquidity_env import MAX_STEPS
+from rl.stats import Z_95, RunningStats
+
+# The dashboard's manual strategies (see strategy_actions)
+MANUAL_STRATEGIES = ("constant", "increasing", "decreasing", "random")
+
+# Paired variance below this fraction of the unpaired one is floating-point
+# noise: common random numbers cancelled all of the shared noise
+CANCELLED_VARIANCE = 1e-12
+
+
+def strategy_actions(strategy: str, apy_change: float = 0.0, num_steps: int = 300, seed: int = 0) -> list:
+    """Per-step manual APY changes of a dashboard strategy; apy_change is in %."""
+    if strategy == "constant":
+        return [apy_change / 100.0] * num_steps
+    if strategy == "increasing":
+        return np.linspace(-0.02, 0.02, num_steps).tolist()
+    if strategy == "decreasing":
+        return np.linspace(0.02, -0.02, num_steps).tolist()
+    if strategy == "random":
+        return np.random.default_rng(seed).uniform(-0.05, 0.05, num_steps).tolist()
+    raise ValueError(f"Unknown manual strategy '{strategy}' (expected one of {MANUAL_STRATEGIES})")
+
+
+def manual_schedule(manual_actions, num_steps: int = MAX_STEPS) -> np.ndarray:
+    """
+    Action indices the env receives for a manual schedule: the last entry is
+    held past its end and values get the int() cast LiquidityEnv.step applies.
+    """
+    steps = min(num_steps, MAX_STEPS)
+    schedule_idx = np.minimum(np.arange(steps), len(manual_actions) - 1)
+    return np.asarray(manual_actions)[schedule_idx].astype(np.int64)
+
+
+class SchedulePolicy:
+    """
+    A fixed action schedule with the model.predict() signature.
+
+    The returned state is each episode's next step index; pass it back on the
+    next call (as with SB3 recurrent policies). Past the end of the schedule
+    the last action is repeated.
+    """
+
+    def __init__(self, schedule):
+        self.schedule = np.asarray(schedule, dtype=np.int64)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        obs = np.asarray(observation)
+        single = obs.ndim == 1
+        n = 1 if single else len(obs)
+
+        t = np.zeros(n, dtype=np.int64) if state is None else np.asarray(state, dtype=np.int64)
+        if episode_start is not None:
+            t = np.where(episode_start, 0, t)
+        actions = self.schedule[np.minimum(t, len(self.schedule) - 1)]
+        return (actions[0] if single else actions), t + 1
+
+
+def load_tournament_policy(spec: str, model_path: str = "rl/models/ppo_liquidity"):
+    """
+    Policy for a command-line spec: ppo[:path], rule, table[:path],
+    manual:strategy[:apy_change], planner[:horizon[:beam_width[:n_scenarios]]],
+    dp[:path].
+    """
+    name, _, arg = spec.partition(":")
+    if name == "ppo":
+        from rl.inference_server import load_shared_policy
+
+        return load_shared_policy(arg or model_path)
+    if name == "rule":
+        from rl.compare_policies import RuleBasedPolicy
+
+        return RuleBasedPolicy()
+    if name == "table":
+        from rl.tabulate_policy import TabulatedPolicy
+
+        return TabulatedPolicy.load(arg or model_path + "_table.npz")
+    if name == "manual":
+        strategy, _, apy_change = arg.partition(":")
+        return SchedulePolicy(manual_schedule(strategy_actions(strategy, float(apy_change or 0.0), MAX_STEPS)))
+    if name == "planner":
+        from rl.planner import BeamSearchPlanner
+
+        return BeamSearchPlanner(*(int(v) for v in arg.split(":") if v))
+    if name == "dp":
+        from rl.dp_solver import DPPolicy
+
+        return DPPolicy.load(arg or "rl/models/dp_policy.npz")
+    raise ValueError(
+        f"Unknown policy '{spec}' (expected ppo[:path], rule, table[:path], manual:strategy, planner or dp[:path])"
+    )
+
+
+def play_batch(policy, first_seed: int, n_episodes: int, max_steps: int = MAX_STEPS, **env_kwargs) -> np.ndarray:
+    """Returns of episodes seeded first_seed .. first_seed + n_episodes - 1, played in lockstep."""
+    # Imported here: BatchedLiquidityEnv pulls in stable_baselines3 (and torch)
+    from env.batched_env import BatchedLiquidityEnv
+
+    env = BatchedLiquidityEnv(n_episodes, seed=first_seed, **env_kwargs)
+    obs = env.reset()
+
+    returns = np.zeros(n_episodes)
+    active = np.ones(n_episodes, dtype=bool)
+    state = None
+    for t in range(max_steps):
+        actions, state = policy.predict(obs, state=state, deterministic=True)
+        obs, _, dones, _ = env.step(actions)
+        returns += np.where(active, env.last_rewards, 0.0)
+        active &= ~dones
+        if not active.any():
+            break
+
+    env.close()
+    return returns
+
+
+class TournamentStats:
+    """
+    Per-policy returns and pairwise paired differences over common seeds.
+
+    diffs.mean[i, j] is the mean of (return of i - return of j) taken episode
+    by episode; both accumulators merge like any RunningStats.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        n = len(self.names)
+        self.returns = RunningStats((n,))
+        self.diffs = RunningStats((n, n))
+
+    @property
+    def n_episodes(self) -> int:
+        return int(self.returns.count[0]) if self.names else 0
+
+    def update(self, returns: np.ndarray) -> None:
+        """Fold in a [n_policies, batch] array of returns on the same seeds."""
+        per_episode = np.asarray(returns, dtype=np.float64).T
+        self.returns.update(per_episode)
+        self.diffs.update(per_episode[:, :, None] - per_episode[:, None, :])
+
+    def merge(self, other: "TournamentStats") -> "TournamentStats":
+        self.returns.merge(other.returns)
+        self.diffs.merge(other.diffs)
+        return self
+
+    def ranking(self) -> list:
+        """Policy indices, best mean return first."""
+        return [int(i) for i in np.argsort(-self.returns.mean, kind="stable")]
+
+    def separated(self, i: int, j: int) -> bool:
+        """Whether the paired 95% CI of i - j excludes zero."""
+        return bool(abs(self.diffs.mean[i, j]) > self.diffs.ci95()[i, j])
+
+    def tied(self, i: int, j: int) -> bool:
+        """Whether i and j scored exactly the same on every seed (e.g. equal schedules)."""
+        return bool(self.diffs.mean[i, j] == 0.0 and self.diffs.m2[i, j] == 0.0)
+
+    def confident(self) -> bool:
+        """Whether every policy is separated from (or tied with) the next one in the ranking."""
+        order = self.ranking()
+        return all(self.separated(a, b) or self.tied(a, b) for a, b in zip(order, order[1:]))
+
+    def unpaired_ci95(self, i: int, j: int) -> float:
+        """Half-width the i - j CI would have with independent noise per policy."""
+        variance = self.returns.variance[i] + self.returns.variance[j]
+        return float(Z_95 * np.sqrt(variance / self.n_episodes))
+
+    def variance_reduction(self, i: int, j: int) -> float:
+        """
+        Var(independent difference) / Var(paired difference): how many times
+        more episodes independent noise would need for the same CI. inf when
+        the pairing cancelled the noise entirely (see noise_cancelled).
+        """
+        if self.noise_cancelled(i, j):
+            return float("inf")
+        variance = self.returns.variance[i] + self.returns.variance[j]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return float(variance / self.diffs.variance[i, j])
+
+    def noise_cancelled(self, i: int, j: int) -> bool:
+        """Whether the paired variance of i - j is only floating-point noise."""
+        variance = self.returns.variance[i] + self.returns.variance[j]
+        return bool(self.diffs.variance[i, j] <= CANCELLED_VARIANCE * variance)
+
+    def summary(self) -> dict:
+        order = self.ranking()
+        ci = self.returns.ci95()
+        diff_ci = self.diffs.ci95()
+        return {
+            "n_episodes": self.n_episodes,
+            "confident": self.confident(),
+            "policies": {
+                self.names[i]: {
+                    "rank": rank + 1,
+                    "mean": float(self.returns.mean[i]),
+                    "ci95": float(ci[i]),
+                    "std": float(self.returns.std[i]),
+                }
+                for rank, i in enumerate(order)
+            },
+            "pairs": [
+                {
+                    "better": self.names[a],
+                    "worse": self.names[b],
+                    "mean_diff": float(self.diffs.mean[a, b]),
+                    "ci95": float(diff_ci[a, b]),
+                    "unpaired_ci95": self.unpaired_ci95(a, b),
+                    # null in the JSON when the noise cancelled entirely
+                    "variance_reduction": None if self.noise_cancelled(a, b) else self.variance_reduction(a, b),
+                    "noise_cancelled": self.noise_cancelled(a, b),
+                    "separated": self.separated(a, b),
+                    "tied": self.tied(a, b),
+                }
+                for a, b in zip(order, order[1:])
+            ],
+        }
+
+
+def run_tournament(policies: dict, n_episodes: int, seed: int = 0, batch_size: int = 500,
+                   until_confident: bool = False, min_episodes: int = 50,
+                   max_steps: int = MAX_STEPS, **env_kwargs) -> TournamentStats:
+    """
+    Play {name: policy} on the seeds seed .. seed + n_episodes - 1, one batch
+    of seeds at a time, every policy on every batch.
+
+    With until_confident, stop after the first batch (at least min_episodes
+    in) where the whole ranking is separated.
+    """
+    stats = TournamentStats(policies)
+    for start in range(0, n_episodes, batch_size):
+        n = min(batch_size, n_episodes - start)
+        returns = np.stack([
+            play_batch(policy, seed + start, n, max_steps=max_steps, **env_kwargs)
+            for policy in policies.values()
+        ])
+        stats.update(returns)
+        if until_confident and stats.n_episodes >= min_episodes and stats.confident():
+            break
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rank policies on common random numbers")
+    parser.add_argument(
+        "--policies",
+        nargs="+",
+        default=["ppo", "rule"],
+        help="ppo[:path], rule, table[:path], manual:strategy[:apy_change], "
+             f"planner[:horizon[:beam_width[:n_scenarios]]], dp[:path] (strategies: {', '.join(MANUAL_STRATEGIES)})",
+    )
+    parser.add_argument("--model", default="rl/models/ppo_liquidity")
+    parser.add_argument("--n-episodes", type=int, default=1000, help="upper bound with --until-confident")
+    parser.add_argument("--batch-size", type=int, default=100, help="seeds played in lockstep per round")
+    parser.add_argument(
+        "--until-confident",
+        action="store_true",
+        help="stop once every neighbour in the ranking is separated at 95%% (or tied)",
+    )
+    parser.add_argument("--min-episodes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", default=None, help="market series to replay volatility from")
+    parser.add_argument("--json", default=None, help="write the summary to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    policies = {spec: load_tournament_policy(spec, args.model) for spec in args.policies}
+
+    stats = run_tournament(
+        policies,
+        args.n_episodes,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        until_confident=args.until_confident,
+        min_episodes=args.min_episodes,
+        replay=args.replay,
+    )
+    summary = stats.summary()
+
+    print(f"Ranking after {summary['n_episodes']} common-seed episodes:")
+    for name, s in summary["policies"].items():
+        print(f"  {s['rank']}. {name:20s} {s['mean']:10.3f} ± {s['ci95']:.3f} (std {s['std']:.3f})")
+    print("=====================================")
+    for pair in summary["pairs"]:
+        verdict = "tied" if pair["tied"] else "separated" if pair["separated"] else "NOT separated"
+        if pair["noise_cancelled"]:
+            reduction = "noise fully cancelled"
+        else:
+            reduction = f"{pair['variance_reduction']:.3g}x fewer episodes"
+        print(
+            f"{pair['better']} - {pair['worse']}: {pair['mean_diff']:+.4f} ± {pair['ci95']:.4f} paired "
+            f"(± {pair['unpaired_ci95']:.4f} unpaired, {reduction}), {verdict}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved summary to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
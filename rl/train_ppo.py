@@ -1,21 +1,157 @@
+import argparse
+import json
 import os
+import time
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
-from env.liquidity_env import LiquidityEnv
+from env.batched_env import BatchedLiquidityEnv
+from rl import instrumentation
+from rl.background_eval import AsyncEvalCallback, latest_checkpoint
+from rl.numpy_policy import export_policy
+from rl.shm_vec_env import SharedMemoryVecEnv
+
+# Number of pools simulated side by side
+N_ENVS = 8
+
+# Steps collected per rollout across all pools (SB3's single-env default)
+ROLLOUT_SIZE = 2048
+
+# LiquidityEnv reward weights a config may override
+REWARD_WEIGHTS = ("A", "B", "C")
+
+
+def split_config(config: dict):
+    """Split a flat config into (PPO keyword arguments, env reward weights)."""
+    ppo_kwargs = {k: v for k, v in config.items() if k not in REWARD_WEIGHTS}
+    weights = {k: v for k, v in config.items() if k in REWARD_WEIGHTS}
+    return ppo_kwargs, weights
+
+
+def apply_reward_weights(env, weights: dict) -> None:
+    """Set reward weights on every pool of a vec env."""
+    for name, value in weights.items():
+        env.set_attr(name, float(value))
+
+
+def make_vec_env(n_envs: int, n_workers: int, seed=None, replay=None, replay_columns=()):
+    """In-process batched env, or the same batch split over worker processes."""
+    if n_workers <= 1:
+        return BatchedLiquidityEnv(n_envs=n_envs, seed=seed, replay=replay, replay_columns=replay_columns)
+    return SharedMemoryVecEnv(
+        n_envs=n_envs, n_workers=n_workers, seed=seed, replay=replay, replay_columns=replay_columns
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train PPO on LiquidityEnv")
+    parser.add_argument("--n-envs", type=int, default=N_ENVS, help="pools simulated in parallel")
+    parser.add_argument(
+        "--n-workers",
+        type=int,
+        default=1,
+        help="worker processes sharing the pools (1 = step everything in-process)",
+    )
+    parser.add_argument("--timesteps", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--eval-freq", type=int, default=10000, help="timesteps between evaluations (0 = off)")
+    parser.add_argument("--eval-episodes", type=int, default=10)
+    parser.add_argument("--eval-log", default="data/training/eval_curve.csv")
+    parser.add_argument("--checkpoint-freq", type=int, default=20000, help="timesteps between checkpoints (0 = off)")
+    parser.add_argument("--checkpoint-dir", default="data/training/checkpoints")
+    parser.add_argument("--keep-checkpoints", type=int, default=3)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from the latest checkpoint in --checkpoint-dir up to --timesteps in total",
+    )
+    parser.add_argument(
+        "--config",
+        default=None,
+        help="JSON file of PPO arguments and reward weights A/B/C (e.g. from rl/sweep.py --best-json)",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="market series (scripts/build_market_series.py) to replay volatility from",
+    )
+    parser.add_argument(
+        "--replay-columns",
+        nargs="*",
+        default=[],
+        help="replayed series appended to the observation, e.g. return",
+    )
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
 
-def make_env():
-    return LiquidityEnv()
 
 if __name__ == "__main__":
-    # Vectorized environment required by Stable-Baselines3 PPO
-    env = DummyVecEnv([make_env])
-    model = PPO("MlpPolicy", env, verbose=1)
+    args = parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    ppo_kwargs, weights = split_config(config)
+
+    env = make_vec_env(
+        args.n_envs,
+        args.n_workers,
+        seed=args.seed,
+        replay=args.replay,
+        replay_columns=tuple(args.replay_columns),
+    )
+    apply_reward_weights(env, weights)
+
+    checkpoint = latest_checkpoint(args.checkpoint_dir) if args.resume else None
+    if checkpoint:
+        # Hyperparameters and timestep count come from the checkpoint
+        model = PPO.load(checkpoint, env=env, verbose=1)
+        print(f"Resuming from {checkpoint} at {model.num_timesteps} timesteps")
+    else:
+        if args.resume:
+            print(f"No checkpoint in {args.checkpoint_dir}; starting a new run")
+        model = PPO(
+            "MlpPolicy",
+            env,
+            **{"n_steps": max(ROLLOUT_SIZE // args.n_envs, 1), **ppo_kwargs},
+            seed=args.seed,
+            verbose=1,
+        )
+
+    callback = AsyncEvalCallback(
+        eval_freq=args.eval_freq,
+        log_path=args.eval_log,
+        checkpoint_freq=args.checkpoint_freq,
+        checkpoint_dir=args.checkpoint_dir,
+        keep_checkpoints=args.keep_checkpoints,
+        n_episodes=args.eval_episodes,
+        seed=0 if args.seed is None else args.seed + 10_000,
+        env_kwargs={"replay": args.replay, "replay_columns": tuple(args.replay_columns)},
+    )
+
+    # Train for 200,000 timesteps by default (adjust with --timesteps)
+    start = time.perf_counter()
+    start_timesteps = model.num_timesteps
+    with instrumentation.session_from_args(args):
+        model.learn(
+            total_timesteps=max(args.timesteps - start_timesteps, 0),
+            callback=callback,
+            reset_num_timesteps=checkpoint is None,
+        )
+    elapsed = time.perf_counter() - start
+    env.close()
+    callback.close()
 
-    # Train for 200,000 timesteps (adjust as needed)
-    model.learn(total_timesteps=200000)
+    trained = model.num_timesteps - start_timesteps
+    print(
+        f"Trained {trained} timesteps in {elapsed:.1f}s "
+        f"({trained / elapsed:,.0f} steps/sec, "
+        f"n_envs={args.n_envs}, n_workers={args.n_workers})"
+    )
+    instrumentation.print_summary()
 
     # Ensure models folder exists
     os.makedirs("rl/models", exist_ok=True)
 
-    # Save the trained model
+    # Save the trained model, plus its torch-free actor for inference
     model.save("rl/models/ppo_liquidity")
+    export_policy("rl/models/ppo_liquidity")
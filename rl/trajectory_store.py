@@ -0,0 +1,181 @@
+"""
+Append-only columnar store for many logged episodes.
+
+A store is a directory holding one raw binary file per field (step,
+liquidity, volatility, apy, reward, action), the episode end offsets, the
+per-episode seeds and a meta.json with the dtypes and the model hash.
+Readers memory-map the field files, so slicing one episode, or one field
+across every episode, never copies data.
+"""
+import json
+import os
+
+import numpy as np
+
+FIELDS = {
+    "step": np.int32,
+    "liquidity": np.float32,
+    "volatility": np.float32,
+    "apy": np.float32,
+    "reward": np.float64,
+    "action": np.uint8,
+}
+
+META_FILE = "meta.json"
+OFFSETS_FILE = "offsets.i64"
+SEEDS_FILE = "seeds.i64"
+
+# Stored in seeds.i64 for episodes run without an explicit seed
+NO_SEED = -1
+
+
+def _field_file(name: str) -> str:
+    return f"{name}.{np.dtype(FIELDS[name]).str.lstrip('<>|=')}"
+
+
+def _truncate(path: str, size: int) -> None:
+    """Cut a file back to size bytes if it is longer (missing files are left alone)."""
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+
+class TrajectoryWriter:
+    """
+    Appends episodes to a store, creating it on first use.
+
+    Field data is written before the episode index, so a reader never sees
+    an episode whose data is incomplete. Opening a store cuts every file back
+    to the last complete episode, dropping rows a crashed writer left behind
+    so they never end up in the next episode.
+    """
+
+    def __init__(self, path: str, model_hash: str = None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if model_hash is not None and meta.get("model_hash") not in (None, model_hash):
+                raise ValueError(
+                    f"Store {path} holds episodes of model {meta['model_hash']}, not {model_hash}"
+                )
+            self.model_hash = meta.get("model_hash") or model_hash
+        else:
+            self.model_hash = model_hash
+
+        meta = {
+            "fields": {name: np.dtype(dtype).str for name, dtype in FIELDS.items()},
+            "model_hash": self.model_hash,
+        }
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+
+        offsets_path = os.path.join(path, OFFSETS_FILE)
+        itemsize = np.dtype(np.int64).itemsize
+        n_episodes = os.path.getsize(offsets_path) // itemsize if os.path.exists(offsets_path) else 0
+        if n_episodes > 0:
+            self._end = int(np.fromfile(offsets_path, dtype=np.int64, count=n_episodes)[-1])
+        else:
+            self._end = 0
+
+        # Drop whatever a crash left past the last complete episode
+        _truncate(offsets_path, n_episodes * itemsize)
+        _truncate(os.path.join(path, SEEDS_FILE), n_episodes * itemsize)
+        for name, dtype in FIELDS.items():
+            _truncate(os.path.join(path, _field_file(name)), self._end * np.dtype(dtype).itemsize)
+        # Rows written for the episode in progress
+        self._pending = 0
+
+    def append_episode(self, episode: dict, seed: int = None) -> None:
+        """Append one episode given as {field: 1-D array}, all of equal length."""
+        self.write_steps(episode)
+        self.end_episode(seed)
+
+    def write_steps(self, steps: dict) -> None:
+        """
+        Append steps of the current episode, given as {field: 1-D array}.
+
+        An episode can be written in any number of chunks; it only becomes
+        visible to readers once end_episode() is called.
+        """
+        lengths = {len(steps[name]) for name in FIELDS}
+        if len(lengths) != 1:
+            raise ValueError(f"Episode fields have different lengths: {sorted(lengths)}")
+
+        for name, dtype in FIELDS.items():
+            with open(os.path.join(self.path, _field_file(name)), "ab") as f:
+                np.asarray(steps[name], dtype=dtype).tofile(f)
+        self._pending += lengths.pop()
+
+    def end_episode(self, seed: int = None) -> None:
+        """Close the current episode, making its steps visible to readers."""
+        self._end += self._pending
+        self._pending = 0
+        with open(os.path.join(self.path, SEEDS_FILE), "ab") as f:
+            np.array([NO_SEED if seed is None else seed], dtype=np.int64).tofile(f)
+        with open(os.path.join(self.path, OFFSETS_FILE), "ab") as f:
+            np.array([self._end], dtype=np.int64).tofile(f)
+
+
+class TrajectoryStore:
+    """Read-only, memory-mapped view of a store written by TrajectoryWriter."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.model_hash = meta.get("model_hash")
+
+        ends = self._read_index(OFFSETS_FILE)
+        self.offsets = np.concatenate([[0], ends]).astype(np.int64)
+        self.seeds = self._read_index(SEEDS_FILE)[: self.n_episodes]
+
+        n_rows = int(self.offsets[-1])
+        self._columns = {}
+        for name, dtype in FIELDS.items():
+            if n_rows == 0:
+                self._columns[name] = np.empty(0, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(
+                    os.path.join(path, _field_file(name)), dtype=dtype, mode="r", shape=(n_rows,)
+                )
+
+    def _read_index(self, filename: str) -> np.ndarray:
+        path = os.path.join(self.path, filename)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=np.int64)
+        return np.fromfile(path, dtype=np.int64)
+
+    @property
+    def n_episodes(self) -> int:
+        return len(self.offsets) - 1
+
+    def __len__(self) -> int:
+        return self.n_episodes
+
+    def episode(self, index: int) -> dict:
+        """{field: array} for one episode, as views into the mapped files."""
+        if index < 0:
+            index += self.n_episodes
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return {name: column[start:stop] for name, column in self._columns.items()}
+
+    def field(self, name: str) -> np.ndarray:
+        """One field for every episode back to back; split with self.offsets."""
+        return self._columns[name]
+
+    def to_csv(self, csv_path: str, episodes=None) -> int:
+        """Export episodes (default: all) to CSV with an 'episode' column."""
+        import pandas as pd
+
+        episodes = range(self.n_episodes) if episodes is None else episodes
+        frames = []
+        for i in episodes:
+            df = pd.DataFrame(self.episode(i))
+            df.insert(0, "episode", i)
+            frames.append(df)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["episode", *FIELDS])
+        df.to_csv(csv_path, index=False)
+        return len(df)
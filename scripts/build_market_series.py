@@ -0,0 +1,111 @@
+"""
+Turn downloaded bar CSVs into a memory-mapped series for historical replay.
+
+    python scripts/build_market_series.py data/bars/*.csv --out data/market/intraday
+
+Every CSV (Yahoo download format: Datetime/Date, ..., Close, ...) becomes
+one segment. Volatility is the dashboard's live feature (rolling std of
+bar returns), rescaled so its median lands on the env's starting
+volatility and clipped to the env's [0, 1] range. Run once; training then
+maps the result with LiquidityEnv(replay=...) at no parsing cost.
+"""
+import argparse
+import os
+import sys
+
+# Add repo root (and dashboard/, for the feature code) to Python path
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+for path in (REPO_ROOT, os.path.join(REPO_ROOT, "dashboard")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import numpy as np
+import pandas as pd
+
+from env.liquidity_env import INITIAL_STATE
+from env.market_replay import write_series
+from live_features import MIN_PERIODS, WINDOW, RollingFeatures
+
+# Exogenous columns that can be stored next to volatility
+EXTRA_COLUMNS = ("return", "price")
+
+
+def load_segment(csv_path: str, window: int, min_periods: int) -> dict:
+    """Unscaled volatility, return and price of one CSV, oldest bar first."""
+    df = pd.read_csv(csv_path)
+    time_column = "Datetime" if "Datetime" in df.columns else "Date"
+    df = df.sort_values(time_column)
+    price = df["Close"].to_numpy(dtype=np.float64)
+
+    returns, volatility = RollingFeatures(window, min_periods).bootstrap(price)
+
+    # Drop the warm-up bars, then carry values across any gaps
+    valid = np.flatnonzero(~np.isnan(volatility))
+    first = valid[0] if len(valid) else len(price)
+    segment = pd.DataFrame({
+        "volatility": volatility[first:],
+        "return": returns[first:],
+        "price": price[first:],
+    }).ffill()
+    segment["return"] = segment["return"].fillna(0.0)
+    return {name: segment[name].to_numpy() for name in segment.columns}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build a replay series from bar CSVs")
+    parser.add_argument("csv", nargs="+", help="bar CSV files, one segment each")
+    parser.add_argument("--out", default="data/market/intraday")
+    parser.add_argument(
+        "--columns",
+        nargs="*",
+        default=list(EXTRA_COLUMNS),
+        choices=EXTRA_COLUMNS,
+        help="exogenous columns to store next to volatility",
+    )
+    parser.add_argument(
+        "--target-median",
+        type=float,
+        default=INITIAL_STATE[1],
+        help="env volatility the median bar volatility is scaled to",
+    )
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--min-periods", type=int, default=MIN_PERIODS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    segments = []
+    sources = []
+    for csv_path in args.csv:
+        segment = load_segment(csv_path, args.window, args.min_periods)
+        if len(segment["volatility"]) == 0:
+            print(f"Skipping {csv_path}: fewer than {args.min_periods + 1} bars")
+            continue
+        segments.append(segment)
+        sources.append(os.path.basename(csv_path))
+    if not segments:
+        raise ValueError("None of the CSVs holds enough bars")
+
+    median = float(np.median(np.concatenate([s["volatility"] for s in segments])))
+    scale = args.target_median / median if median > 0 else 1.0
+    for segment in segments:
+        segment["volatility"] = np.clip(segment["volatility"] * scale, 0.0, 1.0)
+
+    n_rows = write_series(
+        args.out,
+        [{name: s[name] for name in ("volatility", *args.columns)} for s in segments],
+        meta={
+            "volatility_scale": scale,
+            "window": args.window,
+            "min_periods": args.min_periods,
+            "sources": sources,
+        },
+    )
+    print(f"Wrote {n_rows} bars in {len(segments)} segments to {args.out} (volatility x {scale:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,84 @@
+import argparse
 import os
+import sys
+
+# Add repo root to Python path (one level up from 'scripts')
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from rl.trajectory_store import TrajectoryStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Plot one logged PPO episode")
+    parser.add_argument("--store", default="data/trajectories/ppo_liquidity")
+    parser.add_argument("--episode", type=int, default=-1, help="episode index (default: latest)")
+    parser.add_argument("--csv", default=None, help="read a CSV trajectory instead of the store")
+    return parser.parse_args()
 
-def main():
-    csv_path = "data/ppo_trajectory.csv"
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"{csv_path} not found. Run rl/log_trajectory.py first.")
 
-    # Load CSV into a DataFrame
-    df = pd.read_csv(csv_path)
+def load_episode(args):
+    """The episode to plot as {field: array}, from the store or a CSV file."""
+    if args.csv:
+        if not os.path.exists(args.csv):
+            raise FileNotFoundError(f"{args.csv} not found.")
+        df = pd.read_csv(args.csv)
+        if "episode" in df.columns:
+            episode_ids = df["episode"].unique()
+            df = df[df["episode"] == episode_ids[args.episode]]
+        print(f"Loaded {len(df)} steps from {args.csv}")
+        return {name: df[name].to_numpy() for name in ("step", "liquidity", "volatility", "apy", "reward")}
 
-    # Quick info
-    print(df.head())
-    print(f"Loaded {len(df)} steps from {csv_path}")
+    if not os.path.exists(args.store):
+        raise FileNotFoundError(f"{args.store} not found. Run rl/log_trajectory.py first.")
+    store = TrajectoryStore(args.store)
+    if store.n_episodes == 0:
+        raise ValueError(f"{args.store} holds no episodes yet.")
+    episode = store.episode(args.episode)
+    print(f"Loaded {len(episode['step'])} steps of episode {args.episode} "
+          f"({store.n_episodes} in {args.store})")
+    return episode
+
+
+def main():
+    args = parse_args()
+    data = load_episode(args)
 
     # Create a 2x2 grid of plots: liquidity, volatility, apy, reward
     fig, axes = plt.subplots(2, 2, figsize=(12, 8))
     fig.suptitle("PPO LiquidityEnv Trajectory")
 
     # Liquidity over time
-    axes[0, 0].plot(df["step"], df["liquidity"])
+    axes[0, 0].plot(data["step"], data["liquidity"])
     axes[0, 0].set_title("Liquidity vs Step")
     axes[0, 0].set_xlabel("Step")
     axes[0, 0].set_ylabel("Liquidity")
 
     # Volatility over time
-    axes[0, 1].plot(df["step"], df["volatility"])
+    axes[0, 1].plot(data["step"], data["volatility"])
     axes[0, 1].set_title("Volatility vs Step")
     axes[0, 1].set_xlabel("Step")
     axes[0, 1].set_ylabel("Volatility")
 
     # APY over time
-    axes[1, 0].plot(df["step"], df["apy"])
+    axes[1, 0].plot(data["step"], data["apy"])
     axes[1, 0].set_title("APY vs Step")
     axes[1, 0].set_xlabel("Step")
     axes[1, 0].set_ylabel("APY")
 
     # Reward over time
-    axes[1, 1].plot(df["step"], df["reward"])
+    axes[1, 1].plot(data["step"], data["reward"])
     axes[1, 1].set_title("Reward vs Step")
     axes[1, 1].set_xlabel("Step")
     axes[1, 1].set_ylabel("Reward")
 
     plt.tight_layout()
-  
+
     plt.show()
 
 
@@ -9,10 +9,8 @@ if REPO_ROOT not in sys.path:
 
 from env.liquidity_env import LiquidityEnv
 
-from env.liquidity_env import LiquidityEnv
-
 def main():
-    env = LiquidityEnv()
+    env = LiquidityEnv(fast_path=True)
     obs, info = env.reset()
     print("Initial observation:", obs)
 
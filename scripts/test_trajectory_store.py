@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+# Add repo root to Python path (one level up from 'scripts')
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(CURRENT_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+import numpy as np
+
+from rl.trajectory_store import FIELDS, TrajectoryStore, TrajectoryWriter
+
+
+def make_steps(n: int, value: int) -> dict:
+    return {name: np.full(n, value, dtype=dtype) for name, dtype in FIELDS.items()}
+
+
+def test_crash_mid_episode_is_dropped():
+    with tempfile.TemporaryDirectory() as path:
+        writer = TrajectoryWriter(path)
+        writer.append_episode(make_steps(3, 1), seed=0)
+
+        # Crash after writing part of the second episode: end_episode() never runs
+        TrajectoryWriter(path).write_steps(make_steps(5, 9))
+
+        TrajectoryWriter(path).append_episode(make_steps(2, 2), seed=2)
+
+        store = TrajectoryStore(path)
+        assert store.n_episodes == 2, store.n_episodes
+        assert store.episode(0)["step"].tolist() == [1, 1, 1]
+        assert store.episode(1)["step"].tolist() == [2, 2], store.episode(1)["step"].tolist()
+        assert store.seeds.tolist() == [0, 2]
+        for name, dtype in FIELDS.items():
+            assert len(store.field(name)) == 5
+
+
+def main():
+    test_crash_mid_episode_is_dropped()
+    print("Trajectory store: crashed partial episode dropped on reopen")
+
+
+if __name__ == "__main__":
+    main()